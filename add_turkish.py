@@ -7,10 +7,13 @@ Then rebuild all ZIP archives and update index.json sha256.
 """
 import hashlib
 import json
+import sys
 import zipfile
 from pathlib import Path
 
 HADITH_DIR = Path(__file__).resolve().parent / "hadith"
+sys.path.insert(0, str(HADITH_DIR / "translate"))
+from serialization import dump
 BOOKS_DIR = HADITH_DIR / "books"
 TR_DIR = HADITH_DIR / "translations" / "tr" / "books"
 ARCHIVES_DIR = HADITH_DIR / "archives"
@@ -62,8 +65,7 @@ def merge_turkish_into_file(books_path: Path, tr_path: Path) -> tuple[int, int]:
             hadith["turkish"] = {"narrator": "", "text": ""}
             updated += 1
 
-    with open(books_path, "w", encoding="utf-8") as f:
-        json.dump(books_data, f, ensure_ascii=False, indent=2)
+    dump(books_data, books_path)
     return updated, with_text
 
 
@@ -148,8 +150,7 @@ def main():
         book["sha256"] = sha
         print(f"  {book_id}.zip sha256={sha[:16]}...")
 
-    with open(INDEX_PATH, "w", encoding="utf-8") as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+    dump(index, INDEX_PATH)
     print("\nDone. index.json updated.")
 
 
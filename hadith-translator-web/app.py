@@ -28,6 +28,10 @@ import config
 config.ensure_dirs()
 
 from translator.runner import TranslationRunner
+from translator.serialization import dumps as dump_json
+from translator.corpus import get_corpus
+from translator import ngram
+from translator.search import default_index_path, open_index
 
 app = Flask(__name__)
 app.config["SQLALCHEMY_DATABASE_URI"] = config.SQLALCHEMY_DATABASE_URI
@@ -111,7 +115,9 @@ def _ensure_tables():
         _tables_created = True
 
 
-def _run_translation(language: str):
+def _run_translation(language: str, languages: list = None, mode: str = "sync"):
+    """Background job; with languages (several), one request per batch returns all of them.
+    mode "batch" goes through the OpenAI Batch API and polls until every job is ingested."""
     global _last_progress, _current_language
     logger.info("Translation started: language=%s", language)
     with _status_lock:
@@ -122,7 +128,10 @@ def _run_translation(language: str):
             _last_progress.update(data)
     runner = TranslationRunner(stop_event=_stop_event, progress_callback=on_progress, app=app)
     try:
-        result = runner.run(language)
+        if mode == "batch":
+            result = runner.run_batch(languages or [language], wait=True)
+        else:
+            result = runner.run_multi(languages) if languages else runner.run(language)
         with _status_lock:
             _last_progress.update(result)
         if result.get("error"):
@@ -183,6 +192,15 @@ def get_status():
         "books_count": progress.get("books_count"),
         "chapter_file": progress.get("chapter_file"),
         "hadiths_count": progress.get("hadiths_count"),
+        "languages": progress.get("languages"),
+        "plan": progress.get("plan"),
+        "cache": progress.get("cache"),
+        "rate_limit": progress.get("rate_limit"),
+        "packing": progress.get("packing"),
+        "usage": progress.get("usage"),
+        "validation": progress.get("validation"),
+        "dead_letters": progress.get("dead_letters"),
+        "jobs": progress.get("jobs"),
     }
 
 
@@ -510,18 +528,37 @@ def api_languages():
 def api_start():
     global _translation_thread, _stop_event
     data = request.get_json() or {}
-    language = data.get("language", "turkish")
-    if language not in config.LANGUAGES:
-        return jsonify({"error": "Unknown language"}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    languages = data.get("languages")
+    if languages:
+        # Multi-language mode: ["turkish", "french", ...] or "all"
+        if languages == "all":
+            languages = list(config.LANGUAGES)
+        elif isinstance(languages, list) and all(isinstance(lang, str) for lang in languages):
+            languages = list(dict.fromkeys(languages))
+        else:
+            return jsonify({"error": "languages must be \"all\" or a list of language names"}), 400
+        if any(lang not in config.LANGUAGES for lang in languages):
+            return jsonify({"error": "Unknown language"}), 400
+        language = "+".join(languages)
+    else:
+        languages = None
+        language = data.get("language", "turkish")
+        if not isinstance(language, str) or language not in config.LANGUAGES:
+            return jsonify({"error": "Unknown language"}), 400
+    mode = data.get("mode", "sync")
+    if mode not in ("sync", "batch"):
+        return jsonify({"error": "Unknown mode"}), 400
     with _status_lock:
         if _translation_thread is not None and _translation_thread.is_alive():
             logger.warning("api/start rejected: translation already running")
             return jsonify({"error": "Translation already running"}), 409
     _stop_event.clear()
-    _translation_thread = threading.Thread(target=_run_translation, args=(language,), daemon=True)
+    _translation_thread = threading.Thread(target=_run_translation, args=(language, languages, mode), daemon=True)
     _translation_thread.start()
-    logger.info("api/start: language=%s thread started", language)
-    return jsonify({"ok": True, "language": language})
+    logger.info("api/start: language=%s mode=%s thread started", language, mode)
+    return jsonify({"ok": True, "language": language, "languages": languages, "mode": mode})
 
 
 @app.route('/api/stop', methods=['POST'])
@@ -562,7 +599,7 @@ def api_export(language):
         return jsonify({"error": "No translations found for this language"}), 404
     code = config.LANGUAGES[language].get("code", language)
     filename = f"hadith_translations_{code}.json"
-    body = json.dumps(data, ensure_ascii=False, indent=2)
+    body = dump_json(data)
     return Response(
         body,
         mimetype="application/json",
@@ -570,6 +607,73 @@ def api_export(language):
     )
 
 
+@app.route('/api/search')
+@_require_auth
+def api_search():
+    """بحث نصي في الأحاديث (BM25 أو منطقي) من الفهرس المحمَّل عبر mmap."""
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+    index = open_index(default_index_path(config.BOOKS_DIR))
+    if index is None:
+        return jsonify({"error": "Search index not built (python -m translator.search)"}), 503
+    mode = request.args.get("mode", "ranked")
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    try:
+        result = index.search(
+            query,
+            mode=mode,
+            book=request.args.getlist("book") or None,
+            category=request.args.get("category") or None,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get("text") in ("1", "true"):
+        corpus = get_corpus(config.BOOKS_DIR)
+        for item in result["results"]:
+            hadith = corpus.find_hadith(item["book_id"], item["chapterId"], item["id"]) or {}
+            item["arabic"] = hadith.get("arabic", "")
+            item["english"] = hadith.get("english", {})
+    result.update(query=query, mode=mode)
+    return jsonify(result)
+
+
+@app.route('/api/search/arabic')
+@_require_auth
+def api_search_arabic():
+    """بحث عن عبارة أو جزء كلمة في النص العربي دون اعتبار للتشكيل (فهرس ثلاثيات الحروف)."""
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+    index = ngram.open_index(ngram.default_index_path(config.BOOKS_DIR))
+    if index is None:
+        return jsonify({"error": "Arabic index not built (python -m translator.ngram)"}), 503
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    try:
+        result = index.search(
+            query,
+            book=request.args.getlist("book") or None,
+            category=request.args.get("category") or None,
+            whole_words=request.args.get("whole_words") in ("1", "true"),
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result.update(query=query)
+    return jsonify(result)
+
+
 if __name__ == '__main__':
     _ensure_tables()
     port = int(os.getenv('PORT', 5000))
@@ -10,6 +10,8 @@ BASE_DIR = Path(os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__))
 BOOKS_DIR = BASE_DIR / os.getenv("BOOKS_PATH", "data/books")
 OUTPUT_DIR = BASE_DIR / "output"
 CHECKPOINTS_DIR = BASE_DIR / "checkpoints"
+# Glossary of terms and titles put in every system prompt (ships with the code, not in DATA_DIR)
+GLOSSARY_PATH = Path(os.getenv("GLOSSARY_PATH", Path(os.path.dirname(os.path.abspath(__file__))) / "translator" / "glossary.json"))
 
 # Database (Railway PostgreSQL). SQLAlchemy expects postgresql:// not postgres://
 DATABASE_URL = os.getenv("DATABASE_URL", "")
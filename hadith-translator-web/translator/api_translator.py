@@ -1,12 +1,15 @@
 """
 API-based Translator using GPT-4o-mini for full translation.
-Supports optional parallel requests; on 429/timeout waits then retries.
+Requests are paced by ratelimit/shared_limiter, cached (llm_cache), packed by
+token_budget and answered as validated JSON items (structured); failed batches
+are split down to single items.
 """
 import os
+import threading
 import time
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Tuple
+from typing import List, Dict, Mapping, Optional, Tuple
 from openai import OpenAI, APITimeoutError
 
 logger = logging.getLogger("hadith.translator")
@@ -18,6 +21,15 @@ _root = Path(__file__).resolve().parent.parent
 if str(_root) not in sys.path:
     sys.path.insert(0, str(_root))
 import config as _config
+from . import structured
+from .llm_cache import cache_key, default_cache_path, open_cache, translate_cached
+from .prompts import PromptBuilder
+from .ratelimit import AdaptiveLimiter
+from .shared_limiter import estimate_tokens, open_limiter
+from .token_budget import TokenBudget
+
+# Retries for the halves of a bisected batch; the full batch already used OPENAI_RATE_LIMIT_RETRIES
+BISECT_RETRIES = 1
 
 
 def _is_rate_limit(e: Exception) -> bool:
@@ -43,6 +55,16 @@ def _is_retryable(e: Exception) -> bool:
     return _is_rate_limit(e) or _is_timeout(e) or _is_server_error(e)
 
 
+def _is_fatal(e: Exception) -> bool:
+    """Failures of the key or the connection, not of the texts sent: bisecting cannot help"""
+    return (getattr(e, "status_code", None) in (401, 403, 404) or _is_rate_limit(e)
+            or type(e).__name__ == "APIConnectionError")
+
+
+def _response_headers(e: Exception) -> Optional[Mapping]:
+    return getattr(getattr(e, "response", None), "headers", None)
+
+
 class APITranslator:
     def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
         if not api_key:
@@ -54,79 +76,222 @@ class APITranslator:
         timeout_sec = float(os.getenv("OPENAI_TIMEOUT_SEC", "300"))
         self.client = OpenAI(api_key=self.api_key, timeout=timeout_sec, max_retries=0)
         self.lang_names = {k: v["name"] for k, v in _config.LANGUAGES.items()}
+        self.cache = open_cache(default_cache_path(_config.CHECKPOINTS_DIR))
+        self.api_calls = 0  # requests actually sent; cache hits cost none
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        self._calls_lock = threading.Lock()
+        self._thread_usage = threading.local()  # what each worker thread sent (see thread_usage)
+        self.limiter = AdaptiveLimiter(shared=open_limiter(self.api_key))
+        self.budget = TokenBudget(self.model)
+        self.validation = structured.ReplyStats()
+        self.prompts = PromptBuilder(_config.GLOSSARY_PATH, _config.LANGUAGES)
+        self._failures: Dict[str, str] = {}
 
-    def _translate_single_batch(self, batch_info: Tuple[int, List[str], str]) -> Tuple[int, List[str]]:
-        batch_idx, batch_texts, lang_name = batch_info
-        combined_text = "\n\n---\n\n".join([f"[{idx+1}] {text}" for idx, text in enumerate(batch_texts)])
-        retry_wait = int(os.getenv("OPENAI_RATE_LIMIT_WAIT", "60"))
-        max_retries = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "5"))
+    def system_prompt(self, languages: List[str]) -> str:
+        """System message for one language, or several answered in one request."""
+        return self.prompts.system(languages)
+
+    def _cache_routing(self, languages: List[str]) -> Dict:
+        """Request fields routing a language set to one provider prompt cache (none when disabled)."""
+        key = self.prompts.cache_key(languages)
+        # extra_body: prompt_cache_key predates support in older openai clients
+        return {"extra_body": {"prompt_cache_key": key}} if key else {}
+
+    def _request(self, messages: List[Dict], max_tokens: int, max_retries: int = None, **kwargs):
+        """One chat completion through the limiter, retrying 429 / timeouts / 5xx; None if it fails."""
+        if max_retries is None:
+            max_retries = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "5"))
         for attempt in range(max_retries + 1):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": f"You are a professional translator specializing in Islamic religious texts. Translate the following English hadith texts into {lang_name} only. Output MUST be in {lang_name} only—never return the original English. Maintain religious terminology accurately and preserve meaning. Keep narrator attributions if present. Reply with numbered lines [1], [2], etc. Each line must be the translation in {lang_name} of the corresponding item."},
-                        {"role": "user", "content": combined_text}
-                    ],
-                    temperature=0.3,
-                    max_tokens=4000
-                )
-                result = response.choices[0].message.content.strip()
-                lines = [line.strip() for line in result.split('\n') if line.strip()]
-                batch_translated = []
-                for line in lines:
-                    if ']' in line:
-                        line = line.split(']', 1)[1].strip()
-                    batch_translated.append(line)
-                while len(batch_translated) < len(batch_texts):
-                    batch_translated.append(batch_texts[len(batch_translated)])
-                return (batch_idx, batch_translated[:len(batch_texts)])
+                with self.limiter.slot(estimate_tokens((m["content"] for m in messages), max_tokens)):
+                    with self._calls_lock:
+                        self.api_calls += 1
+                    self._thread_usage.calls = getattr(self._thread_usage, "calls", 0) + 1
+                    raw = self.client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=max_tokens,
+                        **kwargs
+                    )
+                self.limiter.on_success(raw.headers)
+                response = raw.parse()
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    with self._calls_lock:
+                        self.usage["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                        self.usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+                        details = getattr(usage, "prompt_tokens_details", None)
+                        self.usage["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+                    self._thread_usage.tokens = (getattr(self._thread_usage, "tokens", 0) +
+                                                 (getattr(usage, "prompt_tokens", 0) or 0) +
+                                                 (getattr(usage, "completion_tokens", 0) or 0))
+                return response
             except Exception as e:
                 if _is_retryable(e) and attempt < max_retries:
-                    if _is_timeout(e):
-                        kind = "timeout"
-                    elif _is_server_error(e):
-                        kind = "5xx server error"
-                    else:
-                        kind = "429 rate limit"
-                    logger.warning("%s: waiting %s sec then retry (%s/%s)", kind, retry_wait, attempt + 1, max_retries)
-                    time.sleep(retry_wait)
+                    if _is_rate_limit(e):
+                        # The limiter pauses every caller; the next slot() waits it out
+                        wait = self.limiter.on_throttle(_response_headers(e), attempt)
+                        logger.warning("429 rate limit: paused %.1f sec, limiter now %s (%s/%s)",
+                                       wait, self.limiter.stats(), attempt + 1, max_retries)
+                        continue
+                    kind = "timeout" if _is_timeout(e) else "5xx server error"
+                    wait = self.limiter.backoff(attempt)
+                    logger.warning("%s: waiting %.1f sec then retry (%s/%s)", kind, wait, attempt + 1, max_retries)
+                    time.sleep(wait)
                     continue
+                if _is_fatal(e):
+                    raise
                 logger.exception("translate_batch failed: %s", e)
-                return (batch_idx, batch_texts)
-        return (batch_idx, batch_texts)
+                return None
+        return None
+
+    def _reply(self, response, texts: List[str], language, max_tokens: int) -> str:
+        """Reply text; feeds usage and truncation back to the token budget."""
+        if not getattr(response, "choices", None):
+            logger.warning("reply without choices (%s texts)", len(texts))
+            return ""
+        choice = response.choices[0]
+        truncated = choice.finish_reason == "length"
+        usage = getattr(response, "usage", None)
+        self.budget.observe(texts, language, getattr(usage, "completion_tokens", None), truncated)
+        if truncated:
+            logger.warning("reply cut off at max_tokens=%s (%s texts)", max_tokens, len(texts))
+        return choice.message.content or ""
+
+    def _translate_structured(self, texts: List[str], prompt: str, target,
+                              languages: List[str] = None) -> List[Optional[Dict[str, str]]]:
+        """
+        Structured requests for texts; None where an item never validated.
+
+        Items failing validation are re-sent alone (structured.repair_rounds);
+        a request failing outright is bisected down to single items.
+        """
+        results: List[Optional[Dict[str, str]]] = [None] * len(texts)
+        routing = self._cache_routing(languages or [target])
+        # (item indices, repair round, part of a bisected batch)
+        groups = [(list(range(len(texts))), 0, False)]
+        while groups:
+            group, repair, bisected = groups.pop()
+            sources = [texts[i] for i in group]
+            max_tokens = self.budget.max_tokens(sources, target)
+            response = self._request([
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": structured.number_texts(sources)}
+            ], max_tokens, max_retries=BISECT_RETRIES if bisected else None,
+                response_format=structured.response_format(languages), **routing)
+            if response is None:
+                if len(group) > 1:
+                    half = len(group) // 2
+                    logger.warning("request for %s items failed, splitting into %s + %s",
+                                   len(group), half, len(group) - half)
+                    self.validation.bisect()
+                    groups += [(group[half:], repair, True), (group[:half], repair, True)]
+                else:
+                    self.record_failure(sources, "request_failed")
+                continue
+            translations, failures = structured.validate(self._reply(response, sources, target, max_tokens),
+                                                         sources, languages)
+            self.validation.record(len(sources), failures, resent=repair > 0 or bisected)
+            for j, values in enumerate(translations):
+                if values is not None:
+                    results[group[j]] = values
+            if not failures:
+                continue
+            logger.warning("%s of %s items failed validation (%s)", len(failures), len(sources),
+                           ", ".join(sorted(set(failures.values()))))
+            if repair < structured.repair_rounds():
+                groups.append(([group[j] for j in sorted(failures)], repair + 1, bisected))
+            else:
+                for j, reason in failures.items():
+                    self.record_failure([sources[j]], reason)
+        return results
+
+    def record_failure(self, sources: List[str], reason: str):
+        """Mark sources as given up on (they come back untranslated) with the reason."""
+        self.validation.gave_up(len(sources))
+        with self._calls_lock:
+            for source in sources:
+                self._failures[source] = reason
+
+    def thread_usage(self) -> Tuple[int, int]:
+        """Requests sent and tokens billed (prompt + completion) so far by the calling thread."""
+        return getattr(self._thread_usage, "calls", 0), getattr(self._thread_usage, "tokens", 0)
+
+    def count_usage(self, requests: int, usage: Dict[str, int]):
+        """Add requests sent and tokens used outside _request (Batch API jobs)."""
+        with self._calls_lock:
+            self.api_calls += requests
+            for name, tokens in usage.items():
+                self.usage[name] = self.usage.get(name, 0) + tokens
+
+    def take_failure(self, source: str) -> Optional[str]:
+        """Why source came back untranslated (None if it did not fail here); forgets it."""
+        with self._calls_lock:
+            return self._failures.pop(source, None)
+
+    def _translate_single_batch(self, batch_info: Tuple[int, List[str], str]) -> Tuple[int, List[str]]:
+        batch_idx, batch_texts, target_language = batch_info
+        results = self._translate_structured(batch_texts, self.system_prompt([target_language]), target_language)
+        return (batch_idx, [values[structured.TEXT_FIELD] if values else text
+                            for values, text in zip(results, batch_texts)])
+
+    def translate_chunk_multi(self, texts: List[str], languages: List[str]) -> List[Dict[str, str]]:
+        """One request translating texts into every language (multilang); cached texts are not sent."""
+        if not texts:
+            return []
+        prompt = self.system_prompt(languages)
+        results: List[Dict[str, str]] = [{} for _ in texts]
+        keys = {lang: [cache_key(self.model, prompt, lang, text) for text in texts] for lang in languages}
+        if self.cache is not None:
+            for lang in languages:
+                found = self.cache.get_many(keys[lang])
+                for i, key in enumerate(keys[lang]):
+                    if key in found:
+                        results[i][lang] = found[key]
+        missing = [i for i, translations in enumerate(results) if len(translations) < len(languages)]
+        if not missing:
+            return results
+        sources = [texts[i] for i in missing]
+        fresh = self._translate_structured(sources, prompt, languages, languages)
+        new_entries = []
+        for i, translations in zip(missing, fresh):
+            translations = translations or {lang: texts[i] for lang in languages}
+            for lang, translated in translations.items():
+                results[i].setdefault(lang, translated)
+                if translated.strip() != texts[i].strip():
+                    new_entries.append((keys[lang][i], translated))
+        if self.cache is not None:
+            self.cache.put_many(new_entries)
+        return results
 
     def translate_batch(self, texts: List[str], target_language: str) -> List[str]:
+        """Translate texts in order; cached texts are not sent."""
+        if not texts:
+            return []
+        return translate_cached(self.cache, self.model, self.system_prompt([target_language]), target_language, texts,
+                                lambda missing: self._translate_batches(missing, target_language))
+
+    def translate_chunk(self, texts: List[str], target_language: str) -> List[str]:
+        """One packed request's worth of texts (see budget.pack); cached texts are not sent."""
+        if not texts:
+            return []
+        return translate_cached(self.cache, self.model, self.system_prompt([target_language]), target_language, texts,
+                                lambda missing: self._translate_single_batch((0, missing, target_language))[1])
+
+    def _translate_batches(self, texts: List[str], target_language: str) -> List[str]:
         if not texts:
             return []
-        lang_name = self.lang_names.get(target_language, target_language.capitalize())
-        batch_size = min(15, max(1, int(os.getenv("OPENAI_BATCH_SIZE", "12"))))
-        delay_sec = float(os.getenv("OPENAI_DELAY_SEC", "2.0"))
-        parallel = min(6, max(1, int(os.getenv("OPENAI_PARALLEL_REQUESTS", "2"))))
+        batch_infos = [(i, texts[part], target_language)
+                       for i, part in enumerate(self.budget.pack(texts, target_language))]
+        # All batches are submitted at once; the limiter decides how many run and how fast
+        results = [None] * len(batch_infos)
+        with ThreadPoolExecutor(max_workers=min(len(batch_infos), self.limiter.max_concurrency)) as ex:
+            futures = [ex.submit(self._translate_single_batch, info) for info in batch_infos]
+            for fut in as_completed(futures):
+                batch_idx, batch_result = fut.result()
+                results[batch_idx] = batch_result
         translated = []
-        batch_infos = []
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i : i + batch_size]
-            batch_infos.append((i // batch_size, batch_texts, lang_name))
-        if parallel <= 1:
-            for batch_info in batch_infos:
-                _, batch_result = self._translate_single_batch(batch_info)
-                translated.extend(batch_result)
-                if batch_info[0] < len(batch_infos) - 1:
-                    time.sleep(delay_sec)
-            return translated
-        round_delay = delay_sec
-        for round_start in range(0, len(batch_infos), parallel):
-            chunk = batch_infos[round_start : round_start + parallel]
-            with ThreadPoolExecutor(max_workers=len(chunk)) as ex:
-                futures = {ex.submit(self._translate_single_batch, info): info for info in chunk}
-                results = []
-                for fut in as_completed(futures):
-                    batch_idx, batch_result = fut.result()
-                    results.append((batch_idx, batch_result))
-            results.sort(key=lambda x: x[0])
-            for _, batch_result in results:
-                translated.extend(batch_result)
-            if round_start + len(chunk) < len(batch_infos):
-                time.sleep(round_delay)
+        for batch_result in results:
+            translated.extend(batch_result)
         return translated
@@ -0,0 +1,35 @@
+"""
+Arabic text normalization for matching (search, n-gram index, dedup).
+
+The arabic field is fully vocalized and spaced irregularly, so text is
+compared only after:
+    1. harakat, Quranic marks and tatweel are removed
+    2. alef forms (آ أ إ ٱ) become ا, alef maqsura ى becomes ي and
+       ta marbuta ة becomes ه
+    3. runs of whitespace collapse to a single space
+Non-Arabic characters pass through unchanged.
+"""
+import re
+
+# Harakat/tanween/shadda/sukun, Quranic annotation marks, superscript alef, tatweel
+_MARKS = re.compile(r'[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06dc\u06df-\u06e8\u06ea-\u06ed\u0640]')
+_LETTERS = str.maketrans({
+    '\u0622': '\u0627',  # آ -> ا
+    '\u0623': '\u0627',  # أ -> ا
+    '\u0625': '\u0627',  # إ -> ا
+    '\u0671': '\u0627',  # ٱ -> ا
+    '\u0649': '\u064a',  # ى -> ي
+    '\u0629': '\u0647',  # ة -> ه
+})
+_WHITESPACE = re.compile(r'\s+')
+
+
+def strip_harakat(text: str) -> str:
+    """Remove diacritics and tatweel only"""
+    return _MARKS.sub('', text or "")
+
+
+def normalize_arabic(text: str) -> str:
+    """Full pipeline: strip marks, unify letter forms, collapse whitespace"""
+    text = strip_harakat(text).translate(_LETTERS)
+    return _WHITESPACE.sub(' ', text).strip()
@@ -0,0 +1,327 @@
+"""
+OpenAI Batch API mode: a whole language as asynchronous batch jobs.
+
+Batch jobs have their own, much larger rate limits and cost half as much as
+synchronous chat calls; results come back within 24 hours. For a full
+language (50,884 hadiths) that is the cheaper and faster route. One pass of
+run() does whatever is due:
+
+    poll     refresh the status of every submitted job
+    ingest   for a finished job, download its output file, validate every
+             item (structured.validate) and commit the translations through
+             the runner exactly as synchronous mode does (HadithTranslation
+             rows or all_translations.json, checkpoint, LLM cache). Hadiths
+             translated since the job was prepared are skipped and an
+             ingested job is never read again, so ingesting twice changes
+             nothing. Items failing validation are dead-lettered; items of a
+             failed request stay pending for the next round
+    prepare  when no job is outstanding, cut the pending plan (dedup, token
+             budget packing) into requests, dead letters one per request,
+             and write JSONL request files of at most MAX_FILE_REQUESTS
+             lines / MAX_FILE_BYTES
+    submit   upload each file (purpose "batch") and create its job
+
+With wait, run() repeats (BATCH_POLL_SEC apart) until every job is ingested
+or stop_event is set, preparing at most MAX_ROUNDS rounds. Job state is kept
+in <checkpoints>/<language>_batch_jobs.json, request files in
+<checkpoints>/batch/.
+
+Settings (environment):
+    OPENAI_BASE_URL  API endpoint, read by the OpenAI client; for a dry run
+                     against the local stand-in (python -m translator.batch_standin):
+                     http://127.0.0.1:8089/v1
+    BATCH_POLL_SEC   seconds between polls with --wait (default 60)
+
+    python -m translator.batch_api <language|lang,lang,...> [--wait] [--no-submit]
+"""
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+from . import structured
+from .llm_cache import cache_key
+from .pipeline import plan_batches
+from .serialization import COMPACT, dump, load
+
+logger = logging.getLogger("hadith.batch_api")
+
+ENDPOINT = "/v1/chat/completions"
+# The API accepts up to 50,000 requests and 200 MB per input file
+MAX_FILE_REQUESTS = 50_000
+MAX_FILE_BYTES = 190 * 1024 * 1024
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+DEFAULT_POLL_SEC = 60
+MAX_ROUNDS = 3
+# Texts per pipeline batch when replaying ingested translations (no requests are sent)
+REPLAY_SLICE = 500
+
+
+class Replay(NamedTuple):
+    """Translations paid for by Batch API jobs, keyed by plan text key (str, or {language: str})"""
+    translations: Dict[str, Any]
+    requests: int
+    usage: Dict[str, int]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _line(custom_id: int, body: Dict) -> bytes:
+    """One request of an input file; custom_id is the request's index in its file"""
+    return json.dumps({"custom_id": str(custom_id), "method": "POST", "url": ENDPOINT, "body": body},
+                      ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class BatchJobs:
+    """Job records of one language (label) in a JSON file next to its checkpoint"""
+
+    def __init__(self, checkpoints_dir: Path, label: str):
+        self.path = Path(checkpoints_dir) / f"{label}_batch_jobs.json"
+        self.files_dir = Path(checkpoints_dir) / "batch"
+        self.label = label
+        self.jobs: List[Dict] = load(self.path)["jobs"] if self.path.exists() else []
+
+    def save(self):
+        dump({"jobs": self.jobs}, self.path, COMPACT)
+
+    def outstanding(self) -> List[Dict]:
+        return [job for job in self.jobs if not job.get("ingested")]
+
+    def prepare(self, translator, requests: List[List[str]], texts: Dict[str, str], languages: List[str]) -> List[Dict]:
+        """Write request files for requests (lists of plan keys); returns the new jobs"""
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        multi = len(languages) > 1
+        target = tuple(languages) if multi else languages[0]
+        # The prompt synchronous mode sends, so the LLM cache keys match
+        prompt = translator.system_prompt(languages)
+        prompt_cache_key = translator.prompts.cache_key(languages)
+        response_format = structured.response_format(languages if multi else None)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        new: List[Dict] = []
+        job, out = None, None
+        for keys in requests:
+            sources = [texts[key] for key in keys]
+            body = {
+                "model": translator.model,
+                "messages": [
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": structured.number_texts(sources)},
+                ],
+                "temperature": 0.3,
+                "max_tokens": translator.budget.max_tokens(sources, target),
+                "response_format": response_format,
+            }
+            if prompt_cache_key:
+                body["prompt_cache_key"] = prompt_cache_key
+            line = _line(job["requests"] if job else 0, body)
+            if job is None or job["requests"] >= MAX_FILE_REQUESTS or job["bytes"] + len(line) > MAX_FILE_BYTES:
+                if out:
+                    out.close()
+                path = self.files_dir / f"{self.label}_{stamp}_{len(new)}.jsonl"
+                job = {"file": str(path), "requests": 0, "bytes": 0, "keys": {}, "status": "prepared",
+                       "prepared_at": _now(), "ingested": False}
+                new.append(job)
+                out = open(path, "wb")
+                line = _line(0, body)
+            out.write(line)
+            job["keys"][str(job["requests"])] = keys
+            job["requests"] += 1
+            job["bytes"] += len(line)
+        if out:
+            out.close()
+        self.jobs.extend(new)
+        self.save()
+        return new
+
+
+def submit(client, job: Dict, label: str):
+    with open(job["file"], "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h",
+                                  metadata={"language": label})
+    job.update(input_file_id=uploaded.id, batch_id=batch.id, status=batch.status, submitted_at=_now())
+    logger.info("submitted %s (%s requests) as %s", job["file"], job["requests"], batch.id)
+
+
+def poll(client, job: Dict):
+    batch = client.batches.retrieve(job["batch_id"])
+    counts = getattr(batch, "request_counts", None)
+    job.update(status=batch.status, output_file_id=batch.output_file_id, error_file_id=batch.error_file_id,
+               request_counts={"total": counts.total, "completed": counts.completed, "failed": counts.failed}
+               if counts is not None else None)
+
+
+def _download(client, file_id: str) -> List[Dict]:
+    if not file_id:
+        return []
+    return [json.loads(line) for line in client.files.content(file_id).text.splitlines() if line.strip()]
+
+
+def collect(translator, job: Dict, sources: Dict[str, str], languages: List[str]) -> Replay:
+    """
+    Validated translations of a finished job, for the keys still pending (sources)
+
+    An item failing validation is returned as its source (the runner
+    dead-letters it, with the reason recorded on the translator); items of a
+    request that failed are left out and stay pending.
+    """
+    multi = len(languages) > 1
+    fields = languages if multi else None
+    target = tuple(languages) if multi else languages[0]
+    prompt = translator.system_prompt(languages)
+    translations: Dict[str, Any] = {}
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    cached = []
+    records = _download(translator.client, job.get("output_file_id"))
+    errors = _download(translator.client, job.get("error_file_id"))
+    failed_requests = len(errors)
+    for record in records:
+        keys = job["keys"].get(record.get("custom_id"))
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if keys is None or record.get("error") or response.get("status_code") != 200 or not body.get("choices"):
+            failed_requests += 1
+            continue
+        reported = body.get("usage") or {}
+        usage["prompt_tokens"] += reported.get("prompt_tokens") or 0
+        usage["completion_tokens"] += reported.get("completion_tokens") or 0
+        usage["cached_tokens"] += (reported.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        texts = [sources.get(key, "") for key in keys]
+        choice = body["choices"][0]
+        truncated = choice.get("finish_reason") == "length"
+        translator.budget.observe(texts, target, reported.get("completion_tokens"), truncated)
+        values, failures = structured.validate((choice.get("message") or {}).get("content") or "", texts, fields)
+        translator.validation.record(len(texts), failures, resent=False)
+        for i, (key, text) in enumerate(zip(keys, texts)):
+            if key not in sources:
+                continue
+            if values[i] is None:
+                translator.record_failure([text], failures.get(i, "missing"))
+                translations[key] = {lang: text for lang in languages} if multi else text
+                continue
+            translations[key] = values[i] if multi else values[i][structured.TEXT_FIELD]
+            for lang in languages:
+                cached.append((cache_key(translator.model, prompt, lang, text), values[i][lang if multi else structured.TEXT_FIELD]))
+    if translator.cache is not None:
+        translator.cache.put_many(cached)
+    if failed_requests:
+        logger.warning("job %s: %s requests failed, their hadiths stay pending", job.get("batch_id"), failed_requests)
+    return Replay(translations, len(records) + len(errors), usage)
+
+
+def _pending(runner, languages: List[str]):
+    processed = set.intersection(*(set(runner.load_checkpoint(lang).get("processed_hadiths", []))
+                                   for lang in languages))
+    return runner.pending_plan(languages, processed)
+
+
+def run(runner, languages: List[str], wait: bool = False, submit_jobs: bool = True) -> Dict:
+    """
+    One pass (or, with wait, passes until done) of poll / ingest / prepare / submit
+
+    Returns:
+        {"language", "jobs": [job summaries], "ingested": [runner results],
+         "stop_reason"}
+    """
+    unknown = [lang for lang in languages if lang not in runner.translator.lang_names]
+    if not languages or unknown:
+        return {"error": f"Unknown language: {', '.join(unknown)}"}
+    label = "+".join(languages)
+    translator = runner.translator
+    client = translator.client
+    jobs = BatchJobs(runner.checkpoints_dir, label)
+    poll_sec = float(os.getenv("BATCH_POLL_SEC", DEFAULT_POLL_SEC))
+    ingested: List[Dict] = []
+    rounds = 0
+    stop_reason = "completed"
+    while True:
+        for job in jobs.outstanding():
+            if runner.stop_event.is_set():
+                break
+            if not job.get("batch_id"):
+                if submit_jobs:
+                    submit(client, job, label)
+                    jobs.save()
+                continue
+            if job["status"] not in TERMINAL:
+                poll(client, job)
+                jobs.save()
+            if job["status"] not in TERMINAL:
+                continue
+            plan, _ = _pending(runner, languages)
+            replay = collect(translator, job, plan.texts, languages)
+            logger.info("ingesting %s: %s translations from %s requests", job["batch_id"],
+                        len(replay.translations), replay.requests)
+            result = runner._run(languages, replay=replay)
+            ingested.append(result)
+            if result.get("stop_reason") != "completed":
+                # Committed chapters stay committed; the rest is ingested again next time
+                stop_reason = result.get("stop_reason") or "error"
+                break
+            job.update(ingested=True, ingested_at=_now())
+            jobs.save()
+        if stop_reason != "completed" or runner.stop_event.is_set():
+            stop_reason = stop_reason if stop_reason != "completed" else "user_stop"
+            break
+        if not jobs.outstanding() and rounds < MAX_ROUNDS and (wait or rounds == 0):
+            plan, dead_keys = _pending(runner, languages)
+            if not plan.texts:
+                break
+            dead_plan = plan.split(dead_keys)
+            target = tuple(languages) if len(languages) > 1 else languages[0]
+            requests: List[List[str]] = [batch.keys for batch in plan_batches(
+                plan.chapters(), plan.texts, lambda texts: translator.budget.pack(texts, target, record=False),
+                lambda texts: translator.budget.record(texts, target))]
+            # Dead letters go one per request, so they cannot fail anything else
+            requests += [[key] for key in dead_plan.texts]
+            texts = dict(plan.texts, **dead_plan.texts)
+            new = jobs.prepare(translator, requests, texts, languages)
+            rounds += 1
+            logger.info("prepared %s requests for %s texts in %s files", len(requests), len(texts), len(new))
+            if submit_jobs:
+                for job in new:
+                    submit(client, job, label)
+                    jobs.save()
+        if not wait or not jobs.outstanding() or not submit_jobs:
+            break
+        runner.stop_event.wait(poll_sec)
+    return {
+        "language": label,
+        "jobs": [{k: job.get(k) for k in ("file", "batch_id", "status", "requests", "request_counts", "ingested")}
+                 for job in jobs.jobs],
+        "ingested": ingested,
+        "outstanding": len(jobs.outstanding()),
+        "stop_reason": stop_reason,
+    }
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+    from .runner import TranslationRunner
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    languages = args[0].split(",") if args else []
+    if not languages or any(lang not in config.LANGUAGES for lang in languages):
+        print(f"Usage: python -m translator.batch_api <{'|'.join(config.LANGUAGES)}>[,...] [--wait] [--no-submit]")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    runner = TranslationRunner()
+    result = runner.run_batch(languages, wait="--wait" in sys.argv, submit="--no-submit" not in sys.argv)
+    for job in result["jobs"]:
+        state = "ingested" if job["ingested"] else job["status"]
+        print(f"📦 {Path(job['file']).name}: {job['requests']:,} requests, {job['batch_id'] or '-'} {state}")
+    for done in result["ingested"]:
+        print(f"✅ ingested: total_translated={done.get('total_translated')} ({done.get('stop_reason')})")
+    print(f"{result['outstanding']} jobs outstanding ({result['stop_reason']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Local stand-in for the OpenAI Files and Batches endpoints.
+
+Enough of the API for batch_api to run end to end without a key or cost:
+
+    POST /v1/files                  upload (multipart, purpose "batch")
+    GET  /v1/files/<id>/content     download
+    POST /v1/batches                create a job from an uploaded file
+    GET  /v1/batches/<id>           job status
+
+A job is "in_progress" for --delay seconds, then "completed". Each request
+is answered with a structured reply whose translations are the source text
+prefixed with "[<field>] " (so results are recognisable); --fail-rate makes
+that share of requests fail (error file) and --drop-rate leaves out that
+share of items in a reply (they fail validation).
+
+    python -m translator.batch_standin [--port 8089] [--delay 2] [--fail-rate 0] [--drop-rate 0]
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=test python -m translator.batch_api turkish --wait
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .structured import SEPARATOR, TEXT_FIELD
+
+_MARKER = re.compile(r'^\[(\d+)\] ', re.S)
+
+
+class StandIn:
+    """In-memory files and batch jobs"""
+
+    def __init__(self, delay: float = 2.0, fail_rate: float = 0.0, drop_rate: float = 0.0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, data: bytes, filename: str, purpose: str) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+        with self.lock:
+            self.files[file_id] = {"meta": meta, "data": data}
+        return meta
+
+    def create_batch(self, input_file_id: str, endpoint: str, metadata: Optional[Dict]) -> Optional[Dict]:
+        with self.lock:
+            if input_file_id not in self.files:
+                return None
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            batch = {"id": batch_id, "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+                     "completion_window": "24h", "status": "in_progress", "created_at": int(time.time()),
+                     "output_file_id": None, "error_file_id": None, "metadata": metadata,
+                     "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+            self.batches[batch_id] = batch
+        threading.Timer(self.delay, self._complete, (batch_id,)).start()
+        return batch
+
+    def _complete(self, batch_id: str):
+        with self.lock:
+            batch = self.batches[batch_id]
+            lines = self.files[batch["input_file_id"]]["data"].decode("utf-8").splitlines()
+        outputs, errors = [], []
+        for line in lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if random.random() < self.fail_rate:
+                errors.append({"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": request["custom_id"],
+                               "response": None, "error": {"code": "server_error", "message": "stand-in failure"}})
+                continue
+            outputs.append({"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": request["custom_id"],
+                            "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                         "body": self._reply(request["body"])}, "error": None})
+        output = self.add_file(_jsonl(outputs), "batch_output.jsonl", "batch_output") if outputs else None
+        error = self.add_file(_jsonl(errors), "batch_errors.jsonl", "batch_output") if errors else None
+        with self.lock:
+            batch.update(status="completed", completed_at=int(time.time()),
+                         output_file_id=output["id"] if output else None, error_file_id=error["id"] if error else None,
+                         request_counts={"total": len(outputs) + len(errors), "completed": len(outputs),
+                                         "failed": len(errors)})
+
+    def _reply(self, body: Dict) -> Dict:
+        """A chat completion answering the numbered texts with marked copies"""
+        messages = body.get("messages") or []
+        user = messages[-1]["content"] if messages else ""
+        fmt = body.get("response_format") or {}
+        schema = (fmt.get("json_schema") or {}).get("schema") or {}
+        required = (((schema.get("properties") or {}).get("items") or {}).get("items") or {}).get("required")
+        fields: List[str] = [f for f in (required or []) if f != "id"] or [TEXT_FIELD]
+        items = []
+        for part in user.split(SEPARATOR):
+            match = _MARKER.match(part)
+            if not match or random.random() < self.drop_rate:
+                continue
+            text = part[match.end():]
+            item = {"id": int(match.group(1))}
+            item.update({field: f"[{field}] {text}" for field in fields})
+            items.append(item)
+        content = json.dumps({"items": items}, ensure_ascii=False)
+        return {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": len(user) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(user) + len(content)) // 4}}
+
+
+def _jsonl(records: List[Dict]) -> bytes:
+    return b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records)
+
+
+def make_handler(state: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body, content_type: str = "application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            self._send(404, {"error": {"message": f"no route {self.path}", "type": "invalid_request_error"}})
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            if self.path.rstrip("/") == "/v1/files":
+                head = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+                message = BytesParser(policy=HTTP).parsebytes(head + self._body())
+                fields, upload, filename = {}, b"", "input.jsonl"
+                for part in message.iter_parts():
+                    name = part.get_param("name", header="content-disposition")
+                    if name == "file":
+                        upload = part.get_payload(decode=True) or b""
+                        filename = part.get_filename() or filename
+                    else:
+                        fields[name] = (part.get_payload(decode=True) or b"").decode("utf-8")
+                self._send(200, state.add_file(upload, filename, fields.get("purpose", "batch")))
+            elif self.path.rstrip("/") == "/v1/batches":
+                request = json.loads(self._body() or b"{}")
+                batch = state.create_batch(request.get("input_file_id"), request.get("endpoint"),
+                                           request.get("metadata"))
+                if batch is None:
+                    self._send(400, {"error": {"message": "unknown input_file_id", "type": "invalid_request_error"}})
+                else:
+                    self._send(200, batch)
+            else:
+                self._not_found()
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            with state.lock:
+                if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in state.batches:
+                    body, content_type = dict(state.batches[parts[2]]), "application/json"
+                elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" \
+                        and parts[2] in state.files:
+                    body, content_type = state.files[parts[2]]["data"], "application/octet-stream"
+                else:
+                    body = None
+            if body is None:
+                self._not_found()
+            else:
+                self._send(200, body, content_type)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI Files/Batches API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds before a job completes")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of items left out of replies")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(StandIn(args.delay, args.fail_rate, args.drop_rate)))
+    print(f"🧪 Batch API stand-in on http://127.0.0.1:{args.port}/v1 (delay {args.delay}s, "
+          f"fail {args.fail_rate:.0%}, drop {args.drop_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
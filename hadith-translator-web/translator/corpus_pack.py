@@ -0,0 +1,448 @@
+"""
+Compact binary columnar corpus (corpus.pack).
+
+Layout (native byte order, recorded in the header):
+    b"HDPK" | u32 version | u32 header_len | header (JSON) | sections...
+
+The header lists the books and, per chapter file, its metadata, row range
+and the size and mtime_ns of the JSON file it was built from. Opening the
+pack stats those files: chapters changed since the build (add_turkish.py
+rewrites them in place) are read from JSON instead, with a warning to
+rebuild.
+Sections are 8-byte aligned:
+    id, idInBook, chapterId, bookId, book   int32[count] (chapterId None -> INT32_MIN)
+    arabic, narrator, text, extra           u64 offsets[count + 1] + UTF-8 blob
+                                            (extra: other hadith keys as JSON)
+    slots                                   int32[size] open-addressing table
+                                            over (book, chapterId, id) -> row
+
+Reading memory-maps the file; fetching a hadith is a hash probe plus a few
+slices, with no JSON parsing.
+
+Build:
+    python -m translator.corpus_pack [books_dir] [pack_path]
+"""
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .corpus import Corpus
+from .jsonstream import project
+
+logger = logging.getLogger("hadith.corpus_pack")
+
+MAGIC = b"HDPK"
+PACK_VERSION = 2
+PACK_NAME = "corpus.pack"
+
+INT_COLUMNS = ["id", "idInBook", "chapterId", "bookId", "book"]
+STRING_COLUMNS = ["arabic", "narrator", "text", "extra"]
+BASE_KEYS = {"id", "idInBook", "chapterId", "bookId", "arabic", "english"}
+NULL_INT = -2 ** 31
+EMPTY_SLOT = -1
+
+# Projectable fields that map straight onto a column
+FIELD_COLUMNS = {
+    "id": "id",
+    "idInBook": "idInBook",
+    "chapterId": "chapterId",
+    "bookId": "bookId",
+    "arabic": "arabic",
+    "english.narrator": "narrator",
+    "english.text": "text",
+}
+
+
+def _slot_hash(book: int, chapter_id: int, hadith_id: int, mask: int) -> int:
+    h = (book * 0x9E3779B1) ^ (chapter_id * 0x85EBCA77) ^ (hadith_id * 0xC2B2AE3D)
+    h ^= h >> 15
+    return h & mask
+
+
+def _int(value) -> int:
+    return NULL_INT if value is None else int(value)
+
+
+def _file_stamp(path: Path) -> Optional[List[int]]:
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def default_pack_path(books_dir: Path) -> Path:
+    """corpus.pack next to the books directory (overridable with CORPUS_PACK_PATH)"""
+    env = os.getenv("CORPUS_PACK_PATH")
+    return Path(env) if env else Path(books_dir).parent / PACK_NAME
+
+
+def write_sections(path: Path, magic: bytes, version: int, header: Dict, sections: List) -> int:
+    """
+    Write magic | u32 version | u32 header_len | header JSON | 8-byte aligned sections
+
+    header gets "byteorder" and "sections" ({name: [offset, length]}) added.
+    The file is written to a temporary name and renamed into place.
+
+    Returns:
+        Bytes written
+    """
+    path = Path(path)
+    header = dict(header, byteorder=sys.byteorder)
+    # Section offsets depend on the header length, so lay them out relative to
+    # the end of the header and fix up once its size is known.
+    relative = 0
+    layout = []
+    for name, blob in sections:
+        layout.append((name, relative, len(blob)))
+        relative += len(blob)
+        relative += -relative % 8
+    header_len = 0
+    while True:
+        base = 12 + header_len
+        base += -base % 8
+        header["sections"] = {name: [base + off, length] for name, off, length in layout}
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(header_bytes) == header_len:
+            break
+        header_len = len(header_bytes)
+    padding = base - 12 - header_len
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(magic)
+        f.write(array('I', [version, len(header_bytes)]).tobytes())
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        for name, blob in sections:
+            f.write(blob)
+            f.write(b"\0" * (-f.tell() % 8))
+        written = f.tell()
+    os.replace(tmp_path, path)
+    return written
+
+
+class SectionFile:
+    """Memory-mapped file written by write_sections()"""
+
+    def __init__(self, path: Path, magic: bytes, version: int):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        if self._mm[:4] != magic:
+            self.close()
+            raise ValueError(f"Bad magic in {self.path}")
+        found, header_len = memoryview(self._mm)[4:12].cast('I')
+        if found != version:
+            self.close()
+            raise ValueError(f"Unsupported version {found}: {self.path}")
+        self.header = json.loads(self._mm[12:12 + header_len].decode('utf-8'))
+        if self.header["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError(f"{self.path} was built on a {self.header['byteorder']}-endian host")
+
+    def section(self, name: str, fmt: str = None) -> memoryview:
+        """Section as a memoryview, cast to an array format ('i', 'I', 'Q', ...) if given"""
+        offset, length = self.header["sections"][name]
+        view = memoryview(self._mm)[offset:offset + length]
+        if fmt:
+            view = view.cast(fmt)
+        self._views.append(view)
+        return view
+
+    def find(self, name: str, sub: bytes, start: int, end: int) -> int:
+        """Offset of sub within section bytes [start, end), or -1"""
+        base = self.header["sections"][name][0]
+        found = self._mm.find(sub, base + start, base + end)
+        return found - base if found >= 0 else -1
+
+    def close(self):
+        for view in getattr(self, "_views", []):
+            view.release()
+        self._views = []
+        if getattr(self, "_mm", None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Slices handed out to callers still point into the map
+                pass
+            self._mm = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_pack(books_dir: Path, pack_path: Path = None) -> Dict:
+    """
+    Pack every hadith under books_dir into pack_path
+
+    Returns:
+        Dict with count, books and bytes written
+    """
+    books_dir = Path(books_dir)
+    pack_path = Path(pack_path) if pack_path else default_pack_path(books_dir)
+    corpus = Corpus(books_dir, cache_size=0, use_pack=False)
+
+    ints = {name: array('i') for name in INT_COLUMNS}
+    strings = {name: bytearray() for name in STRING_COLUMNS}
+    offsets = {name: array('Q', [0]) for name in STRING_COLUMNS}
+    books = []
+    row = 0
+    for book_index, book_id in enumerate(corpus.book_ids()):
+        chapters = []
+        book_path = corpus.book_path(book_id)
+        for chapter_file in corpus.chapter_files(book_id):
+            # Stat before reading: a file rewritten meanwhile then shows as stale
+            stamp = _file_stamp(book_path / chapter_file)
+            data = corpus.load_chapter(book_id, chapter_file)
+            if data is None:
+                continue
+            start = row
+            for hadith in data.get('hadiths', []):
+                english = hadith.get('english') or {}
+                extra = {k: v for k, v in hadith.items() if k not in BASE_KEYS}
+                ints["id"].append(_int(hadith.get('id')))
+                ints["idInBook"].append(_int(hadith.get('idInBook')))
+                ints["chapterId"].append(_int(hadith.get('chapterId')))
+                ints["bookId"].append(_int(hadith.get('bookId')))
+                ints["book"].append(book_index)
+                for name, value in (("arabic", hadith.get('arabic')),
+                                    ("narrator", english.get('narrator')),
+                                    ("text", english.get('text')),
+                                    ("extra", json.dumps(extra, ensure_ascii=False) if extra else "")):
+                    strings[name] += (value or "").encode('utf-8')
+                    offsets[name].append(len(strings[name]))
+                row += 1
+            chapters.append({
+                "file": chapter_file,
+                "start": start,
+                "end": row,
+                "metadata": data.get('metadata', {}),
+                "chapter": data.get('chapter'),
+                "stamp": stamp,
+            })
+        books.append({
+            "id": book_id,
+            "category": corpus.category(book_id),
+            "path": book_path.relative_to(books_dir).as_posix(),
+            "chapters": chapters,
+        })
+
+    # Open-addressing table, load factor <= 0.5
+    size = 1
+    while size < 2 * max(row, 1):
+        size <<= 1
+    mask = size - 1
+    slots = array('i', [EMPTY_SLOT]) * size
+    for r in range(row):
+        chapter_id = ints["chapterId"][r]
+        i = _slot_hash(ints["book"][r], 0 if chapter_id == NULL_INT else chapter_id, ints["id"][r], mask)
+        while slots[i] != EMPTY_SLOT:
+            i = (i + 1) & mask
+        slots[i] = r
+
+    sections = []
+    for name in INT_COLUMNS:
+        sections.append((name, ints[name].tobytes()))
+    for name in STRING_COLUMNS:
+        sections.append((f"{name}.offsets", offsets[name].tobytes()))
+        sections.append((f"{name}.data", bytes(strings[name])))
+    sections.append(("slots", slots.tobytes()))
+
+    header = {"version": PACK_VERSION, "count": row, "slots": size, "books": books}
+    written = write_sections(pack_path, MAGIC, PACK_VERSION, header, sections)
+    return {"path": str(pack_path), "count": row, "books": len(books), "bytes": written}
+
+
+class CorpusPack:
+    """Memory-mapped reader for corpus.pack"""
+
+    def __init__(self, pack_path: Path, books_dir: Path = None):
+        """
+        Map the pack
+
+        Args:
+            pack_path: corpus.pack
+            books_dir: Books directory it was built from; its chapter files
+                are stat'ed and those changed since the build are not served
+        """
+        self.pack_path = Path(pack_path)
+        self._sections = SectionFile(self.pack_path, MAGIC, PACK_VERSION)
+        self.header = self._sections.header
+        self.count = self.header["count"]
+        self._mask = self.header["slots"] - 1
+        section = self._sections.section
+        self._ints = {name: section(name, 'i') for name in INT_COLUMNS}
+        self._offsets = {name: section(f"{name}.offsets", 'Q') for name in STRING_COLUMNS}
+        self._data = {name: section(f"{name}.data") for name in STRING_COLUMNS}
+        self._slots = section("slots", 'i')
+        self._book_index = {b["id"]: i for i, b in enumerate(self.header["books"])}
+        self._chapters = {
+            (b["id"], ch["file"]): ch for b in self.header["books"] for ch in b["chapters"]
+        }
+        self.stale = set()
+        if books_dir is not None:
+            books_dir = Path(books_dir)
+            for b in self.header["books"]:
+                for ch in b["chapters"]:
+                    if _file_stamp(books_dir / b["path"] / ch["file"]) != ch["stamp"]:
+                        self.stale.add((b["id"], ch["file"]))
+        # Books with a stale chapter: single-hadith lookups skip the pack for them
+        self.stale_books = {book_id for book_id, _ in self.stale}
+
+    def close(self):
+        self._sections.close()
+
+    def book_ids(self) -> List[str]:
+        return [b["id"] for b in self.header["books"]]
+
+    def chapter_files(self, book_id: str) -> List[str]:
+        index = self._book_index.get(book_id)
+        if index is None:
+            return []
+        return [ch["file"] for ch in self.header["books"][index]["chapters"]]
+
+    def string(self, name: str, row: int) -> str:
+        """One string cell ('arabic', 'narrator', 'text' or 'extra')"""
+        offsets = self._offsets[name]
+        return bytes(self._data[name][offsets[row]:offsets[row + 1]]).decode('utf-8')
+
+    def value(self, name: str, row: int) -> Optional[int]:
+        """One int cell ('id', 'idInBook', 'chapterId' or 'bookId')"""
+        value = self._ints[name][row]
+        return None if value == NULL_INT else value
+
+    def find(self, book_id: str, chapter_id, hadith_id) -> Optional[int]:
+        """Row of (book, chapterId, id); chapterId None and 0 are the same key"""
+        book = self._book_index.get(book_id)
+        if book is None:
+            return None
+        try:
+            chapter_id = int(chapter_id or 0)
+            hadith_id = int(hadith_id)
+        except (TypeError, ValueError):
+            return None
+        books = self._ints["book"]
+        chapters = self._ints["chapterId"]
+        ids = self._ints["id"]
+        i = _slot_hash(book, chapter_id, hadith_id, self._mask)
+        while True:
+            row = self._slots[i]
+            if row == EMPTY_SLOT:
+                return None
+            stored = chapters[row]
+            if books[row] == book and ids[row] == hadith_id and (0 if stored == NULL_INT else stored) == chapter_id:
+                return row
+            i = (i + 1) & self._mask
+
+    def hadith(self, row: int, fields=None) -> Dict:
+        """
+        Hadith at row, in the chapter JSON shape
+
+        With fields (dotted paths, see jsonstream.project) only those columns
+        are decoded.
+        """
+        if fields is not None:
+            if not all(field in FIELD_COLUMNS for field in fields):
+                return project(self.hadith(row), fields)
+            hadith = {}
+            for field in fields:
+                column = FIELD_COLUMNS[field]
+                value = self.value(column, row) if column in self._ints else self.string(column, row)
+                if '.' in field:
+                    parent, name = field.split('.', 1)
+                    hadith.setdefault(parent, {})[name] = value
+                else:
+                    hadith[field] = value
+            return hadith
+        hadith = {
+            "id": self.value("id", row),
+            "idInBook": self.value("idInBook", row),
+            "chapterId": self.value("chapterId", row),
+            "bookId": self.value("bookId", row),
+            "arabic": self.string("arabic", row),
+            "english": {
+                "narrator": self.string("narrator", row),
+                "text": self.string("text", row),
+            },
+        }
+        extra = self.string("extra", row)
+        if extra:
+            hadith.update(json.loads(extra))
+        return hadith
+
+    def get(self, book_id: str, chapter_id, hadith_id) -> Optional[Dict]:
+        row = self.find(book_id, chapter_id, hadith_id)
+        return None if row is None else self.hadith(row)
+
+    def chapter_rows(self, book_id: str, chapter_file: str) -> Optional[range]:
+        """Rows of a chapter file, or None if it is not in the pack or changed since the build"""
+        entry = self._chapters.get((book_id, chapter_file))
+        if entry is None or (book_id, chapter_file) in self.stale:
+            return None
+        return range(entry["start"], entry["end"])
+
+    def chapter(self, book_id: str, chapter_file: str) -> Optional[Dict]:
+        """Chapter in the chapter JSON shape (metadata, chapter, hadiths); None when not served"""
+        entry = self._chapters.get((book_id, chapter_file))
+        if entry is None or (book_id, chapter_file) in self.stale:
+            return None
+        data = {
+            "metadata": entry["metadata"],
+            "hadiths": [self.hadith(row) for row in self.chapter_rows(book_id, chapter_file)],
+        }
+        if entry.get("chapter") is not None:
+            data["chapter"] = entry["chapter"]
+        return data
+
+
+_packs: Dict[tuple, Optional[CorpusPack]] = {}
+_packs_lock = threading.Lock()
+
+
+def open_pack(pack_path: Path, books_dir: Path = None) -> Optional[CorpusPack]:
+    """
+    Shared reader for pack_path, or None if the file does not exist or is unreadable
+    (packs of an older version included). With books_dir, chapters changed since
+    the build are marked stale (see CorpusPack).
+    """
+    key = Path(pack_path).resolve()
+    books_key = Path(books_dir).resolve() if books_dir is not None else None
+    with _packs_lock:
+        if (key, books_key) not in _packs:
+            pack = None
+            if key.is_file():
+                try:
+                    pack = CorpusPack(key, books_key)
+                except (OSError, ValueError, KeyError):
+                    pack = None
+                if pack is not None and pack.stale:
+                    logger.warning("%s: %d chapter files changed since it was built, read from JSON instead "
+                                   "(rebuild: python -m translator.corpus_pack)", key, len(pack.stale))
+            _packs[(key, books_key)] = pack
+        return _packs[(key, books_key)]
+
+
+def main():
+    if len(sys.argv) > 1:
+        books_dir = Path(sys.argv[1])
+    else:
+        _root = Path(__file__).resolve().parent.parent
+        if str(_root) not in sys.path:
+            sys.path.insert(0, str(_root))
+        import config
+        books_dir = config.BOOKS_DIR
+    pack_path = Path(sys.argv[2]) if len(sys.argv) > 2 else default_pack_path(books_dir)
+    stats = build_pack(books_dir, pack_path)
+    print(f"✅ {stats['path']}: {stats['count']:,} hadiths, {stats['books']} books, {stats['bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Dead-letter store for hadiths that keep failing to translate.
+
+When a request fails, the translator splits the batch in half and retries
+each half, down to single items. An item that still fails there (a content
+filter refusal, a text the model keeps echoing, ...) is recorded here,
+keyed by language and plan text key (dedup.text_key), with the reason and
+the number of attempts. The runner then leaves it out of the normal
+batches, so it cannot fail a whole batch again. After the main pass, the
+runner drains the letters recorded before the run by sending each one on
+its own. A success is committed like any other translation and its letter
+is removed. Letters for hadiths that no longer need translating are pruned.
+
+Settings (environment):
+    DEAD_LETTER_PATH   store file (default: dead_letters.sqlite in the
+                       checkpoints directory)
+
+List / clear:
+    python -m translator.dead_letter [language] [--clear]
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("hadith.dead_letter")
+
+STORE_NAME = "dead_letters.sqlite"
+# SQLite's default limit on bound parameters is 999
+_CHUNK = 500
+
+
+def default_store_path(directory: Path) -> Path:
+    """dead_letters.sqlite in directory (overridable with DEAD_LETTER_PATH)"""
+    env = os.getenv("DEAD_LETTER_PATH")
+    return Path(env) if env else Path(directory) / STORE_NAME
+
+
+class DeadLetters:
+    """SQLite-backed (language, text key) -> failed item, with the reason and attempt count"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS letters ("
+            "language TEXT NOT NULL, key TEXT NOT NULL, location TEXT NOT NULL, source TEXT NOT NULL, "
+            "reason TEXT NOT NULL, attempts INTEGER NOT NULL, first_failed REAL NOT NULL, "
+            "last_failed REAL NOT NULL, PRIMARY KEY (language, key))"
+        )
+        self._db.commit()
+
+    def add(self, language: str, items: Iterable[Tuple[str, str, str, str]]):
+        """Record failed (key, location, source, reason) items; a known key gets one more attempt"""
+        now = time.time()
+        rows = [(language, key, location, source, reason, now, now) for key, location, source, reason in items]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO letters VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (language, key) DO UPDATE SET reason = excluded.reason, "
+                "attempts = attempts + 1, last_failed = excluded.last_failed", rows)
+            self._db.commit()
+
+    def keys(self, language: str) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT key FROM letters WHERE language = ?", (language,))}
+
+    def remove(self, language: str, keys: Iterable[str]):
+        keys = list(keys)
+        with self._lock:
+            for i in range(0, len(keys), _CHUNK):
+                chunk = keys[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                self._db.execute(f"DELETE FROM letters WHERE language = ? AND key IN ({marks})", [language] + chunk)
+            self._db.commit()
+
+    def letters(self, language: str = None) -> List[Dict]:
+        query = "SELECT language, key, location, source, reason, attempts, first_failed, last_failed FROM letters"
+        args: Tuple = ()
+        if language:
+            query += " WHERE language = ?"
+            args = (language,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY language, first_failed", args).fetchall()
+        names = ("language", "key", "location", "source", "reason", "attempts", "first_failed", "last_failed")
+        return [dict(zip(names, row)) for row in rows]
+
+    def stats(self, language: str) -> Dict:
+        with self._lock:
+            rows = self._db.execute("SELECT reason, COUNT(*) FROM letters WHERE language = ? GROUP BY reason",
+                                    (language,)).fetchall()
+        return {"entries": sum(n for _, n in rows), "reasons": dict(rows)}
+
+    def clear(self, language: str = None):
+        with self._lock:
+            if language:
+                self._db.execute("DELETE FROM letters WHERE language = ?", (language,))
+            else:
+                self._db.execute("DELETE FROM letters")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[Path, DeadLetters] = {}
+_stores_lock = threading.Lock()
+
+
+def open_dead_letters(path: Path) -> Optional[DeadLetters]:
+    """Shared store for path, or None when it cannot be opened"""
+    key = Path(path).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            try:
+                _stores[key] = DeadLetters(key)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("dead-letter store disabled (%s): %s", key, e)
+                return None
+        return _stores[key]
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    language = args[0] if args else None
+    path = default_store_path(config.CHECKPOINTS_DIR)
+    if not path.exists():
+        print(f"❌ No dead letters at {path}")
+        sys.exit(1)
+    store = DeadLetters(path)
+    if '--clear' in sys.argv:
+        store.clear(language)
+        print(f"🗑️  Cleared {language or 'all languages'} in {path}")
+        return
+    letters = store.letters(language)
+    for letter in letters:
+        source = letter["source"][:70].replace("\n", " ")
+        print(f"📭 {letter['language']} {letter['location']}: {letter['reason']} x{letter['attempts']} — {source}")
+    print(f"{len(letters):,} dead letters in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Corpus-wide translation plan: each distinct English source text is sent to
+the API once.
+
+Many hadiths carry the same narrator + text in several books or chapters
+(Mishkat al-Masabih and Riyad as-Salihin repeat Bukhari and Muslim, some
+chapters repeat a hadith verbatim). The plan hashes the normalized source
+text (extract_hadith_text, Unicode NFC, whitespace collapsed) of every
+hadith not yet translated, keeps one text per hash and dispatches it from
+the chapter where it first appears; the translation is then fanned out to
+every (book, chapter, id) that shares the hash.
+
+Projected savings for a language (before running anything):
+    python -m translator.dedup <language>
+"""
+import hashlib
+import logging
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from .corpus import Corpus, composite_key, extract_hadith_text
+from .jsonstream import HADITH_FIELDS
+from .token_budget import TokenBudget
+
+logger = logging.getLogger("hadith.dedup")
+
+
+def normalize_source(text: str) -> str:
+    """NFC and collapsed whitespace; the text that is hashed"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(normalize_source(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranslationPlan:
+    """
+    Unique source texts grouped by the chapter that dispatches them.
+
+    targets[key] lists every hadith sharing the text as dicts with book_id,
+    chapter_file, id, chapterId and narrator (the fields the runner stores).
+    """
+
+    def __init__(self):
+        self.texts: Dict[str, str] = {}
+        self.targets: Dict[str, List[Dict]] = {}
+        self.dispatch: Dict[Tuple[str, str], List[str]] = {}
+        self.chapter_sizes: Dict[Tuple[str, str], int] = {}
+
+    def add(self, book_id: str, chapter_file: str, target: Dict, text: str):
+        key = text_key(text)
+        chapter = (book_id, chapter_file)
+        self.chapter_sizes[chapter] = self.chapter_sizes.get(chapter, 0) + 1
+        if key not in self.texts:
+            self.texts[key] = text
+            self.targets[key] = []
+            self.dispatch.setdefault(chapter, []).append(key)
+        self.targets[key].append(dict(target, book_id=book_id, chapter_file=chapter_file))
+
+    def chapters(self) -> Iterable[Tuple[str, str, List[str]]]:
+        """(book_id, chapter_file, keys) in corpus order, chapters with nothing new to send skipped"""
+        for (book_id, chapter_file), keys in self.dispatch.items():
+            yield book_id, chapter_file, keys
+
+    def key_chapters(self) -> Dict[str, List[Tuple[str, str]]]:
+        """key -> every (book_id, chapter_file) with a hadith waiting for that text"""
+        return {key: [(t["book_id"], t["chapter_file"]) for t in targets] for key, targets in self.targets.items()}
+
+    def split(self, keys: Iterable[str]) -> "TranslationPlan":
+        """Move keys, with every hadith waiting for them, out of this plan into a new one"""
+        keys = set(keys) & self.texts.keys()
+        other = TranslationPlan()
+        for chapter, chapter_keys in list(self.dispatch.items()):
+            moved = [key for key in chapter_keys if key in keys]
+            if not moved:
+                continue
+            other.dispatch[chapter] = moved
+            rest = [key for key in chapter_keys if key not in keys]
+            if rest:
+                self.dispatch[chapter] = rest
+            else:
+                del self.dispatch[chapter]
+        for key in keys:
+            other.texts[key] = self.texts.pop(key)
+            other.targets[key] = self.targets.pop(key)
+            for target in other.targets[key]:
+                chapter = (target["book_id"], target["chapter_file"])
+                other.chapter_sizes[chapter] = other.chapter_sizes.get(chapter, 0) + 1
+                self.chapter_sizes[chapter] -= 1
+                if not self.chapter_sizes[chapter]:
+                    del self.chapter_sizes[chapter]
+        return other
+
+    @property
+    def pending_hadiths(self) -> int:
+        return sum(self.chapter_sizes.values())
+
+    def summary(self, pack: Callable[[List[str]], List[slice]]) -> Dict:
+        """Projected API calls without and with deduplication, requests cut corpus-wide by pack"""
+        unique = [self.texts[key] for keys in self.dispatch.values() for key in keys]
+        every_copy = [self.texts[key] for key in self.targets for _ in self.targets[key]]
+        without = len(pack(every_copy))
+        with_dedup = len(pack(unique))
+        pending = self.pending_hadiths
+        return {
+            "pending_hadiths": pending,
+            "unique_texts": len(self.texts),
+            "shared_texts": sum(1 for targets in self.targets.values() if len(targets) > 1),
+            "duplicate_hadiths": pending - len(self.texts),
+            "api_calls_without_dedup": without,
+            "api_calls_with_dedup": with_dedup,
+            "api_calls_saved": without - with_dedup,
+            "saved_percent": round(100 * (without - with_dedup) / without, 1) if without else 0.0,
+        }
+
+
+def build_plan(corpus: Corpus, processed: set = None) -> TranslationPlan:
+    """
+    Plan every hadith whose composite key is not in processed
+
+    Hadiths without English text are left out: there is nothing to send.
+    """
+    started = time.perf_counter()
+    processed = processed or set()
+    plan = TranslationPlan()
+    for book_id in corpus.book_ids():
+        for chapter_file in corpus.chapter_files(book_id):
+            for i, hadith in enumerate(corpus.iter_chapter(book_id, chapter_file, HADITH_FIELDS)):
+                if composite_key(book_id, hadith) in processed:
+                    continue
+                text = extract_hadith_text(hadith)
+                if not text.strip():
+                    continue
+                plan.add(book_id, chapter_file, {
+                    "id": hadith.get('id') if hadith.get('id') is not None else i,
+                    "chapterId": hadith.get('chapterId') if hadith.get('chapterId') is not None else 0,
+                    "narrator": (hadith.get('english') or {}).get('narrator', ''),
+                }, text)
+    logger.info("plan built in %.1fs: pending=%s unique=%s", time.perf_counter() - started,
+                plan.pending_hadiths, len(plan.texts))
+    return plan
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+    from .serialization import load
+
+    if len(sys.argv) < 2 or sys.argv[1] not in config.LANGUAGES:
+        print(f"Usage: python -m translator.dedup <{'|'.join(config.LANGUAGES)}>")
+        sys.exit(1)
+    language = sys.argv[1]
+    processed = set()
+    checkpoint_file = config.CHECKPOINTS_DIR / f"{language}_api_checkpoint.json"
+    if checkpoint_file.exists():
+        processed = set(load(checkpoint_file).get("processed_hadiths", []))
+    budget = TokenBudget()
+    plan = build_plan(Corpus(config.BOOKS_DIR, cache_size=0), processed)
+    s = plan.summary(lambda texts: budget.pack(texts, language, record=False))
+    print(f"📋 {language}: {s['pending_hadiths']:,} hadiths pending, {s['unique_texts']:,} unique texts "
+          f"({s['duplicate_hadiths']:,} duplicates across {s['shared_texts']:,} shared texts)")
+    print(f"   API calls (budget {budget.budget} tokens): {s['api_calls_without_dedup']:,} → {s['api_calls_with_dedup']:,} "
+          f"(saves {s['api_calls_saved']:,}, {s['saved_percent']}%)")
+
+
+if __name__ == "__main__":
+    main()
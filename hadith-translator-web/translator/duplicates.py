@@ -0,0 +1,376 @@
+"""
+Cross-collection duplicate and near-duplicate clusters.
+
+The same hadith is repeated across collections (Bukhari, Muslim, Mishkat
+al-Masabih, Riyad as-Salihin, ...). This batch job finds those repeats
+without comparing every pair of the ~50k hadiths:
+
+    1. arabic (arabic.normalize_arabic) and english.text (normalize_english)
+       are split into word shingles
+    2. each text gets a MinHash signature of SIGNATURE_SIZE slots, computed
+       with one-permutation hashing (one hash per shingle, the minimum per
+       slot, empty slots densified from other slots) so signing is linear
+       in text length
+    3. LSH banding: signatures are cut into BANDS bands; hadiths sharing a
+       band are candidates
+    4. candidates whose estimated Jaccard similarity (fraction of equal
+       slots) reaches the threshold, in Arabic or English, are joined with
+       union-find; texts that normalize identically are joined directly
+
+The result is a flat table (duplicates.json, one row per clustered hadith)
+that other tools join on (book_id, chapterId, id):
+
+    columns: cluster, book_id, chapterId, id, idInBook, exact, similarity
+
+exact is true when the hadith's normalized Arabic or English text equals
+another member's; similarity is the best estimated Jaccard to any other
+member (1.0 for exact duplicates).
+
+Build:
+    python -m translator.duplicates [books_dir] [table_path] [--threshold 0.7]
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .arabic import normalize_arabic
+from .corpus import Corpus
+from .serialization import COMPACT, dump, load
+
+TABLE_VERSION = 1
+TABLE_NAME = "duplicates.json"
+TABLE_COLUMNS = ("cluster", "book_id", "chapterId", "id", "idInBook", "exact", "similarity")
+
+DUPLICATE_FIELDS = ("id", "idInBook", "chapterId", "arabic", "english.text")
+
+SHINGLE_WORDS = 3
+SIGNATURE_SIZE = 128
+# 25 bands of 5 slots (the last 3 slots are unused): a pair at Jaccard 0.7
+# shares a band with p ~ 0.99, at 0.4 with p ~ 0.23, at 0.2 with p < 0.01
+BANDS = 25
+BAND_ROWS = 5
+DEFAULT_THRESHOLD = 0.7
+
+# Texts with fewer shingles than this only take part in exact matching;
+# a two-word text shares a band with every other text containing it
+MIN_SHINGLES = 4
+
+_HASH_BITS = 64
+_SLOT_BITS = SIGNATURE_SIZE.bit_length() - 1
+_VALUE_MASK = (1 << (_HASH_BITS - _SLOT_BITS)) - 1
+_EMPTY = 1 << _HASH_BITS
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+_WORD = re.compile(r'\w+')
+
+# Probe order of every slot for densification; seeded so signatures are reproducible
+_rng = random.Random(SIGNATURE_SIZE)
+_PROBES = [_rng.sample(range(SIGNATURE_SIZE), SIGNATURE_SIZE) for _ in range(SIGNATURE_SIZE)]
+del _rng
+
+
+def default_table_path(books_dir: Path) -> Path:
+    """duplicates.json next to the books directory (overridable with DUPLICATES_PATH)"""
+    env = os.getenv("DUPLICATES_PATH")
+    return Path(env) if env else Path(books_dir).parent / TABLE_NAME
+
+
+def normalize_english(text: str) -> str:
+    """Lowercase, punctuation to spaces, collapse whitespace"""
+    return _NON_WORD.sub(' ', (text or "").lower()).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    """Word n-grams of a normalized text, punctuation ignored (the whole text if it is shorter)"""
+    words = _WORD.findall(text)
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def signature(shingle_set: Iterable[str]) -> array:
+    """
+    One-permutation MinHash: the top bits of each shingle hash pick a slot,
+    the rest is the value, and each slot keeps its minimum. An empty slot
+    copies the first filled slot along its own fixed random probe order
+    (optimal densification), so two signatures stay comparable slot by slot
+    and neighbouring slots of a short text do not all borrow the same value.
+    """
+    slots = [_EMPTY] * SIGNATURE_SIZE
+    shift = _HASH_BITS - _SLOT_BITS
+    for shingle in shingle_set:
+        h = _hash(shingle)
+        slot = h >> shift
+        value = h & _VALUE_MASK
+        if value < slots[slot]:
+            slots[slot] = value
+    filled = [v != _EMPTY for v in slots]
+    if any(filled):
+        for i in range(SIGNATURE_SIZE):
+            if not filled[i]:
+                for j in _PROBES[i]:
+                    if filled[j]:
+                        slots[i] = slots[j]
+                        break
+    return array('Q', slots)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / SIGNATURE_SIZE
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _exact_groups(texts: List[str]) -> Dict[str, List[int]]:
+    groups: Dict[str, List[int]] = {}
+    for doc, text in enumerate(texts):
+        if text:
+            groups.setdefault(text, []).append(doc)
+    return {text: docs for text, docs in groups.items() if len(docs) > 1}
+
+
+def _band_buckets(signatures: Dict[int, array]) -> Iterable[List[int]]:
+    """Groups of docs sharing a band, one band at a time"""
+    for band in range(BANDS):
+        buckets: Dict[tuple, List[int]] = {}
+        lo = band * BAND_ROWS
+        for doc, sig in signatures.items():
+            buckets.setdefault(tuple(sig[lo:lo + BAND_ROWS]), []).append(doc)
+        for docs in buckets.values():
+            if len(docs) > 1:
+                yield docs
+
+
+def find_clusters(texts: Dict[str, List[str]], threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[List[int]], Dict[int, float], set, Dict]:
+    """
+    Cluster documents given their normalized texts per field
+
+    Args:
+        texts: {"arabic": [...], "english": [...]}, one normalized text per doc
+        threshold: Minimum estimated Jaccard similarity in any field
+
+    Returns:
+        (clusters as lists of docs, best similarity per clustered doc,
+         docs with an exact duplicate, stats)
+    """
+    count = len(next(iter(texts.values())))
+    union = _UnionFind(count)
+    best: Dict[int, float] = {}
+    exact = set()
+    stats = {"candidates": 0, "verified": 0}
+
+    for field_texts in texts.values():
+        # Exact duplicates: join them and sign only one representative per text
+        representatives = {}
+        for docs in _exact_groups(field_texts).values():
+            for doc in docs:
+                union.union(docs[0], doc)
+                best[doc] = 1.0
+                exact.add(doc)
+        signatures: Dict[int, array] = {}
+        for doc, text in enumerate(field_texts):
+            if not text or text in representatives:
+                continue
+            representatives[text] = doc
+            shingle_set = shingles(text)
+            if len(shingle_set) >= MIN_SHINGLES:
+                signatures[doc] = signature(shingle_set)
+
+        # A pair can share several bands; remember rejections so each pair is
+        # scored once, and skip pairs already joined through other members
+        rejected = set()
+        for docs in _band_buckets(signatures):
+            for i, a in enumerate(docs):
+                for b in docs[i + 1:]:
+                    pair = a * count + b
+                    if pair in rejected or union.find(a) == union.find(b):
+                        continue
+                    stats["candidates"] += 1
+                    score = similarity(signatures[a], signatures[b])
+                    if score < threshold:
+                        rejected.add(pair)
+                        continue
+                    stats["verified"] += 1
+                    union.union(a, b)
+                    best[a] = max(best.get(a, 0.0), score)
+                    best[b] = max(best.get(b, 0.0), score)
+
+    # Docs sharing a representative's text inherit its best score
+    for field_texts in texts.values():
+        representatives = {}
+        for doc, text in enumerate(field_texts):
+            if not text:
+                continue
+            first = representatives.setdefault(text, doc)
+            if first != doc and first in best:
+                best[doc] = max(best.get(doc, 0.0), best[first])
+                best[first] = max(best[first], best[doc])
+
+    members: Dict[int, List[int]] = {}
+    for doc in range(count):
+        members.setdefault(union.find(doc), []).append(doc)
+    clusters = [docs for docs in members.values() if len(docs) > 1]
+    return clusters, best, exact, stats
+
+
+def build_table(books_dir: Path, table_path: Path = None, threshold: float = DEFAULT_THRESHOLD) -> Dict:
+    """
+    Sign every hadith under books_dir, cluster and write the duplicate table
+
+    Returns:
+        Dict with path, hadiths, clusters, rows, candidate/verified pair counts and seconds
+    """
+    started = time.perf_counter()
+    books_dir = Path(books_dir)
+    table_path = Path(table_path) if table_path else default_table_path(books_dir)
+    corpus = Corpus(books_dir, cache_size=0)
+
+    keys: List[tuple] = []
+    texts: Dict[str, List[str]] = {"arabic": [], "english": []}
+    for book_id in corpus.book_ids():
+        for chapter_file in corpus.chapter_files(book_id):
+            for hadith in corpus.iter_chapter(book_id, chapter_file, DUPLICATE_FIELDS):
+                keys.append((book_id, hadith.get('chapterId'), hadith.get('id'), hadith.get('idInBook')))
+                texts["arabic"].append(normalize_arabic(hadith.get('arabic')))
+                texts["english"].append(normalize_english((hadith.get('english') or {}).get('text')))
+
+    clusters, best, exact, stats = find_clusters(texts, threshold)
+    # Largest clusters first; within a cluster, corpus order
+    clusters.sort(key=lambda docs: (-len(docs), docs[0]))
+    rows = []
+    for cluster_id, docs in enumerate(clusters):
+        for doc in docs:
+            book_id, chapter_id, hadith_id, id_in_book = keys[doc]
+            rows.append([cluster_id, book_id, chapter_id, hadith_id, id_in_book,
+                         doc in exact, round(best.get(doc, 0.0), 3)])
+
+    table = {
+        "version": TABLE_VERSION,
+        "threshold": threshold,
+        "signature_size": SIGNATURE_SIZE,
+        "bands": BANDS,
+        "band_rows": BAND_ROWS,
+        "shingle_words": SHINGLE_WORDS,
+        "hadiths": len(keys),
+        "clusters": len(clusters),
+        "columns": list(TABLE_COLUMNS),
+        "rows": rows,
+    }
+    dump(table, table_path, COMPACT)
+    return {
+        "path": str(table_path),
+        "hadiths": len(keys),
+        "clusters": len(clusters),
+        "rows": len(rows),
+        "candidates": stats["candidates"],
+        "verified": stats["verified"],
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def _key(book_id: str, chapter_id, hadith_id) -> tuple:
+    return (book_id, chapter_id if chapter_id is not None else 0, int(hadith_id))
+
+
+class DuplicateTable:
+    """Reader for duplicates.json with lookups by hadith and by cluster"""
+
+    def __init__(self, table_path: Path):
+        self.table_path = Path(table_path)
+        data = load(self.table_path)
+        if data.get("version") != TABLE_VERSION:
+            raise ValueError(f"Unsupported duplicate table version in {self.table_path}")
+        self.header = {k: v for k, v in data.items() if k != "rows"}
+        columns = data["columns"]
+        self.rows = [dict(zip(columns, row)) for row in data["rows"]]
+        self._by_key = {_key(r["book_id"], r["chapterId"], r["id"]): r for r in self.rows}
+        self._by_cluster: Dict[int, List[Dict]] = {}
+        for row in self.rows:
+            self._by_cluster.setdefault(row["cluster"], []).append(row)
+
+    def cluster_of(self, book_id: str, chapter_id, hadith_id) -> Optional[int]:
+        row = self._by_key.get(_key(book_id, chapter_id, hadith_id))
+        return row["cluster"] if row else None
+
+    def members(self, cluster_id: int) -> List[Dict]:
+        return self._by_cluster.get(cluster_id, [])
+
+    def duplicates_of(self, book_id: str, chapter_id, hadith_id) -> List[Dict]:
+        """Other hadiths in the same cluster (empty if it has none)"""
+        key = _key(book_id, chapter_id, hadith_id)
+        row = self._by_key.get(key)
+        if row is None:
+            return []
+        return [r for r in self._by_cluster[row["cluster"]]
+                if _key(r["book_id"], r["chapterId"], r["id"]) != key]
+
+
+_tables: Dict[Path, Optional[DuplicateTable]] = {}
+_tables_lock = threading.Lock()
+
+
+def open_table(table_path: Path) -> Optional[DuplicateTable]:
+    """Shared reader for table_path, or None if it has not been built"""
+    key = Path(table_path).resolve()
+    with _tables_lock:
+        if key not in _tables:
+            table = None
+            if key.is_file():
+                try:
+                    table = DuplicateTable(key)
+                except (OSError, ValueError, KeyError):
+                    table = None
+            _tables[key] = table
+        return _tables[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the cross-collection duplicate cluster table')
+    parser.add_argument('books_dir', nargs='?', help='Books directory (default: config.BOOKS_DIR)')
+    parser.add_argument('table_path', nargs='?', help=f'Output table (default: {TABLE_NAME} next to books_dir)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Minimum estimated Jaccard similarity (Arabic or English) to join two hadiths')
+    args = parser.parse_args()
+    if args.books_dir:
+        books_dir = Path(args.books_dir)
+    else:
+        _root = Path(__file__).resolve().parent.parent
+        if str(_root) not in sys.path:
+            sys.path.insert(0, str(_root))
+        import config
+        books_dir = config.BOOKS_DIR
+    stats = build_table(books_dir, args.table_path, args.threshold)
+    print(f"✅ {stats['path']}: {stats['clusters']:,} clusters covering {stats['rows']:,} of "
+          f"{stats['hadiths']:,} hadiths ({stats['candidates']:,} candidate pairs, "
+          f"{stats['verified']:,} verified, {stats['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Streaming, field-projecting reader for chapter and by_book JSON files.
+
+Only the current array element and one read chunk are held in memory, so a
+whole book never has to be parsed just to read its English text:
+
+    for hadith in iter_hadiths(path, fields=HADITH_FIELDS):
+        ...
+
+Fields are dotted paths ("english.text"); projected records keep the nested
+shape of the source, so extract_hadith_text() works on them unchanged.
+"""
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+# What the translation runners read from a hadith
+HADITH_FIELDS = ("id", "chapterId", "english.narrator", "english.text")
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+def project(record: Dict, fields: Optional[Iterable[str]]) -> Dict:
+    """Copy of record with only the given dotted fields (all of it if fields is None)"""
+    if fields is None:
+        return record
+    out = {}
+    for field in fields:
+        source, target = record, out
+        parts = field.split('.')
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if source is None:
+                break
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return out
+
+
+class _Reader:
+    """Sliding text window over a file, refilled on demand"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has already been consumed before growing the window
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_ws(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_ws()
+        return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more until it is complete"""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A scalar that ends exactly at the window edge may be truncated
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(file_path: Path, key: str = "hadiths", fields: Optional[Iterable[str]] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Yield the elements of a top-level array (default "hadiths") one at a time
+
+    Other top-level values are decoded and discarded as they are passed.
+
+    Args:
+        file_path: JSON file whose root is an object
+        key: Name of the array to stream
+        fields: Dotted fields to keep per element (None keeps everything)
+        chunk_size: Characters read per refill
+    """
+    fields = tuple(fields) if fields is not None else None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('{')
+        while reader.peek() not in ('}', ''):
+            name = reader.value()
+            reader.expect(':')
+            if name != key:
+                reader.value()
+            else:
+                reader.expect('[')
+                while reader.peek() != ']':
+                    yield project(reader.value(), fields)
+                    if reader.peek() == ',':
+                        reader.pos += 1
+                reader.pos += 1
+            if reader.peek() == ',':
+                reader.pos += 1
+
+
+def iter_hadiths(file_path: Path, fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """Hadiths of a chapter, all.json or by_book file, optionally projected"""
+    return iter_array(file_path, "hadiths", fields)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python -m translator.jsonstream <file.json> [field ...]")
+        sys.exit(1)
+    fields = sys.argv[2:] or None
+    count = 0
+    for hadith in iter_hadiths(Path(sys.argv[1]), fields):
+        print(json.dumps(hadith, ensure_ascii=False))
+        count += 1
+    print(f"✅ {count:,} hadiths", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
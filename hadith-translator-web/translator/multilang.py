@@ -0,0 +1,135 @@
+"""
+Multi-language requests: one API call returns every target language.
+
+In per-language mode the same English texts, and a system prompt, are sent
+once per language. Here a request carries the numbered texts once and asks
+for every language in each item of the structured reply (structured.py)
+
+    {"items": [{"id": 1, "turkish": "...", "french": "..."}, ...]}
+
+so input tokens and request latency are paid once for all languages. An
+item missing a language fails validation and is re-sent on its own. The
+system prompt (prompts.PromptBuilder) lists every language's glossary terms.
+
+Input-token comparison on a sample book (estimate, no API calls):
+    python -m translator.multilang <book_id> [lang,lang,...] [--limit N]
+Measured with real requests (cache bypassed, costs tokens):
+    python -m translator.multilang <book_id> [lang,lang,...] [--limit N] --send
+"""
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from .structured import number_texts
+
+logger = logging.getLogger("hadith.multilang")
+
+
+def _sample(book_id: str, limit: int) -> List[str]:
+    import config
+    from .corpus import extract_hadith_text, get_corpus
+
+    corpus = get_corpus(config.BOOKS_DIR)
+    texts = []
+    for hadith in corpus.iter_hadiths(book_id):
+        text = extract_hadith_text(hadith)
+        if text.strip():
+            texts.append(text)
+        if len(texts) >= limit:
+            break
+    return texts
+
+
+def _estimate(texts: List[str], languages: List[str]):
+    """Projected input/output tokens per mode, from the token budget's counts"""
+    import config
+    from .prompts import PromptBuilder
+    from .token_budget import TokenBudget
+
+    budget = TokenBudget()
+    prompts = PromptBuilder(config.GLOSSARY_PATH, config.LANGUAGES)
+    rows = {}
+    single_in = single_out = single_calls = 0
+    for lang in languages:
+        prompt = budget.input_tokens(prompts.system([lang]))
+        for part in budget.pack(texts, lang, record=False):
+            single_in += prompt + budget.input_tokens(number_texts(texts[part]))
+            single_out += sum(budget.output_tokens(t, lang) for t in texts[part])
+            single_calls += 1
+    rows["per-language"] = (single_calls, single_in, single_out)
+    prompt = budget.input_tokens(prompts.system(languages))
+    multi_in = multi_out = multi_calls = 0
+    for part in budget.pack(texts, languages, record=False):
+        multi_in += prompt + budget.input_tokens(number_texts(texts[part]))
+        multi_out += sum(budget.output_tokens(t, languages) for t in texts[part])
+        multi_calls += 1
+    rows["multi-language"] = (multi_calls, multi_in, multi_out)
+    return rows
+
+
+def _measure(texts: List[str], languages: List[str]):
+    """Send the sample both ways; the cache is bypassed so both modes pay in full"""
+    from .api_translator import APITranslator
+
+    translator = APITranslator()
+    translator.cache = None
+    rows = {}
+    for mode in ("per-language", "multi-language"):
+        calls, usage = translator.api_calls, dict(translator.usage)
+        started = time.perf_counter()
+        if mode == "per-language":
+            for lang in languages:
+                translator.translate_batch(texts, lang)
+        else:
+            for part in translator.budget.pack(texts, languages):
+                translator.translate_chunk_multi(texts[part], languages)
+        rows[mode] = (translator.api_calls - calls,
+                      translator.usage["prompt_tokens"] - usage["prompt_tokens"],
+                      translator.usage["completion_tokens"] - usage["completion_tokens"],
+                      time.perf_counter() - started)
+    return rows
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+
+    argv = sys.argv[1:]
+    limit = 50
+    if "--limit" in argv:
+        i = argv.index("--limit")
+        limit = int(argv[i + 1])
+        del argv[i:i + 2]
+    send = "--send" in argv
+    args = [a for a in argv if not a.startswith('--')]
+    if not args:
+        print("Usage: python -m translator.multilang <book_id> [lang,lang,...] [--limit N] [--send]")
+        sys.exit(1)
+    book_id = args[0]
+    languages = args[1].split(",") if len(args) > 1 else list(config.LANGUAGES)
+    unknown = [lang for lang in languages if lang not in config.LANGUAGES]
+    if unknown:
+        print(f"❌ Unknown languages: {', '.join(unknown)}")
+        sys.exit(1)
+    texts = _sample(book_id, limit)
+    if not texts:
+        print(f"❌ No hadiths with English text in {book_id}")
+        sys.exit(1)
+    rows = _measure(texts, languages) if send else _estimate(texts, languages)
+    print(f"📊 {book_id}: {len(texts)} hadiths x {len(languages)} languages "
+          f"({'measured' if send else 'estimated'} tokens)")
+    for mode, row in rows.items():
+        calls, prompt_tokens, completion_tokens = row[:3]
+        took = f", {row[3]:.1f}s" if len(row) > 3 else ""
+        print(f"   {mode:15} {calls:5} calls, input {prompt_tokens:9,}, output {completion_tokens:9,}{took}")
+    single, multi = rows["per-language"][1], rows["multi-language"][1]
+    if single:
+        print(f"   input tokens saved: {single - multi:,} ({100 * (single - multi) / single:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
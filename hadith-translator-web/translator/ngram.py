@@ -0,0 +1,282 @@
+"""
+Diacritic-insensitive substring and phrase search over the arabic field.
+
+Every hadith's Arabic text is normalized (arabic.normalize_arabic) and
+stored once; a character-trigram index maps each trigram, spaces included,
+to the hadiths containing it. A query is normalized the same way, the
+posting lists of its trigrams are intersected rarest-first, and only the
+surviving candidates are checked against the stored text, so nothing scans
+the corpus. Queries need at least 3 characters after normalization.
+
+Build:
+    python -m translator.ngram [books_dir] [index_path]
+"""
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .arabic import normalize_arabic
+from .corpus import Corpus
+from .corpus_pack import SectionFile, write_sections
+from .search import NULL_INT, allowed_books, pack_doc_ids, unpack_doc_ids
+
+MAGIC = b"HDNG"
+INDEX_VERSION = 1
+INDEX_NAME = "arabic.ngram"
+N = 3
+
+NGRAM_FIELDS = ("id", "idInBook", "chapterId", "arabic")
+DOC_COLUMNS = ("book", "id", "chapterId", "idInBook")
+
+# Characters of context on each side of a match in snippets
+SNIPPET_CONTEXT = 40
+
+# Stop intersecting posting lists once this few candidates remain; checking
+# them against the text is cheaper than decoding more lists
+VERIFY_THRESHOLD = 64
+
+
+def default_index_path(books_dir: Path) -> Path:
+    """arabic.ngram next to the books directory (overridable with NGRAM_INDEX_PATH)"""
+    env = os.getenv("NGRAM_INDEX_PATH")
+    return Path(env) if env else Path(books_dir).parent / INDEX_NAME
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + N] for i in range(len(text) - N + 1)}
+
+
+def build_index(books_dir: Path, index_path: Path = None) -> Dict:
+    """
+    Normalize every hadith's Arabic text and write the trigram index
+
+    Returns:
+        Dict with path, docs, ngrams and bytes written
+    """
+    books_dir = Path(books_dir)
+    index_path = Path(index_path) if index_path else default_index_path(books_dir)
+    corpus = Corpus(books_dir, cache_size=0)
+
+    docs = {name: array('i') for name in DOC_COLUMNS}
+    text_offsets = array('Q', [0])
+    text_data = bytearray()
+    postings: Dict[str, array] = {}
+    books = []
+    doc = 0
+    for book_index, book_id in enumerate(corpus.book_ids()):
+        books.append({"id": book_id, "category": corpus.category(book_id)})
+        for chapter_file in corpus.chapter_files(book_id):
+            for hadith in corpus.iter_chapter(book_id, chapter_file, NGRAM_FIELDS):
+                text = normalize_arabic(hadith.get('arabic'))
+                for gram in trigrams(text):
+                    entry = postings.get(gram)
+                    if entry is None:
+                        entry = postings[gram] = array('I')
+                    entry.append(doc)
+                text_data += text.encode('utf-8')
+                text_offsets.append(len(text_data))
+                for name in ("id", "chapterId", "idInBook"):
+                    value = hadith.get(name)
+                    docs[name].append(NULL_INT if value is None else int(value))
+                docs["book"].append(book_index)
+                doc += 1
+
+    grams = sorted(postings, key=lambda g: g.encode('utf-8'))
+    gram_offsets = array('I', [0])
+    gram_data = bytearray()
+    post_offsets = array('Q')
+    post_widths = array('B')
+    dfs = array('I')
+    post_data = bytearray()
+    for gram in grams:
+        doc_ids = postings[gram]
+        gram_data += gram.encode('utf-8')
+        gram_offsets.append(len(gram_data))
+        width, encoded = pack_doc_ids(doc_ids)
+        post_data += b"\0" * (-len(post_data) % width)
+        post_offsets.append(len(post_data))
+        post_data += encoded
+        post_widths.append(width)
+        dfs.append(len(doc_ids))
+
+    sections = [(f"doc.{name}", docs[name].tobytes()) for name in DOC_COLUMNS]
+    sections += [
+        ("text.offsets", text_offsets.tobytes()),
+        ("text.data", bytes(text_data)),
+        ("grams.offsets", gram_offsets.tobytes()),
+        ("grams.data", bytes(gram_data)),
+        ("post.offsets", post_offsets.tobytes()),
+        ("post.widths", post_widths.tobytes()),
+        ("post.df", dfs.tobytes()),
+        ("post.data", bytes(post_data)),
+    ]
+    header = {"version": INDEX_VERSION, "n": N, "count": doc, "grams": len(grams), "books": books}
+    written = write_sections(index_path, MAGIC, INDEX_VERSION, header, sections)
+    return {"path": str(index_path), "docs": doc, "ngrams": len(grams), "bytes": written}
+
+
+class NgramIndex:
+    """Memory-mapped reader for arabic.ngram"""
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        self._sections = SectionFile(self.index_path, MAGIC, INDEX_VERSION)
+        self.header = self._sections.header
+        self.count = self.header["count"]
+        self.books = self.header["books"]
+        section = self._sections.section
+        self._docs = {name: section(f"doc.{name}", 'i') for name in DOC_COLUMNS}
+        self._text_offsets = section("text.offsets", 'Q')
+        self._text_data = section("text.data")
+        self._gram_offsets = section("grams.offsets", 'I')
+        self._gram_data = section("grams.data")
+        self._post_offsets = section("post.offsets", 'Q')
+        self._post_widths = section("post.widths", 'B')
+        self._df = section("post.df", 'I')
+        self._post_data = section("post.data")
+
+    def close(self):
+        self._sections.close()
+
+    def _gram(self, i: int) -> bytes:
+        return bytes(self._gram_data[self._gram_offsets[i]:self._gram_offsets[i + 1]])
+
+    def _gram_id(self, gram: str) -> Optional[int]:
+        key = gram.encode('utf-8')
+        i = bisect_left(range(self.header["grams"]), key, key=self._gram)
+        if i < self.header["grams"] and self._gram(i) == key:
+            return i
+        return None
+
+    def _postings(self, gram_id: int) -> List[int]:
+        start = self._post_offsets[gram_id]
+        width = self._post_widths[gram_id]
+        return unpack_doc_ids(self._post_data[start:start + self._df[gram_id] * width], width)
+
+    def text(self, doc: int) -> str:
+        """Normalized Arabic text of a document"""
+        return bytes(self._text_data[self._text_offsets[doc]:self._text_offsets[doc + 1]]).decode('utf-8')
+
+    def document(self, doc: int) -> Dict:
+        book = self.books[self._docs["book"][doc]]
+
+        def value(name):
+            v = self._docs[name][doc]
+            return None if v == NULL_INT else v
+
+        return {
+            "book_id": book["id"],
+            "category": book["category"],
+            "chapterId": value("chapterId"),
+            "id": value("id"),
+            "idInBook": value("idInBook"),
+        }
+
+    def candidates(self, normalized_query: str) -> List[int]:
+        """Docs containing the query's rarest trigrams (superset of the matches)"""
+        grams = trigrams(normalized_query)
+        gram_ids = []
+        for gram in grams:
+            gram_id = self._gram_id(gram)
+            if gram_id is None:
+                return []
+            gram_ids.append(gram_id)
+        gram_ids.sort(key=lambda g: self._df[g])
+        matched = None
+        for gram_id in gram_ids:
+            docs = self._postings(gram_id)
+            matched = set(docs) if matched is None else matched.intersection(docs)
+            if len(matched) <= VERIFY_THRESHOLD:
+                break
+        return sorted(matched)
+
+    def search(self, query: str, book=None, category: str = None, whole_words: bool = False,
+               limit: int = 50, offset: int = 0) -> Dict:
+        """
+        Find hadiths whose normalized Arabic text contains the normalized query
+
+        Args:
+            query: Arabic substring or phrase (diacritics and spacing are ignored)
+            book: Book id or list of book ids to search in
+            category: Category to search in
+            whole_words: Match the query only at word boundaries
+            limit, offset: Page of results (corpus order)
+
+        Returns:
+            {"total", "results": [{book_id, category, chapterId, id, idInBook, snippet}], "took_ms"}
+        """
+        started = time.perf_counter()
+        normalized = normalize_arabic(query)
+        if len(normalized) < N:
+            raise ValueError(f"Query must be at least {N} characters after normalization")
+        allowed = allowed_books(self.books, book, category)
+        pattern = re.compile(rf'(?<!\w){re.escape(normalized)}(?!\w)') if whole_words else None
+        needle = normalized.encode('utf-8')
+        doc_book = self._docs["book"]
+        offsets = self._text_offsets
+        matches = []
+        for doc in self.candidates(normalized):
+            if allowed is not None and doc_book[doc] not in allowed:
+                continue
+            # Byte-level check straight on the map; decode only for word boundaries
+            if self._sections.find("text.data", needle, offsets[doc], offsets[doc + 1]) < 0:
+                continue
+            if pattern is not None and not pattern.search(self.text(doc)):
+                continue
+            matches.append(doc)
+        results = []
+        for doc in matches[offset:offset + limit]:
+            text = self.text(doc)
+            found = pattern.search(text) if pattern is not None else None
+            position = found.start() if found else text.find(normalized)
+            start = max(0, position - SNIPPET_CONTEXT)
+            end = position + len(normalized) + SNIPPET_CONTEXT
+            results.append(dict(self.document(doc), snippet=text[start:end], position=position))
+        return {
+            "total": len(matches),
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+_indexes: Dict[Path, Optional[NgramIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(index_path: Path) -> Optional[NgramIndex]:
+    """Shared reader for index_path, or None if it has not been built"""
+    key = Path(index_path).resolve()
+    with _indexes_lock:
+        if key not in _indexes:
+            index = None
+            if key.is_file():
+                try:
+                    index = NgramIndex(key)
+                except (OSError, ValueError):
+                    index = None
+            _indexes[key] = index
+        return _indexes[key]
+
+
+def main():
+    if len(sys.argv) > 1:
+        books_dir = Path(sys.argv[1])
+    else:
+        _root = Path(__file__).resolve().parent.parent
+        if str(_root) not in sys.path:
+            sys.path.insert(0, str(_root))
+        import config
+        books_dir = config.BOOKS_DIR
+    index_path = Path(sys.argv[2]) if len(sys.argv) > 2 else default_index_path(books_dir)
+    stats = build_index(books_dir, index_path)
+    print(f"✅ {stats['path']}: {stats['docs']:,} hadiths, {stats['ngrams']:,} trigrams, {stats['bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
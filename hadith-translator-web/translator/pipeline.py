@@ -0,0 +1,243 @@
+"""
+Asyncio translation pipeline: producer -> API workers -> writer.
+
+    producer  slices the whole plan into token-budget-sized batches, in
+              corpus order and across chapter and book boundaries, into a
+              bounded queue (it runs ahead of the workers by at most the
+              queue size, so stopping does not leave a backlog)
+    workers   `concurrency` requests in flight at all times; each blocking
+              API call runs in a thread
+    writer    persists finished batches; whatever has piled up while the
+              previous write ran is written together, so slow storage never
+              stalls the workers (ChapterGate lets the caller commit whole
+              chapters only)
+
+stop_event is checked by the producer before each batch and by the workers
+before each request; batches already sent are still written.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("hadith.pipeline")
+
+
+Chapter = Tuple[str, str]  # (book_id, chapter_file)
+
+# Texts buffered before packing, so requests fill up across chapter and book boundaries
+PACK_WINDOW = 512
+
+
+class Batch(NamedTuple):
+    """One API request; chapters[i] is the chapter that dispatched keys[i] (keys index the plan)"""
+    seq: int
+    keys: List[str]
+    texts: List[str]
+    chapters: List[Chapter]
+
+
+def plan_batches(chapters: Iterable[Tuple[str, str, List[str]]], texts: Dict[str, str],
+                 pack: Callable[[List[str]], List[slice]],
+                 record: Optional[Callable[[List[str]], None]] = None) -> Iterable[Batch]:
+    """
+    Cut the whole plan into requests as pack (e.g. TokenBudget.pack) slices its texts
+
+    Items flow corpus-wide in order, so a chapter with a handful of hadiths
+    shares a request with the next ones instead of sending a tiny one. The
+    last slice of each window is carried over, since it may not be full yet,
+    and packed again with the next window: pack should not count requests
+    itself (record=False); record is called once per batch yielded.
+    """
+    seq = 0
+    keys: List[str] = []
+    origins: List[Chapter] = []
+    for book_id, chapter_file, chapter_keys in chapters:
+        keys.extend(chapter_keys)
+        origins.extend([(book_id, chapter_file)] * len(chapter_keys))
+        if len(keys) < PACK_WINDOW:
+            continue
+        window = [texts[k] for k in keys]
+        parts = pack(window)
+        for part in parts[:-1]:
+            if record:
+                record(window[part])
+            yield Batch(seq, keys[part], window[part], origins[part])
+            seq += 1
+        rest = parts[-1].start
+        keys, origins = keys[rest:], origins[rest:]
+    if keys:
+        window = [texts[k] for k in keys]
+        for part in pack(window):
+            if record:
+                record(window[part])
+            yield Batch(seq, keys[part], window[part], origins[part])
+            seq += 1
+
+
+class ChapterGate:
+    """
+    Holds translations until every hadith of their chapter is translated
+
+    Batches span chapters and finish out of order, and one text (dedup) can
+    belong to several chapters; a chapter is released once every key it
+    needs is back, so each checkpoint is a set of complete chapters.
+    """
+
+    def __init__(self, key_chapters: Dict[str, Iterable[Chapter]]):
+        self._key_chapters = {key: set(chapters) for key, chapters in key_chapters.items()}
+        self._chapter_keys: Dict[Chapter, List[str]] = {}
+        for key, chapters in self._key_chapters.items():
+            for chapter in chapters:
+                self._chapter_keys.setdefault(chapter, []).append(key)
+        self._outstanding = {chapter: len(keys) for chapter, keys in self._chapter_keys.items()}
+        # key -> (source, translation), dropped once all its chapters are released
+        self._done: Dict[str, Tuple[str, str]] = {}
+        self._holders: Dict[str, int] = {}
+
+    def add(self, batch: Batch, translations: List[str]) -> List[Tuple[Chapter, List[Tuple[str, str, str]]]]:
+        """Record a finished batch; returns the chapters it completed with their (key, source, translation)"""
+        completed = []
+        for key, source, translated in zip(batch.keys, batch.texts, translations):
+            self._done[key] = (source, translated)
+            self._holders[key] = len(self._key_chapters[key])
+            for chapter in self._key_chapters[key]:
+                self._outstanding[chapter] -= 1
+                if self._outstanding[chapter] == 0:
+                    completed.append(chapter)
+        return [(chapter, self._release(chapter)) for chapter in completed]
+
+    def _release(self, chapter: Chapter) -> List[Tuple[str, str, str]]:
+        self._outstanding.pop(chapter, None)
+        items = []
+        for key in self._chapter_keys.pop(chapter):
+            if key not in self._done:
+                continue
+            source, translated = self._done[key]
+            items.append((key, source, translated))
+            self._holders[key] -= 1
+            if not self._holders[key]:
+                del self._done[key], self._holders[key]
+        return items
+
+    def drain(self) -> List[Tuple[Chapter, List[Tuple[str, str, str]]]]:
+        """What is translated of chapters still incomplete (run stopped), so nothing paid for is lost"""
+        partial = [chapter for chapter, keys in self._chapter_keys.items()
+                   if any(key in self._done for key in keys)]
+        return [(chapter, self._release(chapter)) for chapter in partial]
+
+    @property
+    def open_chapters(self) -> int:
+        """Chapters with some but not all translations back"""
+        return sum(1 for chapter, left in self._outstanding.items()
+                   if left < len(self._chapter_keys[chapter]))
+
+
+class PipelineResult(NamedTuple):
+    batches_done: int
+    stopped: bool
+    error: Optional[BaseException]
+
+
+async def _run(batches: Iterable[Batch], translate: Callable[[List[str]], List[str]],
+               persist: Callable[[List[Tuple[Batch, List[str]]]], None],
+               stop_event: threading.Event, concurrency: int, prefetch: int) -> PipelineResult:
+    pending: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+    done: asyncio.Queue = asyncio.Queue()
+    abort = asyncio.Event()
+    errors: List[BaseException] = []
+    written = 0
+
+    def halted() -> bool:
+        return abort.is_set() or stop_event.is_set()
+
+    async def producer():
+        try:
+            for batch in batches:
+                if halted():
+                    break
+                await pending.put(batch)
+        finally:
+            for _ in range(concurrency):
+                await pending.put(None)
+
+    async def worker():
+        while True:
+            batch = await pending.get()
+            if batch is None:
+                break
+            if halted():
+                continue
+            try:
+                result = await asyncio.to_thread(translate, batch.texts)
+            except Exception as e:
+                logger.exception("batch failed: seq=%s chapters=%s texts=%s", batch.seq,
+                                 sorted(set(batch.chapters)), len(batch.texts))
+                errors.append(e)
+                abort.set()
+                continue
+            await done.put((batch, result))
+
+    async def writer():
+        nonlocal written
+        while True:
+            item = await done.get()
+            if item is None:
+                break
+            items = [item]
+            finished = False
+            while not done.empty():
+                more = done.get_nowait()
+                if more is None:
+                    finished = True
+                    break
+                items.append(more)
+            try:
+                await asyncio.to_thread(persist, items)
+            except Exception as e:
+                logger.exception("persist failed for %s batches", len(items))
+                errors.append(e)
+                abort.set()
+                break
+            written += len(items)
+            if finished:
+                break
+
+    async def workers():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        await done.put(None)
+
+    await asyncio.gather(producer(), workers(), writer())
+    return PipelineResult(written, stop_event.is_set(), errors[0] if errors else None)
+
+
+def run_pipeline(batches: Iterable[Batch], translate: Callable[[List[str]], List[str]],
+                 persist: Callable[[List[Tuple[Batch, List[str]]]], None],
+                 stop_event: threading.Event, concurrency: int = 2, prefetch: int = None) -> PipelineResult:
+    """
+    Translate batches with up to `concurrency` requests in flight and persist results
+
+    Args:
+        batches: Batches in dispatch order (consumed lazily)
+        translate: Blocking call translating one batch's texts (same length and order)
+        persist: Blocking call writing finished (batch, translations) pairs
+        stop_event: Set to stop sending new requests
+        concurrency: Requests in flight
+        prefetch: Batches queued ahead of the workers (default 2 x concurrency)
+
+    Returns:
+        PipelineResult(batches_done, stopped, error); error is the first
+        exception raised by translate or persist, after which nothing new is sent
+    """
+    concurrency = max(1, concurrency)
+    # Own executor so `concurrency` calls plus the writer never wait for a thread
+    executor = ThreadPoolExecutor(max_workers=concurrency + 1, thread_name_prefix="translate")
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(executor)
+    try:
+        return loop.run_until_complete(_run(batches, translate, persist, stop_event,
+                                            concurrency, prefetch or 2 * concurrency))
+    finally:
+        loop.close()
+        executor.shutdown(wait=True)
@@ -0,0 +1,176 @@
+"""
+System prompts laid out for provider-side prefix caching.
+
+OpenAI caches the longest prefix of a prompt it has seen recently (for
+prompts of 1024+ tokens, in 128-token steps) and serves those tokens
+faster and at a discount. Only a byte-identical prefix hits, so the
+system message is built from static parts only, most widely shared first:
+
+    rules        translation rules, identical for every language
+    language     the target language(s) and their glossary terms
+                 (glossary.json: terms, book titles, categories; sorted)
+    reply        the structured reply format (structured.reply_instruction)
+
+and the numbered batch, the only part that changes, comes last in the user
+message. Prompts are built once per language set and reused verbatim;
+prompt_cache_key (OPENAI_PROMPT_CACHE_KEY=0 to leave it out) routes the
+requests of a language set to the same cache. The translator totals
+usage.prompt_tokens_details.cached_tokens as usage["cached_tokens"].
+
+Only prompts of CACHE_MIN_TOKENS or more are cached, so cached_tokens is
+either 0 or at least 1024. A single-language prefix is ~560-620 tokens and
+never reaches it; the all-language prefix (~2200) does. Padding the
+single-language prompt up to 1024 would bill about as much at the cached
+discount as the ~600 uncached tokens it replaces, so it is not done: use
+multi-language runs when the cache discount matters.
+
+Settings (environment):
+    GLOSSARY_PATH             glossary file (config.GLOSSARY_PATH)
+    OPENAI_PROMPT_CACHE_KEY=0 do not send prompt_cache_key
+
+Prefix size per language:
+    python -m translator.prompts [language ...]
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .structured import reply_instruction
+
+# Shortest prompt OpenAI caches; above it the cached prefix grows in CACHE_STEP_TOKENS steps
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+# Glossary sections, in prompt order
+SECTIONS = (("terms", "Terms"), ("bookTitles", "Book titles"), ("categories", "Collections"))
+
+RULES = (
+    "You are a professional translator specializing in Islamic religious texts (hadith).\n"
+    "\n"
+    "Rules:\n"
+    "1. Translate every numbered English hadith text completely into the target language. Never return the "
+    "original English, and never summarize, shorten or skip sentences.\n"
+    "2. Keep the chain of narration and narrator attributions (\"Narrated ...\", \"On the authority of ...\") "
+    "where they are, in the form usual in the target language.\n"
+    "3. Translate Islamic terms, book titles and collection names as the glossary gives them for the target "
+    "language; write other names of people and places in the target language's customary spelling.\n"
+    "4. Keep honorifics after names, such as (ﷺ) and \"may Allah be pleased with him\", in the glossary's form.\n"
+    "5. Keep numbers, Arabic phrases and Qur'an references as they are; translate any meaning the English gives.\n"
+    "6. Preserve the meaning precisely. Add no explanations, comments or notes.\n"
+    "7. Every item is independent: translate it on its own and return it under its own id."
+)
+
+
+def cacheable_tokens(prefix_tokens: int) -> int:
+    """Prompt tokens the provider can serve from its cache for a prefix of this size"""
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return prefix_tokens // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS
+
+
+def load_glossary(path: Path) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """glossary.json (section -> English -> language code -> translation), or empty if missing"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class PromptBuilder:
+    """Byte-identical system prompts per language set: static rules, then glossary, then reply format"""
+
+    def __init__(self, glossary_path: Path, languages: Dict[str, Dict]):
+        self.glossary_path = Path(glossary_path)
+        self.glossary = load_glossary(self.glossary_path)
+        self.languages = languages
+        self._prompts: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _name(self, language: str) -> str:
+        return (self.languages.get(language) or {}).get("name") or language.capitalize()
+
+    def _glossary(self, languages: Sequence[str]) -> List[str]:
+        codes = [(self.languages.get(lang) or {}).get("code") for lang in languages]
+        multi = len(languages) > 1
+        lines = []
+        for section, title in SECTIONS:
+            entries = self.glossary.get(section) or {}
+            rows = []
+            for english in sorted(entries):
+                translations = entries[english]
+                values = [(lang, translations.get(code)) for lang, code in zip(languages, codes) if code]
+                values = [(lang, value) for lang, value in values if value]
+                if not values:
+                    continue
+                if multi:
+                    rows.append(f"- {english}: " + "; ".join(f"{lang}: {value}" for lang, value in values))
+                else:
+                    rows.append(f"- {english} → {values[0][1]}")
+            if rows:
+                lines.append(f"{title}:")
+                lines.extend(rows)
+        return lines
+
+    def system(self, languages: Sequence[str]) -> str:
+        """System message for requests translating into languages (one, or several at once)"""
+        key = tuple(languages)
+        with self._lock:
+            prompt = self._prompts.get(key)
+        if prompt is not None:
+            return prompt
+        if len(languages) > 1:
+            wanted = ", ".join(f"{self._name(lang)} (field \"{lang}\")" for lang in languages)
+            head = (f"Target languages: {wanted}. Translate every item into each of them; each translation must "
+                    f"be in its own language only.")
+            fields: Optional[List[str]] = list(languages)
+        else:
+            name = self._name(languages[0])
+            head = f"Target language: {name}. Output must be in {name} only."
+            fields = None
+        glossary = self._glossary(languages)
+        parts = [RULES, head]
+        if glossary:
+            parts.append("Glossary (English → target language):\n" + "\n".join(glossary))
+        parts.append(reply_instruction(fields))
+        prompt = "\n\n".join(parts)
+        with self._lock:
+            self._prompts[key] = prompt
+        return prompt
+
+    def cache_key(self, languages: Sequence[str]) -> Optional[str]:
+        """prompt_cache_key for the language set's prefix, or None when disabled"""
+        if os.getenv("OPENAI_PROMPT_CACHE_KEY", "1").strip().lower() in ("0", "false", "no", "off"):
+            return None
+        digest = hashlib.sha256(self.system(languages).encode("utf-8")).hexdigest()[:16]
+        return f"hadith-{'+'.join(languages)}-{digest}"
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+    from .token_budget import TokenBudget
+
+    languages = sys.argv[1:] or list(config.LANGUAGES)
+    builder = PromptBuilder(config.GLOSSARY_PATH, config.LANGUAGES)
+    budget = TokenBudget()
+    shared = budget.input_tokens(RULES)
+    print(f"📝 glossary: {builder.glossary_path} ({sum(len(v) for v in builder.glossary.values())} entries)")
+    print(f"   rules shared by every language: {shared} tokens")
+    for lang in languages:
+        tokens = budget.input_tokens(builder.system([lang]))
+        print(f"   {lang:12} prefix {tokens:5} tokens, {cacheable_tokens(tokens):5} cacheable")
+    if len(languages) > 1:
+        tokens = budget.input_tokens(builder.system(languages))
+        print(f"   {'+'.join(languages)}: prefix {tokens} tokens, {cacheable_tokens(tokens)} cacheable")
+    print(f"   (prefixes under {CACHE_MIN_TOKENS} tokens are never cached)")
+
+
+if __name__ == "__main__":
+    main()
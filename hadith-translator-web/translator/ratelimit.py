@@ -0,0 +1,191 @@
+"""
+Adaptive request limiter for the OpenAI API (token bucket + AIMD).
+
+Two limits are enforced together:
+    rate         requests per second, refilled into a token bucket whose
+                 capacity is the current concurrency (so idle time allows a
+                 short burst, never more)
+    concurrency  requests in flight
+
+Both adapt AIMD-style. Until the first 429 they grow by one per success
+(slow start: roughly doubling every round of requests); after it, a success
+adds RATE_STEP / rate to the rate and 1 / concurrency to the concurrency,
+i.e. about +RATE_STEP requests/second per second and +1 slot per round. A
+429 halves both (at most once per DECREASE_COOLDOWN, so a burst of 429s
+from one overload counts once). A Retry-After header, or
+x-ratelimit-remaining-requests/-tokens reaching zero with the matching
+x-ratelimit-reset-*, pauses every caller until that moment. Other retries
+(timeouts, 5xx) use full-jitter exponential backoff.
+
+With a SharedLimiter (shared_limiter.py) every request also draws from the
+host-wide buckets of its API key, and 429s / exhausted windows pause the
+other processes using the key as well.
+
+Settings (environment):
+    OPENAI_PARALLEL_REQUESTS      starting concurrency (default 2)
+    OPENAI_MAX_PARALLEL_REQUESTS  concurrency ceiling (default 16)
+    OPENAI_RATE_LIMIT_RPS         starting requests/second (default 1)
+    OPENAI_MAX_RPS                rate ceiling (default 50)
+    OPENAI_RATE_LIMIT_WAIT        backoff ceiling in seconds (default 60)
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional
+
+from .shared_limiter import SharedLimiter, header_value, parse_duration, retry_after
+
+RATE_STEP = 0.5
+MIN_RATE = 0.05
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 2.0
+BACKOFF_BASE = 1.0
+
+class AdaptiveLimiter:
+    """Thread-safe token bucket whose rate and concurrency follow AIMD"""
+
+    def __init__(self, rate: float = None, concurrency: int = None, max_rate: float = None,
+                 max_concurrency: int = None, max_backoff: float = None,
+                 shared: Optional[SharedLimiter] = None):
+        self.max_concurrency = max_concurrency or max(1, int(os.getenv("OPENAI_MAX_PARALLEL_REQUESTS", "16")))
+        self.max_rate = max_rate or float(os.getenv("OPENAI_MAX_RPS", "50"))
+        self.max_backoff = max_backoff or float(os.getenv("OPENAI_RATE_LIMIT_WAIT", "60"))
+        start_concurrency = concurrency or int(os.getenv("OPENAI_PARALLEL_REQUESTS", "2"))
+        self._concurrency = float(min(self.max_concurrency, max(1, start_concurrency)))
+        self._rate = min(self.max_rate, max(MIN_RATE, rate or float(os.getenv("OPENAI_RATE_LIMIT_RPS", "1"))))
+        self._tokens = 1.0
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._slow_start = True
+        self.throttled = 0
+        self.shared = shared
+        self._cond = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, int(self._concurrency))
+
+    def _refill(self, now: float):
+        capacity = float(self.concurrency)
+        self._tokens = min(capacity, self._tokens + (now - self._refilled) * self._rate)
+        self._refilled = now
+
+    def acquire(self):
+        """Block until a request may start (call release when it ends)"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._in_flight >= self.concurrency:
+                    wait = None
+                elif self._tokens < 1.0:
+                    wait = (1.0 - self._tokens) / self._rate
+                else:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    return
+                # Releases and rate changes notify; timed waits cover refills and pauses
+                self._cond.wait(wait)
+
+    def release(self):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        """Hold a request slot; tokens is the request's TPM cost for the shared buckets"""
+        self.acquire()
+        try:
+            if self.shared:
+                self.shared.acquire(tokens)
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, headers: Optional[Mapping] = None):
+        """Additive increase, unless the server says the window is nearly used up"""
+        if self.shared:
+            self.shared.observe(headers)
+        with self._cond:
+            if not self._apply_headers(headers):
+                if self._slow_start:
+                    self._rate += 1.0
+                    self._concurrency += 1.0
+                else:
+                    self._rate += RATE_STEP / self._rate
+                    self._concurrency += 1.0 / self._concurrency
+                self._rate = min(self.max_rate, self._rate)
+                self._concurrency = min(float(self.max_concurrency), self._concurrency)
+            self._cond.notify_all()
+
+    def on_throttle(self, headers: Optional[Mapping] = None, attempt: int = 0) -> float:
+        """
+        Multiplicative decrease after a 429
+
+        Returns:
+            Seconds the caller should wait before retrying (Retry-After if
+            given, else jittered backoff); all other callers are paused too
+        """
+        with self._cond:
+            now = time.monotonic()
+            self.throttled += 1
+            self._slow_start = False
+            if now - self._last_decrease >= DECREASE_COOLDOWN:
+                self._rate = max(MIN_RATE, self._rate * DECREASE_FACTOR)
+                self._concurrency = max(1.0, self._concurrency * DECREASE_FACTOR)
+                self._tokens = min(self._tokens, 0.0)
+                self._last_decrease = now
+            wait = retry_after(headers)
+            if wait is None:
+                wait = self.backoff(attempt)
+            wait = min(wait, self.max_backoff)
+            self._paused_until = max(self._paused_until, now + wait)
+            self._apply_headers(headers)
+            self._cond.notify_all()
+        if self.shared:
+            self.shared.throttle(wait)
+        return wait
+
+    def _apply_headers(self, headers: Optional[Mapping]) -> bool:
+        """Pause until reset when a remaining-* header hits zero; True if nearly exhausted"""
+        nearly_exhausted = False
+        for kind in ("requests", "tokens"):
+            remaining = header_value(headers, f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = int(remaining)
+            except ValueError:
+                continue
+            if remaining <= 0:
+                reset = parse_duration(header_value(headers, f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self._paused_until = max(self._paused_until, time.monotonic() + min(reset, self.max_backoff))
+                nearly_exhausted = True
+            elif kind == "requests" and remaining <= self._in_flight:
+                # Requests already in flight would use up the rest of the window
+                nearly_exhausted = True
+        return nearly_exhausted
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number attempt (0-based)"""
+        return random.uniform(0, min(self.max_backoff, BACKOFF_BASE * (2 ** attempt)))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "rate_per_sec": round(self._rate, 2),
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "paused_sec": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "throttled": self.throttled,
+                "slow_start": self._slow_start,
+                "shared": self.shared.stats() if self.shared else None,
+            }
@@ -1,13 +1,20 @@
 """
 Translation runner - runs translation in background with stop support and progress callback.
+A corpus-wide plan (dedup.build_plan) sends each distinct source text once;
+batches go through an asyncio pipeline (pipeline.run_pipeline) that keeps as
+many requests in flight as the translator's adaptive limiter allows while a
+writer stage persists results. run_multi translates into several languages
+with one request per batch (multilang) and persists every language in the
+same pass. Hadiths that keep failing are dead-lettered (dead_letter) and
+retried one by one after the main pass instead of failing whole batches.
 """
 import os
 import json
-import glob
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Callable, Optional
+from typing import Dict, List, Callable, Optional, Set, Tuple
+import itertools
 import threading
 
 # Project root
@@ -17,10 +24,27 @@ if str(_root) not in __import__('sys').path:
 
 import config
 from .api_translator import APITranslator
+from .corpus import get_corpus
+from . import batch_api
+from .dead_letter import default_store_path, open_dead_letters
+from .batch_api import REPLAY_SLICE, Replay
+from .dedup import TranslationPlan, build_plan, text_key
+from .pipeline import ChapterGate, plan_batches, run_pipeline
+from .serialization import dump, COMPACT
 
 logger = logging.getLogger("hadith.runner")
 
 
+def _billed(usage: Dict[str, int]) -> int:
+    """Prompt + completion tokens; cached_tokens is a share of prompt_tokens, not extra"""
+    return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+
+def _usage_stats(usage: Dict[str, int]) -> Dict:
+    prompt = usage.get("prompt_tokens", 0)
+    return dict(usage, cached_percent=round(100 * usage.get("cached_tokens", 0) / prompt, 1) if prompt else 0.0)
+
+
 class TranslationRunner:
     """Runs hadith translation; supports stop event and progress callback."""
 
@@ -30,9 +54,11 @@ class TranslationRunner:
         self.checkpoints_dir = config.CHECKPOINTS_DIR
         self.output_dir = config.OUTPUT_DIR
         self.books_dir = config.BOOKS_DIR
+        self.corpus = get_corpus(self.books_dir)
         self.stop_event = stop_event or threading.Event()
         self.progress_callback = progress_callback
         self.app = app  # Flask app for DB; if set, use DB instead of JSON
+        self.dead_letters = open_dead_letters(default_store_path(self.checkpoints_dir))
         self.checkpoints_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -107,32 +133,10 @@ class TranslationRunner:
                 db.session.commit()
             return
         p = self.checkpoints_dir / f"{checkpoint['language']}_api_checkpoint.json"
-        with open(p, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        dump(checkpoint, p, COMPACT)
 
     def load_all_books(self) -> List[Dict]:
-        books = []
-        for metadata_file in glob.glob(str(self.books_dir / "**/metadata.json"), recursive=True):
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                metadata['_path'] = Path(metadata_file).parent
-                books.append(metadata)
-        return sorted(books, key=lambda x: x.get('numericId', 0))
-
-    def load_chapter_file(self, book_path: Path, chapter_file: str) -> Optional[Dict]:
-        p = book_path / chapter_file
-        if not p.exists():
-            return None
-        with open(p, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def extract_hadith_text(self, hadith: Dict) -> str:
-        eng = hadith.get('english', {})
-        narrator = eng.get('narrator', '')
-        text = eng.get('text', '')
-        if narrator and text:
-            return f"{narrator} {text}".strip()
-        return text or narrator or ""
+        return self.corpus.books()
 
     def count_total_hadiths(self) -> int:
         try:
@@ -144,17 +148,62 @@ class TranslationRunner:
             pass
         return 50884
 
+    def pending_plan(self, languages: List[str], processed: set) -> Tuple[TranslationPlan, Set[str]]:
+        """Plan of every hadith not in processed, and its dead-lettered keys (stale letters are pruned)"""
+        plan = build_plan(self.corpus, processed)
+        dead_keys: Set[str] = set()
+        if self.dead_letters:
+            for lang in languages:
+                known = self.dead_letters.keys(lang)
+                # Hadiths translated since they failed (or no longer in the corpus) need no retry
+                self.dead_letters.remove(lang, known - plan.texts.keys())
+                dead_keys |= known & plan.texts.keys()
+        return plan, dead_keys
+
     def run(self, language: str) -> dict:
         """Run translation for one language. Returns final status dict."""
-        if language not in config.LANGUAGES:
-            return {"error": f"Unknown language: {language}"}
+        return self._run([language])
+
+    def run_multi(self, languages: List[str]) -> dict:
+        """Run translation for several languages at once: each request returns all of them (multilang)."""
+        return self._run(list(dict.fromkeys(languages)))
+
+    def run_batch(self, languages: List[str], wait: bool = False, submit: bool = True) -> dict:
+        """Translate through the OpenAI Batch API (batch_api): poll, ingest, prepare and submit jobs."""
+        return batch_api.run(self, list(dict.fromkeys(languages)), wait=wait, submit_jobs=submit)
+
+    def _run(self, languages: List[str], replay: Optional[Replay] = None) -> dict:
+        """
+        Translate every pending hadith into languages and persist as chapters complete.
+
+        With replay (batch_api), only its keys are planned and their translations
+        come from it instead of API requests.
+        """
+        unknown = [lang for lang in languages if lang not in config.LANGUAGES]
+        if not languages or unknown:
+            return {"error": f"Unknown language: {', '.join(unknown)}"}
         if not self.books_dir.exists():
             return {"error": f"Books directory not found: {self.books_dir}"}
 
+        multi = len(languages) > 1
+        language = "+".join(languages)  # label in progress, logs and the result
         self.stop_event.clear()
         total_hadiths = self.count_total_hadiths()
-        checkpoint = self.load_checkpoint(language)
-        processed_set = set(checkpoint.get("processed_hadiths", []))
+        checkpoints = {lang: self.load_checkpoint(lang) for lang in languages}
+        processed_sets = {lang: set(cp.get("processed_hadiths", [])) for lang, cp in checkpoints.items()}
+        # A hadith is planned unless every language already has it; requests then ask only
+        # for the languages it lacks (see missing below)
+        processed_set = set.intersection(*processed_sets.values())
+
+        def total_translated() -> int:
+            return min(cp["stats"]["total_translated"] for cp in checkpoints.values())
+
+        def per_language() -> Optional[Dict]:
+            if not multi:
+                return None
+            return {lang: {"total_translated": cp["stats"]["total_translated"], "api_calls": cp["stats"]["api_calls"]}
+                    for lang, cp in checkpoints.items()}
+
         all_books = self.load_all_books()
         logger.info("loaded %s books, processed_already=%s", len(all_books), len(processed_set))
         if not all_books:
@@ -178,26 +227,30 @@ class TranslationRunner:
             }
         self._emit_progress({
             "language": language,
-            "total_translated": checkpoint["stats"]["total_translated"],
+            "total_translated": total_translated(),
             "total_hadiths": total_hadiths,
-            "remaining": total_hadiths - checkpoint["stats"]["total_translated"],
+            "remaining": total_hadiths - total_translated(),
             "book_id": None,
             "phase": "started",
             "books_count": len(all_books),
+            "languages": per_language(),
         })
-        lang_info = config.LANGUAGES[language]
-        output_lang_dir = self.output_dir / language
-        output_lang_dir.mkdir(parents=True, exist_ok=True)
-        output_file = output_lang_dir / "all_translations.json"
+        output_files = {}
         all_translations = {}
-        if not self.app and output_file.exists():
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    all_translations.update(json.load(f))
-            except Exception:
-                pass
+        for lang in languages:
+            output_lang_dir = self.output_dir / lang
+            output_lang_dir.mkdir(parents=True, exist_ok=True)
+            output_files[lang] = output_lang_dir / "all_translations.json"
+            all_translations[lang] = {}
+            if not self.app and output_files[lang].exists():
+                try:
+                    with open(output_files[lang], 'r', encoding='utf-8') as f:
+                        all_translations[lang].update(json.load(f))
+                except Exception:
+                    pass
 
-        batch_size = min(15, max(1, int(os.getenv("OPENAI_BATCH_SIZE", "12"))))
+        # The plan projection packs for every language; batches pack per language set (grouped_batches)
+        target = tuple(languages) if multi else languages[0]
         last_book_id = None
         last_chapter_file = None
         stop_reason = "completed"
@@ -207,160 +260,224 @@ class TranslationRunner:
             "run start: language=%s total_hadiths=%s books=%s processed_already=%s",
             language, total_hadiths, len(all_books), len(processed_set),
         )
-        try:
-            for book in all_books:
-                if self.stop_event.is_set():
-                    stop_reason = "user_stop"
-                    stop_message = "تم الإيقاف يدوياً (زر إيقاف أو إشارة إيقاف)."
-                    logger.info("stop_event set, breaking at book_id=%s", last_book_id)
-                    break
-                book_id = book['id']
-                last_book_id = book_id
-                logger.info("book start: book_id=%s", book_id)
-                book_path = book['_path']
-                chapters = book.get('chapters', [])
-                translated_hadiths = {}
-
-                if not chapters:
-                    all_file = book_path / "all.json"
-                    if all_file.exists():
-                        data = self.load_chapter_file(book_path, "all.json")
-                        if data:
-                            hadiths = data.get('hadiths', [])
-                            hadiths_to_translate = [
-                                h for h in hadiths
-                                if f"{book_id}:{h.get('chapterId', 0)}:{h.get('id')}" not in processed_set
-                            ]
-                            if hadiths_to_translate:
-                                texts = [self.extract_hadith_text(h) for h in hadiths_to_translate]
-                                meta = [{"id": h.get('id') if h.get('id') is not None else i, "chapterId": h.get('chapterId') if h.get('chapterId') is not None else 0, "narrator": h.get('english', {}).get('narrator', '')} for i, h in enumerate(hadiths_to_translate)]
-                                self._emit_progress({
-                                    "phase": "translating",
-                                    "book_id": book_id,
-                                    "chapter_file": "all.json",
-                                    "hadiths_count": len(hadiths_to_translate),
-                                    "language": language,
-                                    "total_translated": checkpoint["stats"]["total_translated"],
-                                    "total_hadiths": total_hadiths,
-                                    "remaining": total_hadiths - checkpoint["stats"]["total_translated"],
-                                })
-                                logger.info("translating book_id=%s all.json hadiths=%s", book_id, len(hadiths_to_translate))
-                                try:
-                                    translated_texts = self.translator.translate_batch(texts, language)
-                                except Exception:
-                                    translated_texts = texts
-                                for i, (m, txt) in enumerate(zip(meta, translated_texts)):
-                                    if i < len(texts) and (txt or "").strip() == (texts[i] or "").strip():
-                                        continue
-                                    key = f"{m['chapterId']}:{m['id']}"
-                                    composite = f"{book_id}:{m['chapterId']}:{m['id']}"
-                                    translated_hadiths[key] = {"narrator": m['narrator'], "text": txt, "hadith_id": m['id'], "chapter_id": m['chapterId'], "quality": {"confidence": "HIGH", "needs_review": False}}
-                                    if composite not in processed_set:
-                                        processed_set.add(composite)
-                                        checkpoint['stats']['total_translated'] += 1
-                                        checkpoint['processed_hadiths'].append(composite)
-                                checkpoint['stats']['api_calls'] += (len(texts) + batch_size - 1) // batch_size
-                    if translated_hadiths:
-                        new_translations = [
-                            {"book_id": book_id, "chapter_id": int(m.get("chapterId") or 0), "hadith_id": int(m.get("id") or 0),
-                             "narrator": m.get("narrator"), "text": translated_hadiths[f"{m['chapterId']}:{m['id']}"]["text"],
-                             "quality_confidence": "HIGH", "needs_review": False}
-                            for m in meta if f"{m['chapterId']}:{m['id']}" in translated_hadiths
-                        ] if self.app else None
-                        if not self.app:
-                            if book_id not in all_translations:
-                                all_translations[book_id] = {}
-                            all_translations[book_id].update(translated_hadiths)
-                        self.save_checkpoint(checkpoint, new_translations=new_translations)
-                        if not self.app:
-                            with open(output_file, 'w', encoding='utf-8') as f:
-                                json.dump(all_translations, f, ensure_ascii=False, indent=2)
-                    self._emit_progress({
-                        "language": language,
-                        "book_id": book_id,
-                        "total_translated": checkpoint['stats']['total_translated'],
-                        "total_hadiths": total_hadiths,
-                        "remaining": total_hadiths - checkpoint['stats']['total_translated']
-                    })
-                    logger.info("book done (all.json): book_id=%s total_translated=%s", book_id, checkpoint['stats']['total_translated'])
-                    continue
+        plan, dead_keys = self.pending_plan(languages, processed_set)
+        letters = self.dead_letters
+        if replay is not None:
+            plan = plan.split(replay.translations)
+            pack = lambda texts: [slice(i, i + REPLAY_SLICE) for i in range(0, len(texts), REPLAY_SLICE)]
+        # Kept out of the batches; retried one by one once the main pass is done
+        dead_plan = plan.split(dead_keys if replay is None else ())
+        targets = dict(plan.targets, **dead_plan.targets)
+        # Languages each text still lacks in any of its hadiths: a request never asks again
+        # for a language every hadith of its texts already has
+        missing = {
+            key: tuple(lang for lang in languages
+                       if any(f"{m['book_id']}:{m['chapterId']}:{m['id']}" not in processed_sets[lang] for m in members))
+            for key, members in targets.items()
+        }
+        # Requests and billed tokens per language when requests ask for different language sets
+        charged: Optional[Dict[str, List[int]]] = None
+        if replay is not None:
+            translate = lambda texts: [replay.translations[text_key(text)] for text in texts]
+        elif multi:
+            charged = {lang: [0, 0] for lang in languages}
+            charged_lock = threading.Lock()
 
-                for ch in chapters:
-                    if self.stop_event.is_set():
-                        stop_reason = "user_stop"
-                        stop_message = "تم الإيقاف يدوياً (زر إيقاف أو إشارة إيقاف)."
-                        break
-                    ch_file = ch.get('file')
-                    last_chapter_file = ch_file
-                    if not ch_file:
-                        continue
-                    data = self.load_chapter_file(book_path, ch_file)
-                    if not data:
-                        continue
-                    hadiths = data.get('hadiths', [])
-                    hadiths_to_translate = [
-                        h for h in hadiths
-                        if f"{book_id}:{h.get('chapterId', 0)}:{h.get('id')}" not in processed_set
-                    ]
-                    if not hadiths_to_translate:
-                        continue
-                    texts = [self.extract_hadith_text(h) for h in hadiths_to_translate]
-                    meta = [{"id": h.get('id') if h.get('id') is not None else i, "chapterId": h.get('chapterId') if h.get('chapterId') is not None else 0, "narrator": h.get('english', {}).get('narrator', '')} for i, h in enumerate(hadiths_to_translate)]
-                    self._emit_progress({
-                        "phase": "translating",
-                        "book_id": book_id,
-                        "chapter_file": ch_file,
-                        "hadiths_count": len(hadiths_to_translate),
-                        "language": language,
-                        "total_translated": checkpoint["stats"]["total_translated"],
-                        "total_hadiths": total_hadiths,
-                        "remaining": total_hadiths - checkpoint["stats"]["total_translated"],
-                    })
-                    logger.info("translating book_id=%s chapter=%s hadiths=%s", book_id, ch_file, len(hadiths_to_translate))
-                    try:
-                        translated_texts = self.translator.translate_batch(texts, language)
-                    except Exception as api_err:
-                        last_error = f"OpenAI/API: {type(api_err).__name__}: {api_err}"
-                        stop_reason = "error"
-                        stop_message = "خطأ أثناء استدعاء الترجمة (مثلاً حد المعدل، انقطاع الشبكة، مفتاح API)."
-                        logger.exception("translate_batch failed: book_id=%s chapter=%s hadiths=%s", book_id, ch_file, len(texts))
-                        raise
-                    for i, (m, txt) in enumerate(zip(meta, translated_texts)):
-                        if i < len(texts) and (txt or "").strip() == (texts[i] or "").strip():
+            def translate(texts):
+                # Batches hold texts of one language set (main pass) or a single text (dead letters)
+                wanted = missing[text_key(texts[0])]
+                calls, tokens = self.translator.thread_usage()
+                if len(wanted) == 1:
+                    result = [{wanted[0]: t} for t in self.translator.translate_chunk(texts, wanted[0])]
+                else:
+                    result = self.translator.translate_chunk_multi(texts, list(wanted))
+                # Each request served every wanted language: each counts the calls, tokens are shared
+                calls_after, tokens_after = self.translator.thread_usage()
+                with charged_lock:
+                    for lang in wanted:
+                        charged[lang][0] += calls_after - calls
+                        charged[lang][1] += (tokens_after - tokens) // len(wanted)
+                return result
+        else:
+            translate = lambda texts: self.translator.translate_chunk(texts, languages[0])
+        plan_summary = plan.summary(lambda texts: self.translator.budget.pack(texts, target, record=False))
+        # Batch API requests were paid for outside this process; count them like synchronous ones
+        if replay is not None:
+            self.translator.count_usage(replay.requests, replay.usage)
+        logger.info(
+            "plan: pending=%s unique_texts=%s duplicates=%s api_calls=%s->%s (saved %s%%)",
+            plan_summary["pending_hadiths"], plan_summary["unique_texts"], plan_summary["duplicate_hadiths"],
+            plan_summary["api_calls_without_dedup"], plan_summary["api_calls_with_dedup"], plan_summary["saved_percent"],
+        )
+        plan_summary["dead_letters"] = len(dead_plan.texts)
+        self._emit_progress({"language": language, "phase": "planned", "plan": plan_summary})
+        # One worker per possible slot; the translator's limiter decides how many actually run
+        concurrency = self.translator.limiter.max_concurrency
+        base_stats = {lang: dict(cp['stats']) for lang, cp in checkpoints.items()}
+        translator_calls_start = self.translator.api_calls - (replay.requests if replay else 0)
+        translator_tokens_start = _billed(self.translator.usage) - (_billed(replay.usage) if replay else 0)
+
+        gate = ChapterGate(plan.key_chapters())
+        dead_lettered = set()
+
+        def dead_letter_stats() -> Optional[Dict]:
+            return {lang: letters.stats(lang) for lang in languages} if letters else None
+
+        def commit(chapters):
+            """Fan translations out to the hadiths of completed chapters, then save once per language"""
+            nonlocal last_book_id, last_chapter_file
+            for (book_id, chapter_file), _ in chapters:
+                if book_id != last_book_id:
+                    logger.info("book start: book_id=%s", book_id)
+                last_book_id = book_id
+                last_chapter_file = chapter_file
+            calls = self.translator.api_calls - translator_calls_start
+            tokens = _billed(self.translator.usage) - translator_tokens_start
+            reasons: Dict[str, str] = {}
+            for lang in languages:
+                checkpoint = checkpoints[lang]
+                processed = processed_sets[lang]
+                translated_by_book: Dict[str, Dict] = {}
+                new_translations = [] if self.app else None
+                failed, recovered = [], []
+                for (book_id, chapter_file), items in chapters:
+                    for key, source, translated in items:
+                        if multi and lang not in translated:
+                            continue  # not asked for: every hadith of this text already has it
+                        txt = translated[lang] if multi else translated
+                        if (txt or "").strip() == (source or "").strip():
+                            if (lang, key) not in dead_lettered:
+                                dead_lettered.add((lang, key))
+                                if key not in reasons:
+                                    reasons[key] = self.translator.take_failure(source) or "untranslated"
+                                failed.append((key, f"{book_id}/{chapter_file}", source, reasons[key]))
                             continue
-                        key = f"{m['chapterId']}:{m['id']}"
-                        composite = f"{book_id}:{m['chapterId']}:{m['id']}"
-                        translated_hadiths[key] = {"narrator": m['narrator'], "text": txt, "hadith_id": m['id'], "chapter_id": m['chapterId'], "quality": {"confidence": "HIGH", "needs_review": False}}
-                        if composite not in processed_set:
-                            processed_set.add(composite)
+                        if key in dead_keys:
+                            recovered.append(key)
+                        for m in targets[key]:
+                            if m['book_id'] != book_id or m['chapter_file'] != chapter_file:
+                                continue
+                            composite = f"{m['book_id']}:{m['chapterId']}:{m['id']}"
+                            if composite in processed:
+                                continue
+                            translated_by_book.setdefault(m['book_id'], {})[f"{m['chapterId']}:{m['id']}"] = {
+                                "narrator": m['narrator'], "text": txt, "hadith_id": m['id'], "chapter_id": m['chapterId'],
+                                "quality": {"confidence": "HIGH", "needs_review": False},
+                            }
+                            processed.add(composite)
                             checkpoint['stats']['total_translated'] += 1
                             checkpoint['processed_hadiths'].append(composite)
-                    checkpoint['stats']['api_calls'] += (len(texts) + batch_size - 1) // batch_size
-                    new_translations = [
-                        {"book_id": book_id, "chapter_id": int(m.get("chapterId") or 0), "hadith_id": int(m.get("id") or 0),
-                         "narrator": m.get("narrator"), "text": translated_hadiths[f"{m['chapterId']}:{m['id']}"]["text"],
-                         "quality_confidence": "HIGH", "needs_review": False}
-                        for m in meta if f"{m['chapterId']}:{m['id']}" in translated_hadiths
-                    ] if self.app else None
-                    if not self.app:
-                        if book_id not in all_translations:
-                            all_translations[book_id] = {}
-                        all_translations[book_id].update(translated_hadiths)
-                    self.save_checkpoint(checkpoint, new_translations=new_translations)
-                    if not self.app:
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            json.dump(all_translations, f, ensure_ascii=False, indent=2)
-                    self._emit_progress({
-                        "language": language,
-                        "book_id": book_id,
-                        "total_translated": checkpoint['stats']['total_translated'],
-                        "total_hadiths": total_hadiths,
-                        "remaining": total_hadiths - checkpoint['stats']['total_translated']
-                    })
-                    logger.info(
-                        "chapter done: book_id=%s chapter=%s total_translated=%s remaining=%s",
-                        book_id, ch_file, checkpoint['stats']['total_translated'], total_hadiths - checkpoint['stats']['total_translated'],
-                    )
+                            if self.app:
+                                new_translations.append({
+                                    "book_id": m['book_id'], "chapter_id": int(m['chapterId'] or 0), "hadith_id": int(m['id'] or 0),
+                                    "narrator": m['narrator'], "text": txt, "quality_confidence": "HIGH", "needs_review": False,
+                                })
+                if charged is not None:
+                    with charged_lock:
+                        lang_calls, lang_tokens = charged[lang]
+                else:
+                    # Single language, or Batch API replay: every request served all languages
+                    lang_calls, lang_tokens = calls, tokens // len(languages)
+                checkpoint['stats']['api_calls'] = base_stats[lang]['api_calls'] + lang_calls
+                checkpoint['stats']['tokens_used'] = base_stats[lang].get('tokens_used', 0) + lang_tokens
+                if not self.app:
+                    for translated_book_id, translated_hadiths in translated_by_book.items():
+                        all_translations[lang].setdefault(translated_book_id, {}).update(translated_hadiths)
+                self.save_checkpoint(checkpoint, new_translations=new_translations)
+                if letters:
+                    letters.add(lang, failed)
+                    letters.remove(lang, recovered)
+                if not self.app:
+                    dump(all_translations[lang], output_files[lang], COMPACT)
+            self._emit_progress({
+                "language": language,
+                "phase": "translating",
+                "book_id": last_book_id,
+                "chapter_file": last_chapter_file,
+                "chapters_committed": len(chapters),
+                "chapters_open": gate.open_chapters,
+                "total_translated": total_translated(),
+                "total_hadiths": total_hadiths,
+                "remaining": total_hadiths - total_translated(),
+                "languages": per_language(),
+                "cache": self.translator.cache.stats() if self.translator.cache else None,
+                "rate_limit": self.translator.limiter.stats(),
+                "packing": self.translator.budget.stats(),
+                "usage": _usage_stats(self.translator.usage),
+                "validation": self.translator.validation.stats(),
+                "dead_letters": dead_letter_stats(),
+            })
+            logger.info(
+                "committed: chapters=%s last_book_id=%s chapter=%s total_translated=%s remaining=%s",
+                len(chapters), last_book_id, last_chapter_file, total_translated(),
+                total_hadiths - total_translated(),
+            )
+
+        def grouped_batches(source: TranslationPlan):
+            """Batches of source, one run of them per set of missing languages (largest set first)"""
+            groups = sorted({missing[key] for key in source.texts}, key=lambda langs: (-len(langs), langs))
+            if len(groups) > 1:
+                logger.info("language sets: %s", ", ".join(
+                    f"{'+'.join(langs)}={sum(1 for k in source.texts if missing[k] == langs)}" for langs in groups))
+            for langs in groups:
+                part = source.split([key for key in source.texts if missing[key] == langs])
+                if replay is not None:
+                    yield plan_batches(part.chapters(), part.texts, pack)
+                    continue
+                group_target = tuple(langs) if len(langs) > 1 else langs[0]
+                yield plan_batches(
+                    part.chapters(), part.texts,
+                    lambda texts, target=group_target: self.translator.budget.pack(texts, target, record=False),
+                    lambda texts, target=group_target: self.translator.budget.record(texts, target))
+
+        def persist(finished):
+            """Writer stage: a chapter is committed once all its translations are back"""
+            completed = []
+            for batch, translated_texts in finished:
+                completed.extend(gate.add(batch, translated_texts))
+            if completed:
+                commit(completed)
+
+        try:
+            logger.info("pipeline: concurrency=%s batch_tokens=%s multi=%s", concurrency,
+                        self.translator.budget.budget, multi)
+            result = run_pipeline(
+                itertools.chain.from_iterable(grouped_batches(plan)),
+                translate,
+                persist,
+                self.stop_event,
+                concurrency=concurrency,
+            )
+            partial = gate.drain()
+            if partial:
+                # Stopped mid-chapter: keep what was paid for; resume translates only the rest
+                logger.info("committing %s partly translated chapters", len(partial))
+                commit(partial)
+            if dead_plan.texts and result.error is None and not result.stopped:
+                logger.info("retrying %s dead-lettered texts one by one", len(dead_plan.texts))
+                self._emit_progress({"language": language, "phase": "dead_letters",
+                                     "dead_letters": dead_letter_stats()})
+                gate = ChapterGate(dead_plan.key_chapters())
+                result = run_pipeline(
+                    plan_batches(dead_plan.chapters(), dead_plan.texts,
+                                 lambda texts: [slice(i, i + 1) for i in range(len(texts))]),
+                    translate,
+                    persist,
+                    self.stop_event,
+                    concurrency=concurrency,
+                )
+                partial = gate.drain()
+                if partial:
+                    commit(partial)
+            if result.error is not None:
+                api_err = result.error
+                last_error = f"OpenAI/API: {type(api_err).__name__}: {api_err}"
+                stop_reason = "error"
+                stop_message = "خطأ أثناء استدعاء الترجمة (مثلاً حد المعدل، انقطاع الشبكة، مفتاح API)."
+            elif result.stopped:
+                stop_reason = "user_stop"
+                stop_message = "تم الإيقاف يدوياً (زر إيقاف أو إشارة إيقاف)."
+                logger.info("stop_event set, stopped at book_id=%s", last_book_id)
         except Exception as e:
             if not last_error:
                 last_error = f"{type(e).__name__}: {e}"
@@ -372,15 +489,17 @@ class TranslationRunner:
             stop_time = datetime.now(timezone.utc).isoformat()
             logger.info(
                 "run end: language=%s stop_reason=%s total_translated=%s last_book_id=%s last_chapter=%s stop_time=%s",
-                language, stop_reason, checkpoint['stats']['total_translated'], last_book_id, last_chapter_file, stop_time,
+                language, stop_reason, total_translated(), last_book_id, last_chapter_file, stop_time,
             )
             if last_error:
                 logger.error("last_error: %s", last_error)
 
         return {
             "language": language,
-            "total_translated": checkpoint['stats']['total_translated'],
-            "api_calls": checkpoint['stats'].get('api_calls', 0),
+            "total_translated": total_translated(),
+            "api_calls": max(cp['stats'].get('api_calls', 0) for cp in checkpoints.values()),
+            "languages": per_language(),
+            "dead_letters": dead_letter_stats(),
             "stopped": self.stop_event.is_set(),
             "stop_reason": stop_reason,
             "stop_message": stop_message,
@@ -0,0 +1,364 @@
+"""
+Full-text search over english.text, english.narrator and arabic.
+
+The index is one memory-mapped file (search.idx, same section layout as
+corpus.pack). Terms are stored sorted and found by binary search; each
+posting list is delta-encoded doc ids packed at the narrowest byte width
+that fits (1, 2 or 4) followed by one term-frequency byte per doc.
+
+Queries:
+    ranked   BM25 over documents containing any query term
+    boolean  terms are ANDed, "OR" separates alternatives, -term excludes;
+             matches are ordered by BM25
+Both accept book/category filters.
+
+Build:
+    python -m translator.search [books_dir] [index_path]
+"""
+import heapq
+import math
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .arabic import normalize_arabic
+from .corpus import Corpus
+from .corpus_pack import SectionFile, write_sections
+
+MAGIC = b"HDSI"
+INDEX_VERSION = 2
+INDEX_NAME = "search.idx"
+
+SEARCH_FIELDS = ("id", "idInBook", "chapterId", "arabic", "english.narrator", "english.text")
+DOC_COLUMNS = ("book", "id", "chapterId", "idInBook", "len")
+NULL_INT = -2 ** 31
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_WIDTH_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+_TOKEN = re.compile(r'[0-9a-z\u0621-\u064a]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase plus the Arabic normalization of arabic.normalize_arabic"""
+    return normalize_arabic(text.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    """Index/query tokens; single Latin letters (the "s" of "Allah's") are dropped"""
+    return [t for t in _TOKEN.findall(normalize(text or "")) if len(t) > 1 or not t.isascii()]
+
+
+def default_index_path(books_dir: Path) -> Path:
+    """search.idx next to the books directory (overridable with SEARCH_INDEX_PATH)"""
+    env = os.getenv("SEARCH_INDEX_PATH")
+    return Path(env) if env else Path(books_dir).parent / INDEX_NAME
+
+
+def _int(value) -> int:
+    return NULL_INT if value is None else int(value)
+
+
+def pack_doc_ids(doc_ids) -> tuple:
+    """
+    Delta-encode ascending doc ids at the narrowest width that fits
+
+    Returns:
+        (width in bytes, encoded bytes)
+    """
+    deltas = array('I', [doc_ids[0]])
+    deltas.extend(b - a for a, b in zip(doc_ids, doc_ids[1:]))
+    largest = max(deltas)
+    width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+    return width, array(_WIDTH_FORMATS[width], deltas).tobytes()
+
+
+def unpack_doc_ids(view: memoryview, width: int) -> List[int]:
+    """Inverse of pack_doc_ids; view must start at a multiple of width"""
+    return list(accumulate(view.cast(_WIDTH_FORMATS[width])))
+
+
+def allowed_books(books: List[Dict], book=None, category: str = None) -> Optional[set]:
+    """Indexes into books matching a book id (or list of ids) and category; None = no filter"""
+    if book is None and category is None:
+        return None
+    wanted = {book} if isinstance(book, str) else set(book or [])
+    allowed = set()
+    for i, entry in enumerate(books):
+        if wanted and entry["id"] not in wanted:
+            continue
+        if category and entry["category"] != category:
+            continue
+        allowed.add(i)
+    return allowed
+
+
+def build_index(books_dir: Path, index_path: Path = None) -> Dict:
+    """
+    Tokenize every hadith under books_dir and write the search index
+
+    Returns:
+        Dict with path, docs, terms and bytes written
+    """
+    books_dir = Path(books_dir)
+    index_path = Path(index_path) if index_path else default_index_path(books_dir)
+    corpus = Corpus(books_dir, cache_size=0)
+
+    docs = {name: array('i') for name in DOC_COLUMNS}
+    postings: Dict[str, tuple] = {}
+    books = []
+    doc = 0
+    for book_index, book_id in enumerate(corpus.book_ids()):
+        books.append({"id": book_id, "category": corpus.category(book_id)})
+        for chapter_file in corpus.chapter_files(book_id):
+            for hadith in corpus.iter_chapter(book_id, chapter_file, SEARCH_FIELDS):
+                english = hadith.get('english') or {}
+                tokens = tokenize(english.get('text')) + tokenize(english.get('narrator')) + tokenize(hadith.get('arabic'))
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    entry = postings.get(token)
+                    if entry is None:
+                        entry = postings[token] = (array('I'), array('B'))
+                    entry[0].append(doc)
+                    entry[1].append(min(tf, 255))
+                docs["book"].append(book_index)
+                docs["id"].append(_int(hadith.get('id')))
+                docs["chapterId"].append(_int(hadith.get('chapterId')))
+                docs["idInBook"].append(_int(hadith.get('idInBook')))
+                docs["len"].append(len(tokens))
+                doc += 1
+
+    terms = sorted(postings, key=lambda t: t.encode('utf-8'))
+    term_offsets = array('I', [0])
+    term_data = bytearray()
+    post_offsets = array('Q')
+    post_widths = array('B')
+    dfs = array('I')
+    post_data = bytearray()
+    for term in terms:
+        doc_ids, tfs = postings[term]
+        term_data += term.encode('utf-8')
+        term_offsets.append(len(term_data))
+        width, encoded = pack_doc_ids(doc_ids)
+        post_data += b"\0" * (-len(post_data) % width)
+        post_offsets.append(len(post_data))
+        post_data += encoded
+        post_data += tfs.tobytes()
+        post_widths.append(width)
+        dfs.append(len(doc_ids))
+
+    sections = [(f"doc.{name}", docs[name].tobytes()) for name in DOC_COLUMNS]
+    sections += [
+        ("terms.offsets", term_offsets.tobytes()),
+        ("terms.data", bytes(term_data)),
+        ("post.offsets", post_offsets.tobytes()),
+        ("post.widths", post_widths.tobytes()),
+        ("post.df", dfs.tobytes()),
+        ("post.data", bytes(post_data)),
+    ]
+    total_len = sum(docs["len"])
+    header = {
+        "version": INDEX_VERSION,
+        "count": doc,
+        "terms": len(terms),
+        "avgdl": total_len / doc if doc else 0.0,
+        "books": books,
+    }
+    written = write_sections(index_path, MAGIC, INDEX_VERSION, header, sections)
+    return {"path": str(index_path), "docs": doc, "terms": len(terms), "bytes": written}
+
+
+class SearchIndex:
+    """Memory-mapped reader for search.idx"""
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        self._sections = SectionFile(self.index_path, MAGIC, INDEX_VERSION)
+        self.header = self._sections.header
+        self.count = self.header["count"]
+        self.avgdl = self.header["avgdl"] or 1.0
+        self.books = self.header["books"]
+        section = self._sections.section
+        self._docs = {name: section(f"doc.{name}", 'i') for name in DOC_COLUMNS}
+        self._term_offsets = section("terms.offsets", 'I')
+        self._term_data = section("terms.data")
+        self._post_offsets = section("post.offsets", 'Q')
+        self._post_widths = section("post.widths", 'B')
+        self._df = section("post.df", 'I')
+        self._post_data = section("post.data")
+
+    def close(self):
+        self._sections.close()
+
+    def _term(self, i: int) -> bytes:
+        return bytes(self._term_data[self._term_offsets[i]:self._term_offsets[i + 1]])
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Position of term in the sorted dictionary, or None"""
+        key = term.encode('utf-8')
+        i = bisect_left(range(self.header["terms"]), key, key=self._term)
+        if i < self.header["terms"] and self._term(i) == key:
+            return i
+        return None
+
+    def postings(self, term_id: int):
+        """(doc ids, term frequencies) of a term"""
+        df = self._df[term_id]
+        width = self._post_widths[term_id]
+        start = self._post_offsets[term_id]
+        end = start + df * width
+        return unpack_doc_ids(self._post_data[start:end], width), self._post_data[end:end + df]
+
+    def _doc_set(self, term: str) -> set:
+        term_id = self.term_id(term)
+        return set(self.postings(term_id)[0]) if term_id is not None else set()
+
+    def _score(self, terms: Iterable[str], candidates: Optional[set], allowed: Optional[set]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        doc_book = self._docs["book"]
+        doc_len = self._docs["len"]
+        norm = K1 * (1 - B)
+        slope = K1 * B / self.avgdl
+        for term in set(terms):
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            df = self._df[term_id]
+            idf = math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+            doc_ids, tfs = self.postings(term_id)
+            for doc, tf in zip(doc_ids, tfs):
+                if candidates is not None and doc not in candidates:
+                    continue
+                if allowed is not None and doc_book[doc] not in allowed:
+                    continue
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm + slope * doc_len[doc])
+        return scores
+
+    def search(self, query: str, mode: str = "ranked", book=None, category: str = None,
+               limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Run a query
+
+        Args:
+            query: Free text; in boolean mode "OR" and -term are operators
+            mode: "ranked" (any term, BM25) or "boolean"
+            book: Book id or list of book ids to search in
+            category: Category to search in (e.g. "the_9_books")
+            limit, offset: Page of results
+
+        Returns:
+            {"total", "results": [{book_id, category, chapterId, id, idInBook, score}], "took_ms"}
+        """
+        if mode not in ("ranked", "boolean"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        started = time.perf_counter()
+        allowed = allowed_books(self.books, book, category)
+        clauses: List[List[str]] = [[]]
+        excluded: List[str] = []
+        for word in query.split():
+            if word == "OR":
+                clauses.append([])
+            elif word.startswith('-') and len(word) > 1:
+                excluded += tokenize(word[1:])
+            else:
+                clauses[-1] += tokenize(word)
+        clauses = [c for c in clauses if c]
+        terms = [t for clause in clauses for t in clause]
+
+        candidates = None
+        if mode == "boolean":
+            candidates = set()
+            for clause in clauses:
+                matched = None
+                for term in sorted(set(clause), key=lambda t: self._df_of(t)):
+                    docs = self._doc_set(term)
+                    matched = docs if matched is None else matched & docs
+                    if not matched:
+                        break
+                candidates |= matched or set()
+        if excluded:
+            blocked = set().union(*(self._doc_set(t) for t in excluded))
+            if candidates is None:
+                scores = self._score(terms, None, allowed)
+                for doc in blocked:
+                    scores.pop(doc, None)
+            else:
+                candidates -= blocked
+                scores = self._score(terms, candidates, allowed)
+        else:
+            scores = self._score(terms, candidates, allowed)
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))[offset:]
+        return {
+            "total": len(scores),
+            "results": [dict(self.document(doc), score=round(score, 4)) for doc, score in top],
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _df_of(self, term: str) -> int:
+        term_id = self.term_id(term)
+        return self._df[term_id] if term_id is not None else 0
+
+    def document(self, doc: int) -> Dict:
+        """Identity of a document: book, category and the hadith keys"""
+        book = self.books[self._docs["book"][doc]]
+
+        def value(name):
+            v = self._docs[name][doc]
+            return None if v == NULL_INT else v
+
+        return {
+            "book_id": book["id"],
+            "category": book["category"],
+            "chapterId": value("chapterId"),
+            "id": value("id"),
+            "idInBook": value("idInBook"),
+        }
+
+
+_indexes: Dict[Path, Optional[SearchIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(index_path: Path) -> Optional[SearchIndex]:
+    """Shared reader for index_path, or None if it has not been built"""
+    key = Path(index_path).resolve()
+    with _indexes_lock:
+        if key not in _indexes:
+            index = None
+            if key.is_file():
+                try:
+                    index = SearchIndex(key)
+                except (OSError, ValueError):
+                    index = None
+            _indexes[key] = index
+        return _indexes[key]
+
+
+def main():
+    if len(sys.argv) > 1:
+        books_dir = Path(sys.argv[1])
+    else:
+        _root = Path(__file__).resolve().parent.parent
+        if str(_root) not in sys.path:
+            sys.path.insert(0, str(_root))
+        import config
+        books_dir = config.BOOKS_DIR
+    index_path = Path(sys.argv[2]) if len(sys.argv) > 2 else default_index_path(books_dir)
+    stats = build_index(books_dir, index_path)
+    print(f"✅ {stats['path']}: {stats['docs']:,} hadiths, {stats['terms']:,} terms, {stats['bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Token-budget packing of texts into translation requests.
+
+A fixed number of hadiths per request with a fixed max_tokens overflows
+on long hadiths (the reply is cut off and the missing items fall back to
+English) and wastes per-request overhead on short ones. Instead each text
+gets an estimated output size and consecutive texts are packed until the
+request's estimated output reaches the budget:
+
+    input tokens   counted with tiktoken (the model's encoding) when it is
+                   installed, otherwise about CHARS_PER_TOKEN chars/token
+    output tokens  input x OUTPUT_RATIO[language] + ITEM_OVERHEAD, times a
+                   per-language correction learned from response usage
+                   (for a multi-language request: the sum over its
+                   languages plus FIELD_OVERHEAD per language)
+
+A text whose estimate alone exceeds the budget is sent on its own, with
+max_tokens raised to fit it (up to the model's output ceiling). Each
+request's max_tokens is its estimate x RESPONSE_MARGIN.
+
+Settings (environment):
+    OPENAI_BATCH_TOKENS       estimated output tokens per request (default 3000)
+    OPENAI_BATCH_SIZE         most texts per request (default 30)
+    OPENAI_MAX_OUTPUT_TOKENS  the model's max_tokens ceiling (default 16384)
+
+Packing report (whole corpus or some books):
+    python -m translator.token_budget <language> [book_id ...]
+"""
+import os
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+DEFAULT_BUDGET = 3000
+DEFAULT_MAX_ITEMS = 30
+DEFAULT_MAX_OUTPUT = 16384
+CHARS_PER_TOKEN = 4
+# Output tokens per English input token (o200k encoding); a starting point
+# that usage from real responses corrects
+OUTPUT_RATIO = {
+    "turkish": 1.4,
+    "french": 1.3,
+    "indonesian": 1.3,
+    "urdu": 1.6,
+    "bengali": 2.0,
+    "german": 1.4,
+    "spanish": 1.3,
+    "russian": 1.4,
+}
+DEFAULT_RATIO = 1.5
+# "[12] " marker and line break per item
+ITEM_OVERHEAD = 6
+# '"turkish": "...", ' around each language of a JSON reply
+FIELD_OVERHEAD = 6
+RESPONSE_MARGIN = 1.25
+MIN_MAX_TOKENS = 256
+# Weight of the newest response in the per-language correction (EWMA)
+CORRECTION_WEIGHT = 0.2
+CORRECTION_RANGE = (0.5, 3.0)
+
+
+Languages = Union[str, Sequence[str]]
+
+
+def _correction_key(language: Languages) -> str:
+    return language if isinstance(language, str) else "+".join(language)
+
+
+def _encoder(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Encodings are downloaded on first use; offline, fall back to the estimate
+        return None
+
+
+class TokenBudget:
+    """Packs texts into requests by estimated output tokens and tracks fill and truncation"""
+
+    def __init__(self, model: str = "gpt-4o-mini", budget: int = None, max_items: int = None,
+                 max_output: int = None):
+        self.model = model
+        self.budget = budget or int(os.getenv("OPENAI_BATCH_TOKENS", DEFAULT_BUDGET))
+        self.max_items = max(1, max_items or int(os.getenv("OPENAI_BATCH_SIZE", DEFAULT_MAX_ITEMS)))
+        self.max_output = max_output or int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", DEFAULT_MAX_OUTPUT))
+        self.encoder = _encoder(model)
+        self.input_tokens = lru_cache(maxsize=1 << 16)(self._count)
+        self._correction: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.packed = 0
+        self.packed_texts = 0
+        self.oversize = 0
+        self._fill = 0.0
+        self.sent = 0
+        self.truncated = 0
+        self._estimated_out = 0
+        self._actual_out = 0
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoder is not None:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def output_tokens(self, text: str, language: Languages) -> int:
+        """Estimated tokens of the translation(s) of text, including its [N] marker"""
+        if isinstance(language, str):
+            ratio = OUTPUT_RATIO.get(language, DEFAULT_RATIO)
+            overhead = ITEM_OVERHEAD
+        else:
+            ratio = sum(OUTPUT_RATIO.get(lang, DEFAULT_RATIO) for lang in language)
+            overhead = ITEM_OVERHEAD + FIELD_OVERHEAD * len(language)
+        correction = self._correction.get(_correction_key(language), 1.0)
+        return int(self.input_tokens(text) * ratio * correction) + overhead
+
+    def pack(self, texts: List[str], language: Languages, record: bool = True) -> List[slice]:
+        """
+        Cut texts (kept in order) into requests of at most budget estimated output tokens
+
+        Args:
+            record: Count the requests in stats (False for projections)
+
+        Returns:
+            One slice of texts per request; an oversize text is a slice of its own
+        """
+        batches: List[slice] = []
+        start = 0
+        filled = 0
+        for i, text in enumerate(texts):
+            out = self.output_tokens(text, language)
+            if i > start and (filled + out > self.budget or i - start >= self.max_items):
+                batches.append(self._close(start, i, filled, record))
+                start, filled = i, 0
+            filled += out
+        if start < len(texts):
+            batches.append(self._close(start, len(texts), filled, record))
+        return batches
+
+    def _close(self, start: int, end: int, filled: int, record: bool) -> slice:
+        if record:
+            self._record(end - start, filled)
+        return slice(start, end)
+
+    def record(self, texts: List[str], language: Languages):
+        """Count one request carrying texts in stats (for callers that pack with record=False)"""
+        self._record(len(texts), sum(self.output_tokens(t, language) for t in texts))
+
+    def _record(self, items: int, filled: int):
+        with self._lock:
+            self.packed += 1
+            self.packed_texts += items
+            if filled > self.budget:
+                self.oversize += 1
+            self._fill += min(1.0, filled / self.budget)
+
+    def max_tokens(self, texts: List[str], language: Languages) -> int:
+        """max_tokens for one request carrying texts"""
+        estimate = sum(self.output_tokens(t, language) for t in texts)
+        return min(self.max_output, max(MIN_MAX_TOKENS, int(estimate * RESPONSE_MARGIN)))
+
+    def observe(self, texts: List[str], language: Languages, completion_tokens: Optional[int], truncated: bool):
+        """Record a response: correct the language's output estimate, count truncation"""
+        estimate = sum(self.output_tokens(t, language) for t in texts)
+        with self._lock:
+            self.sent += 1
+            if truncated:
+                self.truncated += 1
+            if not completion_tokens or not estimate:
+                return
+            low, high = CORRECTION_RANGE
+            key = _correction_key(language)
+            current = self._correction.get(key, 1.0)
+            measured = current * completion_tokens / estimate
+            if truncated:
+                # Only a lower bound on the full length: raise the estimate at once
+                self._correction[key] = min(high, max(current, measured))
+                return
+            self._estimated_out += estimate
+            self._actual_out += completion_tokens
+            self._correction[key] = min(high, max(low, current + CORRECTION_WEIGHT * (measured - current)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "budget": self.budget,
+                "tokenizer": self.encoder.name if self.encoder is not None else "estimate",
+                "requests": self.packed,
+                "texts_per_request": round(self.packed_texts / self.packed, 1) if self.packed else 0.0,
+                "fill_ratio": round(self._fill / self.packed, 3) if self.packed else 0.0,
+                "oversize": self.oversize,
+                "sent": self.sent,
+                "truncated": self.truncated,
+                "truncation_rate": round(self.truncated / self.sent, 4) if self.sent else 0.0,
+                "output_vs_estimate": round(self._actual_out / self._estimated_out, 2) if self._estimated_out else None,
+            }
+
+
+def main():
+    _root = Path(__file__).resolve().parent.parent
+    if str(_root) not in sys.path:
+        sys.path.insert(0, str(_root))
+    import config
+    from .corpus import Corpus, extract_hadith_text
+    from .jsonstream import HADITH_FIELDS
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m translator.token_budget <language> [book_id ...]")
+        sys.exit(1)
+    language = sys.argv[1]
+    corpus = Corpus(config.BOOKS_DIR, cache_size=0)
+    book_ids = sys.argv[2:] or corpus.book_ids()
+    budget = TokenBudget()
+    texts = 0
+    for book_id in book_ids:
+        for chapter_file in corpus.chapter_files(book_id):
+            chapter = [extract_hadith_text(h) for h in corpus.iter_chapter(book_id, chapter_file, HADITH_FIELDS)]
+            chapter = [t for t in chapter if t.strip()]
+            budget.pack(chapter, language)
+            texts += len(chapter)
+    s = budget.stats()
+    print(f"📦 {language}: {texts:,} texts → {s['requests']:,} requests "
+          f"({s['texts_per_request']} per request, fill {s['fill_ratio']:.0%}, {s['oversize']} oversize; "
+          f"budget {s['budget']} tokens, tokenizer: {s['tokenizer']})")
+
+
+if __name__ == "__main__":
+    main()
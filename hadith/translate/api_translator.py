@@ -1,13 +1,31 @@
 """
 API-based Translator using GPT-4o-mini for full translation
 With parallel API calls for faster processing
+Translations are kept in a persistent cache (llm_cache.py): text already
+translated with the same model, prompt and language is never sent again
+Requests from every process on the host using the same key are paced
+together by shared_limiter.py, so parallel runs stay under the key's limits
+Texts are packed into requests by estimated output tokens (token_budget.py),
+not a fixed count, so long hadiths are not cut off and short ones share a request
+Batch replies are JSON items with ids (structured.py), validated one by one;
+only the items that fail are sent again
+Batch system prompts come from prompts.py: a byte-identical prefix per
+language (rules, glossary, reply format) that the provider's prompt cache
+serves; cached prompt tokens are counted in usage["cached_tokens"]
 """
 import os
+import threading
 import time
-from typing import List, Dict, Tuple
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 from openai import OpenAI
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import config
+import structured
+from llm_cache import default_cache_path, open_cache, translate_cached
+from prompts import PromptBuilder
+from shared_limiter import estimate_tokens, open_limiter, retry_after
+from token_budget import TokenBudget
 
 class APITranslator:
     def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
@@ -30,6 +48,15 @@ class APITranslator:
         self.api_key = api_key
         self.model = model
         self.client = OpenAI(api_key=self.api_key, timeout=120.0)  # 2 minute timeout
+        self.cache = open_cache(default_cache_path(Path(__file__).resolve().parent / "checkpoints"))
+        # Requests actually sent (cache hits cost none)
+        self.api_calls = 0
+        self._calls_lock = threading.Lock()
+        self.limiter = open_limiter(self.api_key)
+        self.budget = TokenBudget(self.model)
+        self.validation = structured.ReplyStats()
+        self.prompts = PromptBuilder()
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
         
         # Language names mapping
         self.lang_names = {
@@ -43,7 +70,55 @@ class APITranslator:
             "russian": "Russian"
         }
         
-        print(f"API Translator initialized (model: {self.model})")
+        print(f"API Translator initialized (model: {self.model}, cache: {self.cache.path if self.cache else 'off'})")
+
+    def _count_call(self):
+        with self._calls_lock:
+            self.api_calls += 1
+
+    def _create(self, messages: List[Dict], max_tokens: int, **kwargs):
+        """
+        Send one chat completion, paced by the host-wide shared limiter
+        
+        A 429 pauses every process sharing the key before it is re-raised
+        """
+        if self.limiter:
+            self.limiter.acquire(estimate_tokens((m["content"] for m in messages), max_tokens))
+        self._count_call()
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,  # Lower temperature for more consistent translations
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        except Exception as e:
+            if self.limiter and getattr(e, "status_code", None) == 429:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                self.limiter.throttle(retry_after(headers) or 1.0)
+            raise
+        if self.limiter:
+            self.limiter.observe(raw.headers)
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            with self._calls_lock:
+                self.usage["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                self.usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+                self.usage["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+        return response
+
+    @staticmethod
+    def _system_prompt(lang_name: str) -> str:
+        return (f"You are a professional translator specializing in Islamic religious texts. "
+                f"Translate the following English hadith text to {lang_name}. "
+                f"Maintain the religious terminology accurately and preserve the meaning precisely. "
+                f"Keep the narrator attribution if present.")
+
+    def _batch_system_prompt(self, target_language: str) -> str:
+        return self.prompts.system(target_language)
     
     def translate(self, text: str, target_language: str) -> str:
         """
@@ -60,25 +135,25 @@ class APITranslator:
             return text
         
         lang_name = self.lang_names.get(target_language, target_language.capitalize())
-        
+        system_prompt = self._system_prompt(lang_name)
+        return translate_cached(self.cache, self.model, system_prompt, target_language, [text],
+                                lambda texts: [self._translate_uncached(texts[0], system_prompt,
+                                                                        self.budget.max_tokens(texts, target_language))])[0]
+
+    def _translate_uncached(self, text: str, system_prompt: str, max_tokens: int) -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            response = self._create(
+                [
                     {
                         "role": "system",
-                        "content": f"You are a professional translator specializing in Islamic religious texts. "
-                                 f"Translate the following English hadith text to {lang_name}. "
-                                 f"Maintain the religious terminology accurately and preserve the meaning precisely. "
-                                 f"Keep the narrator attribution if present."
+                        "content": system_prompt
                     },
                     {
                         "role": "user",
                         "content": text
                     }
                 ],
-                temperature=0.3,  # Lower temperature for more consistent translations
-                max_tokens=1000
+                max_tokens=max_tokens
             )
             
             translated = response.choices[0].message.content.strip()
@@ -93,66 +168,69 @@ class APITranslator:
         Translate a single batch (used for parallel processing)
         
         Args:
-            batch_info: Tuple of (batch_index, texts, lang_name)
+            batch_info: Tuple of (batch_index, texts, target_language)
         
         Returns:
             Tuple of (batch_index, translated_texts)
         """
-        batch_idx, batch_texts, lang_name = batch_info
+        batch_idx, batch_texts, target_language = batch_info
+        prompt_cache_key = self.prompts.cache_key(target_language)
         
-        # Combine texts with separators
-        combined_text = "\n\n---\n\n".join([
-            f"[{idx+1}] {text}" for idx, text in enumerate(batch_texts)
-        ])
+        results: List[Optional[str]] = [None] * len(batch_texts)
+        pending = list(range(len(batch_texts)))
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a professional translator specializing in Islamic religious texts. "
-                                 f"Translate the following English hadith texts to {lang_name}. "
-                                 f"Maintain religious terminology accurately and preserve meaning precisely. "
-                                 f"Keep narrator attributions if present. "
-                                 f"Return translations in the same format, numbered [1], [2], etc. "
-                                 f"Each translation should be on a separate line."
-                    },
-                    {
-                        "role": "user",
-                        "content": combined_text
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=4000
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            # Parse results (simple split by lines)
-            lines = [line.strip() for line in result.split('\n') if line.strip()]
-            
-            # Extract translations (remove [N] markers)
-            batch_translated = []
-            for line in lines:
-                if ']' in line:
-                    line = line.split(']', 1)[1].strip()
-                batch_translated.append(line)
-            
-            # Ensure we have the right number of translations
-            while len(batch_translated) < len(batch_texts):
-                batch_translated.append(batch_texts[len(batch_translated)])
-            
-            return (batch_idx, batch_translated[:len(batch_texts)])
-            
+            # The first request carries the whole batch, repairs only the items that failed validation
+            for repair in range(structured.repair_rounds() + 1):
+                sources = [batch_texts[i] for i in pending]
+                response = self._create(
+                    [
+                        {
+                            "role": "system",
+                            "content": self._batch_system_prompt(target_language)
+                        },
+                        {
+                            "role": "user",
+                            "content": structured.number_texts(sources)
+                        }
+                    ],
+                    max_tokens=self.budget.max_tokens(sources, target_language),
+                    response_format=structured.response_format(),
+                    # extra_body: prompt_cache_key predates support in older openai clients
+                    **({"extra_body": {"prompt_cache_key": prompt_cache_key}} if prompt_cache_key else {})
+                )
+                
+                choice = response.choices[0]
+                truncated = choice.finish_reason == "length"
+                usage = getattr(response, "usage", None)
+                self.budget.observe(sources, target_language, getattr(usage, "completion_tokens", None), truncated)
+                if truncated:
+                    print(f"      ⚠️ Batch {batch_idx+1} cut off at max_tokens ({len(sources)} texts)")
+                
+                translations, failures = structured.validate(choice.message.content, sources)
+                self.validation.record(len(sources), failures, resent=repair > 0)
+                for j, values in enumerate(translations):
+                    if values is not None:
+                        results[pending[j]] = values[structured.TEXT_FIELD]
+                pending = [pending[j] for j in sorted(failures)]
+                if not pending:
+                    break
+                print(f"      ⚠️ Batch {batch_idx+1}: {len(pending)}/{len(sources)} items failed validation "
+                      f"({', '.join(sorted(set(failures.values())))})")
+        
         except Exception as e:
             print(f"      ⚠️ Batch {batch_idx+1} error: {e}")
-            # Return original texts on error
-            return (batch_idx, batch_texts)
+        
+        if pending:
+            self.validation.gave_up(len(pending))
+        # Items that never validated keep the original text (not cached, sent again next run)
+        return (batch_idx, [translated if translated is not None else text
+                            for translated, text in zip(results, batch_texts)])
     
     def translate_batch(self, texts: List[str], target_language: str) -> List[str]:
         """
         Translate a batch of texts using PARALLEL API calls (3x faster)
+        Texts found in the cache are not sent
         
         Args:
             texts: List of English texts
@@ -164,18 +242,20 @@ class APITranslator:
         if not texts:
             return []
         
-        lang_name = self.lang_names.get(target_language, target_language.capitalize())
+        return translate_cached(self.cache, self.model, self._batch_system_prompt(target_language), target_language, texts,
+                                lambda missing: self._translate_parallel(missing, target_language))
+
+    def _translate_parallel(self, texts: List[str], target_language: str) -> List[str]:
+        """Uncached translate_batch: parallel requests packed by token budget"""
+        if not texts:
+            return []
         
-        # Process in batches - larger batches are faster but must stay within token limits
-        batch_size = 15
         max_parallel = 3  # 3 parallel calls - safe for rate limits
         
-        # Split into batches
+        # Split into requests that fill the output token budget
         batches = []
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i+batch_size]
-            batch_idx = i // batch_size
-            batches.append((batch_idx, batch_texts, lang_name))
+        for batch_idx, part in enumerate(self.budget.pack(texts, target_language)):
+            batches.append((batch_idx, texts[part], target_language))
         
         total_batches = len(batches)
         print(f"      🚀 {total_batches} batches ({max_parallel} parallel)...", end='', flush=True)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark serialization backends and modes on the real corpus
+قياس سرعة الحفظ (orjson/json، pretty/compact) على الأحاديث الحقيقية
+
+Two payloads are measured:
+    corpus        every chapter of hadith/books (what migrate/sync/add_turkish write)
+    translations  an all_translations.json-shaped dict built from the English
+                  text (what the runners rewrite after every chapter)
+
+Usage:
+    python bench_serialization.py [--repeat 3]
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Dict
+
+from corpus import Corpus
+from serialization import BACKENDS, MODES, dumps, loads, orjson
+
+
+def build_payloads(books_dir: Path) -> Dict[str, Dict]:
+    corpus = Corpus(books_dir, cache_size=0, use_pack=False)
+    chapters = {}
+    translations = {}
+    for book_id in corpus.book_ids():
+        book_translations = translations.setdefault(book_id, {})
+        for chapter_file in corpus.chapter_files(book_id):
+            data = corpus.load_chapter(book_id, chapter_file)
+            if data is None:
+                continue
+            chapters[f"{book_id}/{chapter_file}"] = data
+            for hadith in data.get('hadiths', []):
+                chapter_id = hadith.get('chapterId') if hadith.get('chapterId') is not None else 0
+                english = hadith.get('english') or {}
+                book_translations[f"{chapter_id}:{hadith.get('id')}"] = {
+                    'narrator': english.get('narrator', ''),
+                    'text': english.get('text', ''),
+                    'hadith_id': hadith.get('id'),
+                    'chapter_id': chapter_id,
+                    'quality': {'confidence': 'HIGH', 'needs_review': False},
+                }
+    return {"corpus": chapters, "translations": translations}
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization backends')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (best is reported)')
+    parser.add_argument('--books-dir', default=str(Path(__file__).resolve().parent.parent / "books"))
+    args = parser.parse_args()
+
+    backends = [b for b in BACKENDS if b != "orjson" or orjson is not None]
+    if orjson is None:
+        print("⚠️  orjson not installed, only the json backend is measured (pip install orjson)")
+
+    print("Loading corpus...")
+    payloads = build_payloads(Path(args.books_dir))
+
+    print(f"\n{'payload':<13} {'backend':<7} {'mode':<8} {'dump ms':>9} {'load ms':>9} {'MB':>7} {'MB/s':>8}")
+    print("-" * 66)
+    for name, payload in payloads.items():
+        baseline = None
+        for backend in backends:
+            for mode in MODES:
+                data = dumps(payload, mode, backend)
+                dump_s = best_of(args.repeat, lambda: dumps(payload, mode, backend))
+                load_s = best_of(args.repeat, lambda: loads(data, backend))
+                size_mb = len(data) / (1024 * 1024)
+                if baseline is None:
+                    baseline = dump_s
+                print(f"{name:<13} {backend:<7} {mode:<8} {dump_s * 1000:>9.1f} {load_s * 1000:>9.1f} "
+                      f"{size_mb:>7.1f} {size_mb / dump_s:>8.0f}  x{baseline / dump_s:.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
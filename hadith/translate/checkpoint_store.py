@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compact checkpoints: one bitmap of processed hadiths per book
+نقاط حفظ مضغوطة: خريطة بتات واحدة لكل كتاب بالأحاديث المترجمة
+
+Checkpoints kept processed_hadiths as a list of book:chapterId:id strings,
+so every "already translated?" test scanned the list (O(n) per hadith,
+O(n²) per language) and every save rewrote ~1 MB of JSON. Now:
+
+    in memory   checkpoint['processed_hadiths'] is a ProcessedHadiths: a set
+                of book:chapterId:id keys (chapterId None is written 0),
+                plus one int bitmask of hadith ids per book and chapter
+    on disk     "processed" holds, per book, the chapter layout
+                [[chapterId, span], ...] and one bitmap (zlib, base64)
+                with the chapters laid end to end: book:c:id is bit
+                base(c) + id, base(c) being the sum of the spans before c
+    leftovers   keys that are not book:int:int stay strings under
+                "processed_other"
+
+Hadith ids run 1..n within each chapter, so the bitmaps are dense (51k bits
+for the 50k hadiths) and compress to almost nothing; a finished language is
+a few KB, mostly the chapter layouts. The file describes itself: loading
+needs neither the books nor the location index.
+
+Legacy checkpoints (a processed_hadiths list) are read as is and written in
+the new format on their next save. To convert them now (the original is
+kept next to it as .v1):
+    python checkpoint_store.py [checkpoint.json ...]
+"""
+import base64
+import json
+import shutil
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from serialization import dump, COMPACT
+
+CHECKPOINT_FORMAT = 2
+
+
+def canonical_key(key) -> str:
+    """book:chapterId:id with a missing chapterId written 0 (older runs wrote None)"""
+    key = str(key)
+    return key.replace(":None:", ":0:", 1) if ":None:" in key else key
+
+
+def _split(key: str) -> Optional[Tuple[str, int, int]]:
+    parts = key.split(":")
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    return parts[0], int(parts[1]), int(parts[2])
+
+
+def encode_book(chapters: Dict[int, int]) -> Dict:
+    """chapterId -> bitmask of hadith ids, as {"chapters": layout, "bits": bitmap}"""
+    layout = []
+    bits = 0
+    base = 0
+    for chapter_id in sorted(chapters):
+        mask = chapters[chapter_id]
+        span = mask.bit_length()
+        layout.append([chapter_id, span])
+        bits |= mask << base
+        base += span
+    raw = bits.to_bytes((base + 7) // 8, "little")
+    return {"chapters": layout, "bits": base64.b64encode(zlib.compress(raw, 9)).decode("ascii")}
+
+
+def decode_book(data: Dict) -> Dict[int, int]:
+    """Inverse of encode_book"""
+    bits = int.from_bytes(zlib.decompress(base64.b64decode(data["bits"])), "little")
+    chapters = {}
+    base = 0
+    for chapter_id, span in data["chapters"]:
+        mask = (bits >> base) & ((1 << span) - 1)
+        if mask:
+            chapters[chapter_id] = mask
+        base += span
+    return chapters
+
+
+def _ids(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ProcessedHadiths:
+    """Set of processed book:chapterId:id keys, mirrored into per-book, per-chapter bitmasks"""
+
+    def __init__(self, keys: Iterable = ()):
+        self._keys = set()
+        self._masks: Dict[str, Dict[int, int]] = {}
+        self._other = set()
+        self.update(keys)
+
+    def __contains__(self, key) -> bool:
+        return canonical_key(key) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def add(self, key):
+        key = canonical_key(key)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        parts = _split(key)
+        if parts is None:
+            self._other.add(key)
+            return
+        book_id, chapter_id, hadith_id = parts
+        chapters = self._masks.setdefault(book_id, {})
+        chapters[chapter_id] = chapters.get(chapter_id, 0) | 1 << hadith_id
+
+    def update(self, keys: Iterable):
+        for key in keys:
+            self.add(key)
+
+    def to_json(self) -> Dict:
+        return {
+            "processed": {book_id: encode_book(chapters) for book_id, chapters in sorted(self._masks.items())},
+            "processed_other": sorted(self._other),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "ProcessedHadiths":
+        """From a checkpoint dict, either format (a legacy processed_hadiths list is migrated)"""
+        processed = cls(data.get("processed_other") or [])
+        for book_id, book in (data.get("processed") or {}).items():
+            for chapter_id, mask in decode_book(book).items():
+                processed.update(f"{book_id}:{chapter_id}:{hadith_id}" for hadith_id in _ids(mask))
+        processed.update(data.get("processed_hadiths") or [])
+        return processed
+
+
+def load_checkpoint(path: Path, default: Dict) -> Dict:
+    """
+    Read a checkpoint, new or legacy format
+
+    Args:
+        path: Checkpoint file
+        default: Checkpoint to start from when the file does not exist
+
+    Returns:
+        Checkpoint dict whose processed_hadiths is a ProcessedHadiths
+    """
+    data = default
+    if Path(path).exists():
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    checkpoint = {k: v for k, v in data.items()
+                  if k not in ("format", "processed", "processed_other", "processed_count")}
+    checkpoint["processed_hadiths"] = ProcessedHadiths.from_json(data)
+    return checkpoint
+
+
+def save_checkpoint(checkpoint: Dict, path: Path):
+    """Write a checkpoint in the bitmap format"""
+    processed = checkpoint.get("processed_hadiths")
+    if not isinstance(processed, ProcessedHadiths):
+        raise TypeError("processed_hadiths must be a ProcessedHadiths (use load_checkpoint)")
+    data = {k: v for k, v in checkpoint.items() if k != "processed_hadiths"}
+    data["format"] = CHECKPOINT_FORMAT
+    data["processed_count"] = len(processed)
+    data.update(processed.to_json())
+    dump(data, path, COMPACT)
+
+
+def migrate(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    Rewrite a legacy checkpoint in the bitmap format, keeping the original as <name>.v1
+
+    Returns:
+        (size before, size after) in bytes; None when the file is already converted
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if "processed_hadiths" not in json.load(f):
+            return None
+    before = path.stat().st_size
+    checkpoint = load_checkpoint(path, {})
+    shutil.copy2(path, path.with_name(path.name + ".v1"))
+    save_checkpoint(checkpoint, path)
+    return before, path.stat().st_size
+
+
+def main():
+    paths: List[Path] = [Path(p) for p in sys.argv[1:]]
+    if not paths:
+        paths = sorted((Path(__file__).parent / config.CHECKPOINTS_DIR).glob("*_checkpoint.json"))
+    for path in paths:
+        sizes = migrate(path)
+        if sizes is None:
+            print(f"   {path.name}: already in the bitmap format")
+        else:
+            print(f"✅ {path.name}: {sizes[0]:,} -> {sizes[1]:,} bytes (original kept as {path.name}.v1)")
+
+
+if __name__ == "__main__":
+    main()
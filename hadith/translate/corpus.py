@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Shared lazy corpus reader for hadith/books
+قارئ مشترك لكتب الأحاديث مع تحميل كسول للفصول
+
+The book manifest (book_id -> category/path/chapter list) is read from
+books/manifest.json, so a cold start opens one file instead of every
+metadata.json. Each entry records its metadata.json size and mtime_ns; on
+load the two book directory levels are listed and stat'ed, entries whose
+metadata.json changed (and books added or removed) are rebuilt, and the
+manifest is saved again. Chapters are parsed on first use and kept in a bounded LRU. When a
+corpus.pack built by corpus_pack.py exists, chapters and single hadiths are
+read from it instead of the JSON files.
+
+Rebuild the whole manifest:
+    python corpus.py [books_dir]
+"""
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from jsonstream import iter_hadiths, project
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+# Number of parsed chapter files kept in memory per corpus
+DEFAULT_CACHE_CHAPTERS = 16
+
+
+def composite_key(book_id: str, hadith: Dict) -> str:
+    """Checkpoint/DB key of a hadith: book_id:chapterId:id (missing chapterId -> 0)"""
+    chapter_id = hadith.get('chapterId')
+    return f"{book_id}:{chapter_id if chapter_id is not None else 0}:{hadith.get('id')}"
+
+
+def extract_hadith_text(hadith: Dict) -> str:
+    """Extract English text from hadith (narrator + text)"""
+    english = hadith.get('english') or {}
+    narrator = english.get('narrator', '')
+    text = english.get('text', '')
+    if narrator and text:
+        return f"{narrator} {text}".strip()
+    return text or narrator or ""
+
+
+def _metadata_stamp(metadata_file: Path) -> Optional[List[int]]:
+    try:
+        stat = metadata_file.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_manifest(books_dir: Path, previous: Dict = None) -> Dict:
+    """
+    Build the manifest from books/<category>/<book_id>/metadata.json
+
+    Only the two fixed directory levels are listed; chapter files are not opened.
+    Entries of previous whose metadata.json has the same size and mtime_ns are
+    reused without parsing it again.
+    """
+    books_dir = Path(books_dir)
+    known = {entry["path"]: (book_id, entry)
+             for book_id, entry in ((previous or {}).get("books") or {}).items()}
+    books = {}
+    for category_dir in sorted(books_dir.iterdir()):
+        if not category_dir.is_dir() or category_dir.name.startswith('.'):
+            continue
+        for book_dir in sorted(category_dir.iterdir()):
+            metadata_file = book_dir / "metadata.json"
+            stamp = _metadata_stamp(metadata_file)
+            if stamp is None or not metadata_file.is_file():
+                continue
+            path = f"{category_dir.name}/{book_dir.name}"
+            book_id, entry = known.get(path, (None, None))
+            if entry is None or entry.get("stamp") != stamp:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                book_id = metadata['id']
+                entry = {"category": category_dir.name, "path": path, "stamp": stamp, "metadata": metadata}
+            books[book_id] = entry
+    return {"version": MANIFEST_VERSION, "books": books}
+
+
+def write_manifest(books_dir: Path, manifest: Dict = None) -> Path:
+    """Build (if not given) and save the manifest next to the book categories"""
+    books_dir = Path(books_dir)
+    if manifest is None:
+        manifest = build_manifest(books_dir)
+    manifest_path = books_dir / MANIFEST_NAME
+    # Written aside and renamed: several tools may refresh it at the same time
+    tmp_path = manifest_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+class Corpus:
+    """Read-only view of a books directory with a manifest and a chapter LRU"""
+
+    def __init__(self, books_dir: Path, cache_size: int = None, use_pack: bool = True):
+        self.books_dir = Path(books_dir)
+        if cache_size is None:
+            cache_size = int(os.getenv("CORPUS_CACHE_CHAPTERS", str(DEFAULT_CACHE_CHAPTERS)))
+        self.cache_size = max(0, cache_size)
+        self.use_pack = use_pack
+        self._manifest = None
+        self._pack = None
+        self._chapters = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self) -> Dict:
+        if self._manifest is None:
+            manifest = None
+            manifest_path = self.books_dir / MANIFEST_NAME
+            if manifest_path.is_file():
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get("version") != MANIFEST_VERSION:
+                    manifest = None
+            if not self.books_dir.is_dir():
+                manifest = {"books": {}}
+            else:
+                fresh = build_manifest(self.books_dir, manifest)
+                if fresh != manifest:
+                    try:
+                        write_manifest(self.books_dir, fresh)
+                    except OSError:
+                        pass  # read-only books directory: use the rebuilt manifest in memory
+                manifest = fresh
+            self._manifest = manifest
+        return self._manifest
+
+    @property
+    def pack(self):
+        """CorpusPack for this directory, or None when no corpus.pack was built"""
+        if not self.use_pack:
+            return None
+        if self._pack is None:
+            from corpus_pack import default_pack_path, open_pack
+            self._pack = open_pack(default_pack_path(self.books_dir), self.books_dir) or False
+        return self._pack or None
+
+    def book_ids(self) -> List[str]:
+        """Book ids ordered by numericId"""
+        books = self.manifest["books"]
+        return sorted(books, key=lambda b: books[b]["metadata"].get('numericId', 0))
+
+    def book(self, book_id: str) -> Optional[Dict]:
+        """Book metadata with '_path' and '_category' (same shape load_all_books returned)"""
+        entry = self.manifest["books"].get(book_id)
+        if entry is None:
+            return None
+        book = dict(entry["metadata"])
+        book['_path'] = self.books_dir / entry["path"]
+        book['_category'] = entry["category"]
+        return book
+
+    def books(self) -> List[Dict]:
+        return [self.book(book_id) for book_id in self.book_ids()]
+
+    def book_path(self, book_id: str) -> Optional[Path]:
+        entry = self.manifest["books"].get(book_id)
+        return self.books_dir / entry["path"] if entry else None
+
+    def category(self, book_id: str) -> Optional[str]:
+        entry = self.manifest["books"].get(book_id)
+        return entry["category"] if entry else None
+
+    def chapter_files(self, book_id: str) -> List[str]:
+        """Chapter files of a book relative to its directory, in metadata order"""
+        entry = self.manifest["books"].get(book_id)
+        if entry is None:
+            return []
+        files = [ch['file'] for ch in entry["metadata"].get('chapters', []) if ch.get('file')]
+        if not files and (self.books_dir / entry["path"] / "all.json").exists():
+            files = ["all.json"]
+        return files
+
+    def load_chapter(self, book_id: str, chapter_file: str) -> Optional[Dict]:
+        """
+        Parsed chapter JSON, served from the LRU when possible.
+        The returned dict is shared with other callers: treat it as read-only.
+        """
+        key = (book_id, chapter_file)
+        with self._lock:
+            data = self._chapters.get(key)
+            if data is not None:
+                self._chapters.move_to_end(key)
+                return data
+        pack = self.pack
+        data = pack.chapter(book_id, chapter_file) if pack else None
+        if data is None:
+            book_path = self.book_path(book_id)
+            if book_path is None:
+                return None
+            file_path = book_path / chapter_file
+            if not file_path.exists():
+                return None
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        if self.cache_size:
+            with self._lock:
+                self._chapters[key] = data
+                self._chapters.move_to_end(key)
+                while len(self._chapters) > self.cache_size:
+                    self._chapters.popitem(last=False)
+        return data
+
+    def iter_hadiths(self, book_id: str) -> Iterator[Dict]:
+        """Yield every hadith of a book in chapter order"""
+        for chapter_file in self.chapter_files(book_id):
+            data = self.load_chapter(book_id, chapter_file)
+            if data:
+                yield from data.get('hadiths', [])
+
+    def iter_chapter(self, book_id: str, chapter_file: str, fields=None) -> Iterator[Dict]:
+        """
+        Hadiths of one chapter projected to fields (see jsonstream.HADITH_FIELDS).
+        Nothing is added to the LRU: the chapter comes from the cache if it is
+        already there, else corpus.pack, else a streaming read of the file.
+        """
+        with self._lock:
+            data = self._chapters.get((book_id, chapter_file))
+        if data is not None:
+            for hadith in data.get('hadiths', []):
+                yield project(hadith, fields)
+            return
+        pack = self.pack
+        rows = pack.chapter_rows(book_id, chapter_file) if pack else None
+        if rows is not None:
+            for row in rows:
+                yield pack.hadith(row, fields)
+            return
+        book_path = self.book_path(book_id)
+        if book_path is None or not (book_path / chapter_file).exists():
+            return
+        yield from iter_hadiths(book_path / chapter_file, fields)
+
+    def find_hadith(self, book_id: str, chapter_id, hadith_id) -> Optional[Dict]:
+        """
+        Single hadith by (book, chapterId, id); chapterId None and 0 are the same key.
+        Read from corpus.pack when built, otherwise one seek through the
+        hadith location index (hadith_index.py).
+        """
+        pack = self.pack
+        if pack and book_id not in pack.stale_books:
+            return pack.get(book_id, chapter_id, hadith_id)
+        from hadith_index import get_location_index
+        return get_location_index(self.books_dir).get(book_id, chapter_id, hadith_id)
+
+    def clear_cache(self):
+        with self._lock:
+            self._chapters.clear()
+
+
+_corpora: Dict[Path, Corpus] = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(books_dir: Path) -> Corpus:
+    """Process-wide Corpus for a books directory (shares manifest and LRU between callers)"""
+    key = Path(books_dir).resolve()
+    with _corpora_lock:
+        corpus = _corpora.get(key)
+        if corpus is None:
+            corpus = _corpora[key] = Corpus(key)
+        return corpus
+
+
+def main():
+    books_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent.parent / "books"
+    manifest = build_manifest(books_dir)
+    manifest_path = write_manifest(books_dir, manifest)
+    chapters = sum(len(b["metadata"].get('chapters', [])) for b in manifest["books"].values())
+    print(f"✅ {manifest_path}: {len(manifest['books'])} books, {chapters} chapters")
+
+
+if __name__ == "__main__":
+    main()
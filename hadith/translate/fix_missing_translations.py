@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
-Fix missing translations by retranslating books that were marked as processed
+Fix missing translations by retranslating hadiths that were marked as processed
 but don't have translations in output file
 """
 import json
 import sys
 from pathlib import Path
 from run_api_translation import APIHadithTranslator
+from corpus import extract_hadith_text
+from hadith_index import get_location_index
 
 def fix_missing_translations(language: str = "turkish"):
-    """Retranslate books that are missing from output"""
+    """Retranslate hadiths that are missing from output"""
     
     translator = APIHadithTranslator()
     
@@ -24,47 +26,69 @@ def fix_missing_translations(language: str = "turkish"):
     else:
         all_translations = {}
     
-    # Find books that are marked as processed but missing translations
-    processed_books = checkpoint.get('processed_books', [])
-    missing_books = []
+    # Hadiths marked as processed in the checkpoint but missing from the output
+    missing = {}
+    for composite_id in sorted(checkpoint['processed_hadiths']):
+        parts = composite_id.split(':')
+        if len(parts) != 3:
+            continue
+        book_id, chapter_id, hadith_id = parts
+        book_translations = all_translations.get(book_id, {})
+        # Checkpoint keys write a missing chapterId as 0; older outputs used None
+        if f"{chapter_id}:{hadith_id}" in book_translations or (
+                chapter_id == '0' and f"None:{hadith_id}" in book_translations):
+            continue
+        missing.setdefault(book_id, []).append((chapter_id, hadith_id))
     
-    for book_id in processed_books:
-        if book_id not in all_translations or not all_translations[book_id]:
-            missing_books.append(book_id)
-    
-    if not missing_books:
-        print("✅ All processed books have translations!")
+    if not missing:
+        print("✅ All processed hadiths have translations!")
         return
     
-    print(f"⚠️  Found {len(missing_books)} books missing translations:")
-    for book_id in missing_books:
-        print(f"   - {book_id}")
+    print(f"⚠️  Found {sum(len(v) for v in missing.values()):,} hadiths missing translations:")
+    for book_id, keys in missing.items():
+        print(f"   - {book_id}: {len(keys):,}")
     
-    print(f"\n🔄 Retranslating missing books...")
+    print(f"\n🔄 Retranslating missing hadiths...")
     
-    # Load all books
-    all_books = translator.load_all_books()
+    # Resolve each hadith through the location index instead of reloading its book
+    index = get_location_index(translator.books_dir)
     
-    # Retranslate missing books
-    for book in all_books:
-        book_id = book['id']
-        if book_id in missing_books:
-            print(f"\n📖 Retranslating: {book_id}")
-            
-            # Remove from processed list temporarily
-            if book_id in checkpoint.get('processed_books', []):
-                checkpoint['processed_books'].remove(book_id)
-            
-            # Translate
-            translated = translator.translate_book(book, language, checkpoint)
-            
-            if translated:
-                all_translations[book_id] = translated
-                checkpoint['processed_books'].append(book_id)
-                translator.save_checkpoint(checkpoint)
-                print(f"✅ {book_id}: {len(translated)} hadiths translated")
-            else:
-                print(f"⚠️  {book_id}: No translations returned")
+    for book_id, keys in missing.items():
+        print(f"\n📖 Retranslating: {book_id}")
+        
+        hadiths = []
+        output_keys = []
+        for chapter_id, hadith_id in keys:
+            # Older runs wrote "None" for hadiths without a chapterId
+            hadith = index.get(book_id, None if chapter_id == 'None' else chapter_id, hadith_id)
+            if hadith is None:
+                print(f"   ⚠️  Not found in books: {book_id}:{chapter_id}:{hadith_id}")
+                continue
+            hadiths.append(hadith)
+            output_keys.append(f"{chapter_id}:{hadith_id}")
+        if not hadiths:
+            continue
+        
+        texts = [extract_hadith_text(h) for h in hadiths]
+        try:
+            translated_texts = translator.translator.translate_batch(texts, language)
+        except Exception as e:
+            print(f"⚠️  {book_id}: {e}")
+            continue
+        
+        book_translations = all_translations.setdefault(book_id, {})
+        for output_key, hadith, translated_text in zip(output_keys, hadiths, translated_texts):
+            book_translations[output_key] = {
+                'narrator': hadith.get('english', {}).get('narrator', ''),
+                'text': translated_text,
+                'hadith_id': hadith.get('id'),
+                'chapter_id': hadith.get('chapterId', 0),
+                'quality': {
+                    'confidence': 'HIGH',
+                    'needs_review': False
+                }
+            }
+        print(f"✅ {book_id}: {len(hadiths)} hadiths translated")
     
     # Save all translations
     translator.save_translations(language, all_translations)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Single-pass glossary replacement with one compiled pattern per language
+استبدال مصطلحات المسرد في مرور واحد بنمط مُجمَّع واحد لكل لغة
+
+Replacing term by term (str.replace per glossary entry) costs terms × texts
+passes, matches inside longer words ("Ibn" in "Ibnu") and lets a later term
+rewrite the output of an earlier one. GlossaryMatcher compiles every term
+of a language into one regex shaped as a character trie (boundaries left out):
+
+    Sahih, Sahih Muslim, Sahih al-Bukhari  →  Sahih(?: (?:Muslim|al-Bukhari)|)
+
+so the regex engine scans each text once, branching on one character at a
+time, and matches are:
+
+    longest   at each position the longest term wins (branches before the
+              end of a shorter term); text already replaced is not rescanned
+    bounded   a term starting (ending) with a letter or digit only matches
+              where the text has none right before (after) it; terms edged
+              with punctuation, such as (ﷺ), match next to anything
+    exact     case-sensitive, as the glossary spells the term
+
+Benchmark against per-term replacement (1k+ terms, full English corpus):
+    python bench_glossary.py
+"""
+
+import re
+from typing import Dict, Iterable, Optional
+
+# Trie key marking the end of a term (never a real character key: those are one character long)
+_END = ""
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _trie(terms: Iterable[str]) -> Dict:
+    root: Dict = {}
+    for term in terms:
+        node = root
+        for ch in term:
+            node = node.setdefault(ch, {})
+        # Right boundary, decided by the term's last character
+        node[_END] = r"(?!\w)" if _is_word(term[-1]) else ""
+    return root
+
+
+def _branch(node: Dict) -> str:
+    """Regex for the subtree below node; longer continuations are tried before the term ending here"""
+    alternatives = [re.escape(ch) + _branch(child) for ch, child in sorted(node.items()) if ch != _END]
+    if _END in node:
+        alternatives.append(node[_END])
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+def compile_terms(terms: Iterable[str]) -> Optional["re.Pattern"]:
+    """One pattern matching any of terms (longest first, word-bounded); None when there are none"""
+    root = _trie(t for t in terms if t)
+    if not root:
+        return None
+    # The left boundary is checked after the first character: a leading assertion would hide the
+    # literal first characters from the engine's prefix scan (several times slower)
+    alternatives = [re.escape(ch) + (r"(?<!\w.)" if _is_word(ch) else "") + _branch(child)
+                    for ch, child in sorted(root.items())]
+    return re.compile("|".join(alternatives))
+
+
+class GlossaryMatcher:
+    """Replaces every glossary term of one language in a single pass over the text"""
+
+    def __init__(self, replacements: Dict[str, str]):
+        """
+        Compile the terms of one language
+
+        Args:
+            replacements: English term -> replacement text
+        """
+        self.replacements = {term: value for term, value in replacements.items() if term and value is not None}
+        self.pattern = compile_terms(self.replacements)
+
+    def __len__(self) -> int:
+        return len(self.replacements)
+
+    def apply(self, text: str) -> str:
+        """
+        Replace every glossary term in text
+
+        Args:
+            text: Text to process
+
+        Returns:
+            Text with each matched term replaced (longest match, word-bounded)
+        """
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(lambda m: self.replacements[m.group(0)], text)
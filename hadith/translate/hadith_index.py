@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Persistent hadith location index
+فهرس مواقع الأحاديث داخل ملفات الفصول
+
+Maps book:chapterId:id and book:idInBook to the chapter file and the byte
+range of the hadith object inside it, so a single hadith is read with one
+seek instead of parsing its book. The index is saved next to the books
+directory and refreshed incrementally: only chapter files whose size or
+mtime changed are rescanned.
+
+Build / refresh:
+    python hadith_index.py [books_dir] [index_path]
+"""
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from corpus import Corpus
+
+INDEX_NAME = "hadith_locations.json"
+INDEX_VERSION = 1
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class Location(NamedTuple):
+    """Where a hadith lives: chapter file under books_dir and its byte range"""
+    book_id: str
+    chapter_file: str
+    path: str
+    offset: int
+    length: int
+    chapter_id: int
+    hadith_id: int
+    id_in_book: Optional[int]
+
+
+def default_index_path(books_dir: Path) -> Path:
+    """hadith_locations.json next to the books directory (overridable with HADITH_INDEX_PATH)"""
+    env = os.getenv("HADITH_INDEX_PATH")
+    return Path(env) if env else Path(books_dir).parent / INDEX_NAME
+
+
+def scan_chapter_file(file_path: Path) -> List[List]:
+    """
+    Byte ranges of the hadiths in one chapter file
+
+    Returns:
+        [[chapterId, id, idInBook, offset, length], ...] in file order
+        (chapterId None -> 0)
+    """
+    raw = Path(file_path).read_bytes()
+    text = raw.decode('utf-8')
+    rows = []
+
+    def skip(pos):
+        return _WHITESPACE.match(text, pos).end()
+
+    # Walk the top-level object key by key; only the "hadiths" array is split
+    # into elements, every other value is skipped with a single raw_decode.
+    pos = skip(0)
+    if text[pos:pos + 1] != '{':
+        return rows
+    pos = skip(pos + 1)
+    char_pos = byte_pos = 0
+    while pos < len(text) and text[pos] != '}':
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = skip(skip(pos) + 1)  # ':'
+        if key != 'hadiths':
+            _, pos = _decoder.raw_decode(text, pos)
+        else:
+            pos = skip(pos + 1)  # '['
+            while text[pos] != ']':
+                hadith, end = _decoder.raw_decode(text, pos)
+                byte_pos += len(text[char_pos:pos].encode('utf-8'))
+                length = len(text[pos:end].encode('utf-8'))
+                char_pos, byte_pos = end, byte_pos + length
+                chapter_id = hadith.get('chapterId')
+                rows.append([chapter_id if chapter_id is not None else 0,
+                             hadith.get('id'), hadith.get('idInBook'), byte_pos - length, length])
+                pos = skip(end)
+                if text[pos] == ',':
+                    pos = skip(pos + 1)
+            pos += 1
+        pos = skip(pos)
+        if text[pos:pos + 1] == ',':
+            pos = skip(pos + 1)
+    return rows
+
+
+class LocationIndex:
+    """book:chapterId:id / book:idInBook -> Location, backed by a JSON file"""
+
+    def __init__(self, books_dir: Path, index_path: Path = None):
+        self.books_dir = Path(books_dir)
+        self.index_path = Path(index_path) if index_path else default_index_path(self.books_dir)
+        self._files: Dict[str, Dict] = {}
+        self._by_key: Dict[str, Location] = {}
+        self._by_id_in_book: Dict[str, List[Location]] = {}
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _load(self):
+        if self.index_path.is_file():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self._files = data.get("files", {})
+            except (OSError, ValueError):
+                self._files = {}
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "files": self._files}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self) -> Tuple[int, int]:
+        """
+        Rescan chapter files that are new or changed since the last save
+
+        Returns:
+            (files rescanned, files dropped)
+        """
+        with self._lock:
+            if not self._files:
+                self._load()
+            corpus = Corpus(self.books_dir, cache_size=0, use_pack=False)
+            seen = set()
+            rescanned = 0
+            for book_id in corpus.book_ids():
+                book_path = corpus.book_path(book_id)
+                for chapter_file in corpus.chapter_files(book_id):
+                    file_path = book_path / chapter_file
+                    try:
+                        stat = file_path.stat()
+                    except OSError:
+                        continue
+                    name = f"{book_id}/{chapter_file}"
+                    seen.add(name)
+                    entry = self._files.get(name)
+                    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                        continue
+                    self._files[name] = {
+                        "path": file_path.relative_to(self.books_dir).as_posix(),
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "rows": scan_chapter_file(file_path),
+                    }
+                    rescanned += 1
+            dropped = [name for name in self._files if name not in seen]
+            for name in dropped:
+                del self._files[name]
+            if rescanned or dropped or not self.index_path.exists():
+                self._save()
+            self._build_maps()
+            self._ready = True
+            return rescanned, len(dropped)
+
+    def _build_maps(self):
+        by_key = {}
+        by_id_in_book = {}
+        for name, entry in self._files.items():
+            book_id, _, chapter_file = name.partition('/')
+            for chapter_id, hadith_id, id_in_book, offset, length in entry["rows"]:
+                location = Location(book_id, chapter_file, entry["path"], offset, length,
+                                    chapter_id, hadith_id, id_in_book)
+                by_key.setdefault(f"{book_id}:{chapter_id}:{hadith_id}", location)
+                if id_in_book is not None:
+                    by_id_in_book.setdefault(f"{book_id}:{id_in_book}", []).append(location)
+        self._by_key = by_key
+        self._by_id_in_book = by_id_in_book
+
+    def _ensure(self):
+        if not self._ready:
+            self.refresh()
+
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._by_key)
+
+    def locate(self, book_id: str, chapter_id, hadith_id) -> Optional[Location]:
+        """Location of book:chapterId:id (chapterId None and 0 are the same key)"""
+        self._ensure()
+        return self._by_key.get(f"{book_id}:{chapter_id or 0}:{hadith_id}")
+
+    def locate_id_in_book(self, book_id: str, id_in_book) -> List[Location]:
+        """Locations of book:idInBook (idInBook is not unique within every book)"""
+        self._ensure()
+        return self._by_id_in_book.get(f"{book_id}:{id_in_book}", [])
+
+    def read(self, location: Location) -> Dict:
+        """Hadith object at a location"""
+        with open(self.books_dir / location.path, 'rb') as f:
+            f.seek(location.offset)
+            return json.loads(f.read(location.length))
+
+    def get(self, book_id: str, chapter_id, hadith_id) -> Optional[Dict]:
+        location = self.locate(book_id, chapter_id, hadith_id)
+        return None if location is None else self.read(location)
+
+
+_indexes: Dict[Path, LocationIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_location_index(books_dir: Path) -> LocationIndex:
+    """Process-wide LocationIndex for a books directory"""
+    key = Path(books_dir).resolve()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LocationIndex(key)
+        return index
+
+
+def main():
+    books_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent.parent / "books"
+    index_path = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+    index = LocationIndex(books_dir, index_path)
+    rescanned, dropped = index.refresh()
+    print(f"✅ {index.index_path}: {len(index):,} hadiths ({rescanned} files rescanned, {dropped} dropped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import json
 import os
 from pathlib import Path
 from collections import defaultdict
+from serialization import dump
 
 # Book categorization
 THE_9_BOOKS = ['bukhari', 'muslim', 'abudawud', 'tirmidhi', 'nasai', 'ibnmajah', 'malik', 'ahmed', 'darimi']
@@ -174,8 +175,7 @@ def integrate_translations():
             chapter_file = book_path / f"{chapter_id}.json"
             chapter_data = create_chapter_file(book_id, chapter_id, hadiths)
             
-            with open(chapter_file, 'w', encoding='utf-8') as f:
-                json.dump(chapter_data, f, ensure_ascii=False, indent=2)
+            dump(chapter_data, chapter_file)
             
             total_files += 1
             total_hadiths += len(hadiths)
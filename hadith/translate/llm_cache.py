@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Persistent, content-addressed cache of LLM translations
+ذاكرة دائمة لترجمات النموذج حتى لا تُدفع الترجمة نفسها مرتين
+
+One SQLite file maps sha256(model, system prompt, target language, source
+text) to the translated text, so a rerun after a reset or a crash gets
+every text it has already paid for without an API call. Entries are
+evicted least-recently-used once the file's payload passes max_bytes.
+
+Settings (environment):
+    LLM_CACHE=0               disable the cache
+    LLM_CACHE_PATH            cache file (default: llm_cache.sqlite in the
+                              checkpoints directory)
+    LLM_CACHE_MAX_MB          payload size bound (default 512)
+
+Stats / clear:
+    python llm_cache.py [cache_path] [--clear]
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CACHE_NAME = "llm_cache.sqlite"
+DEFAULT_MAX_MB = 512
+
+# Evict down to this fraction of max_bytes so eviction runs in bursts, not per insert
+_EVICT_TO = 0.9
+# SQLite's default limit on bound parameters is 999
+_CHUNK = 500
+
+
+def default_cache_path(directory: Path) -> Path:
+    """llm_cache.sqlite in directory (overridable with LLM_CACHE_PATH)"""
+    env = os.getenv("LLM_CACHE_PATH")
+    return Path(env) if env else Path(directory) / CACHE_NAME
+
+
+def cache_key(model: str, system_prompt: str, target_language: str, source_text: str) -> str:
+    """Content address of one translation request"""
+    h = hashlib.sha256()
+    for part in (model, system_prompt, target_language, source_text):
+        data = (part or "").encode('utf-8')
+        # Length-prefix every part so ("ab", "c") and ("a", "bc") differ
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key -> translation store with LRU eviction and hit/miss counters"""
+
+    def __init__(self, path: Path, max_bytes: int = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Cached values for the keys that are present; counts one hit or miss per key"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(keys), _CHUNK):
+                chunk = keys[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._db.execute(
+                    f"SELECT key, value FROM responses WHERE key IN ({marks})", chunk
+                ).fetchall())
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        rows = []
+        now = time.time()
+        for key, value in items:
+            rows.append((key, value, len(value.encode('utf-8')), now, now))
+        if not rows:
+            return
+        with self._lock:
+            for key, _, size, _, _ in rows:
+                old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._bytes += size - (old[0] if old else 0)
+            self._db.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", rows)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def put(self, key: str, value: str):
+        self.put_many([(key, value)])
+
+    def _evict(self):
+        target = int(self.max_bytes * _EVICT_TO)
+        victims: List[str] = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if self._bytes <= target:
+                break
+            victims.append(key)
+            self._bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in victims])
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def translate_cached(cache: Optional[ResponseCache], model: str, system_prompt: str, target_language: str,
+                     texts: List[str], translate: Callable[[List[str]], List[str]]) -> List[str]:
+    """
+    Translate texts, sending only the ones the cache does not have
+
+    Args:
+        cache: Cache to read and fill (None = call translate on everything)
+        model, system_prompt, target_language: Request parameters that make up the key
+        texts: Source texts
+        translate: Uncached translation of a list of texts, same length and order
+
+    Returns:
+        Translations in the order of texts. A result equal to its source
+        (the translators' fallback on failure) is returned but not cached.
+    """
+    if cache is None or not texts:
+        return translate(texts)
+    keys = [cache_key(model, system_prompt, target_language, text) for text in texts]
+    found = cache.get_many(keys)
+    missing: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        if key not in found and key not in missing:
+            missing[key] = i
+    if missing:
+        sources = [texts[i] for i in missing.values()]
+        fresh = []
+        for key, source, translated in zip(missing, sources, translate(sources)):
+            if translated and translated.strip() != (source or "").strip():
+                fresh.append((key, translated))
+                found[key] = translated
+        cache.put_many(fresh)
+    return [found.get(key, text) for key, text in zip(keys, texts)]
+
+
+_caches: Dict[Path, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(path: Path) -> Optional[ResponseCache]:
+    """Shared cache for path, or None when disabled with LLM_CACHE=0 or unusable"""
+    if os.getenv("LLM_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    key = Path(path).resolve()
+    with _caches_lock:
+        if key not in _caches:
+            try:
+                _caches[key] = ResponseCache(key)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  LLM cache disabled ({key}): {e}")
+                return None
+        return _caches[key]
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    path = Path(args[0]) if args else default_cache_path(Path(__file__).resolve().parent / "checkpoints")
+    if not path.exists():
+        print(f"❌ No cache at {path}")
+        sys.exit(1)
+    cache = ResponseCache(path)
+    if '--clear' in sys.argv:
+        cache.clear()
+        print(f"🗑️  Cleared {path}")
+    s = cache.stats()
+    print(f"📦 {path}: {s['entries']:,} entries, {s['bytes'] / (1024 * 1024):.1f} / {s['max_bytes'] / (1024 * 1024):.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
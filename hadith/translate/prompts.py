@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+System prompts laid out for provider-side prefix caching
+ترتيب التعليمات بحيث تُخزَّن بادئتها الثابتة مؤقتاً لدى مزوّد الخدمة
+
+OpenAI caches the longest prefix of a prompt it has seen recently (for
+prompts of 1024+ tokens, in 128-token steps) and bills those tokens at a
+discount. Only a byte-identical prefix hits, so the batch system prompt is
+built from static parts only, most widely shared first:
+
+    rules      translation rules, identical for every language
+    language   the target language and its glossary.json terms, book titles
+               and collection names (sorted)
+    reply      the structured reply format (structured.reply_instruction)
+
+and the numbered batch, the only part that changes, comes last in the user
+message. Each language's prompt is built once and reused verbatim;
+prompt_cache_key (OPENAI_PROMPT_CACHE_KEY=0 to leave it out) routes a
+language's requests to the same cache.
+
+Only prompts of CACHE_MIN_TOKENS or more are cached (cached_tokens is 0
+or at least 1024). These single-language prefixes are ~560-620 tokens, so
+as things stand nothing is served from the cache: padding them to 1024
+would bill about as much at the cached discount as the uncached tokens it
+replaces. The layout keeps the prefix stable for when the glossary grows
+past it; the web translator's multi-language prompts already do.
+
+Prefix size per language:
+    python prompts.py [language ...]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+import structured
+
+GLOSSARY_PATH = Path(__file__).resolve().parent / "glossary.json"
+
+# Shortest prompt OpenAI caches; above it the cached prefix grows in CACHE_STEP_TOKENS steps
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+# Glossary sections, in prompt order
+SECTIONS = (("terms", "Terms"), ("bookTitles", "Book titles"), ("categories", "Collections"))
+
+RULES = (
+    "You are a professional translator specializing in Islamic religious texts (hadith).\n"
+    "\n"
+    "Rules:\n"
+    "1. Translate every numbered English hadith text completely into the target language. Never return the "
+    "original English, and never summarize, shorten or skip sentences.\n"
+    "2. Keep the chain of narration and narrator attributions (\"Narrated ...\", \"On the authority of ...\") "
+    "where they are, in the form usual in the target language.\n"
+    "3. Translate Islamic terms, book titles and collection names as the glossary gives them for the target "
+    "language; write other names of people and places in the target language's customary spelling.\n"
+    "4. Keep honorifics after names, such as (ﷺ) and \"may Allah be pleased with him\", in the glossary's form.\n"
+    "5. Keep numbers, Arabic phrases and Qur'an references as they are; translate any meaning the English gives.\n"
+    "6. Preserve the meaning precisely. Add no explanations, comments or notes.\n"
+    "7. Every item is independent: translate it on its own and return it under its own id."
+)
+
+
+def cacheable_tokens(prefix_tokens: int) -> int:
+    """Prompt tokens the provider can serve from its cache for a prefix of this size"""
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return prefix_tokens // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS
+
+
+class PromptBuilder:
+    """Byte-identical batch system prompts per language: rules, then glossary, then reply format"""
+
+    def __init__(self, glossary_path: Path = GLOSSARY_PATH):
+        """
+        Load the glossary
+
+        Args:
+            glossary_path: glossary.json (section -> English -> language code -> translation)
+        """
+        try:
+            with open(glossary_path, "r", encoding="utf-8") as f:
+                self.glossary = json.load(f)
+        except (OSError, ValueError):
+            self.glossary = {}
+        self._prompts: Dict[str, str] = {}
+
+    def _glossary(self, code: Optional[str]) -> List[str]:
+        lines = []
+        for section, title in SECTIONS:
+            entries = self.glossary.get(section) or {}
+            rows = [f"- {english} → {entries[english][code]}"
+                    for english in sorted(entries) if code and entries[english].get(code)]
+            if rows:
+                lines.append(f"{title}:")
+                lines.extend(rows)
+        return lines
+
+    def system(self, language: str) -> str:
+        """
+        System message for batch requests into language (built once, then reused verbatim)
+
+        Args:
+            language: Target language key (config.LANGUAGES)
+
+        Returns:
+            The system prompt
+        """
+        prompt = self._prompts.get(language)
+        if prompt is None:
+            info = config.LANGUAGES.get(language) or {}
+            name = info.get("name") or language.capitalize()
+            parts = [RULES, f"Target language: {name}. Output must be in {name} only."]
+            glossary = self._glossary(info.get("code"))
+            if glossary:
+                parts.append("Glossary (English → target language):\n" + "\n".join(glossary))
+            parts.append(structured.reply_instruction())
+            prompt = self._prompts.setdefault(language, "\n\n".join(parts))
+        return prompt
+
+    def cache_key(self, language: str) -> Optional[str]:
+        """prompt_cache_key for the language's prefix, or None when OPENAI_PROMPT_CACHE_KEY=0"""
+        if os.getenv("OPENAI_PROMPT_CACHE_KEY", "1").strip().lower() in ("0", "false", "no", "off"):
+            return None
+        digest = hashlib.sha256(self.system(language).encode("utf-8")).hexdigest()[:16]
+        return f"hadith-{language}-{digest}"
+
+
+def main():
+    from token_budget import TokenBudget
+
+    builder = PromptBuilder()
+    budget = TokenBudget()
+    print(f"📝 Glossary: {GLOSSARY_PATH} ({sum(len(v) for v in builder.glossary.values())} entries)")
+    print(f"   Rules shared by every language: {budget.input_tokens(RULES)} tokens")
+    for language in sys.argv[1:] or list(config.LANGUAGES):
+        tokens = budget.input_tokens(builder.system(language))
+        print(f"   {language:12} prefix {tokens:5} tokens, {cacheable_tokens(tokens):5} cacheable")
+    print(f"   (prefixes under {CACHE_MIN_TOKENS} tokens are never cached)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,6 @@ Much faster than local NLLB (~10-20x faster)
 """
 import os
 import json
-import glob
 import sys
 import argparse
 from pathlib import Path
@@ -13,6 +12,10 @@ from tqdm import tqdm
 from typing import Dict, List
 import time
 import config
+from corpus import get_corpus, extract_hadith_text, composite_key
+from jsonstream import HADITH_FIELDS
+from serialization import dump, COMPACT
+from checkpoint_store import load_checkpoint, save_checkpoint
 from api_translator import APITranslator
 
 class APIHadithTranslator:
@@ -32,17 +35,15 @@ class APIHadithTranslator:
         self.checkpoints_dir = script_dir / config.CHECKPOINTS_DIR
         self.output_dir = script_dir / config.OUTPUT_DIR
         self.books_dir = script_dir / config.BOOKS_DIR
+        self.corpus = get_corpus(self.books_dir)
         
         self.checkpoints_dir.mkdir(exist_ok=True, parents=True)
         self.output_dir.mkdir(exist_ok=True, parents=True)
     
     def load_checkpoint(self, language: str) -> Dict:
-        """Load translation checkpoint for a language"""
+        """Load translation checkpoint for a language (processed_hadiths is a set, see checkpoint_store)"""
         checkpoint_file = self.checkpoints_dir / f"{language}_api_checkpoint.json"
-        if checkpoint_file.exists():
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
+        return load_checkpoint(checkpoint_file, {
             "language": language,
             "processed_books": [],
             "processed_hadiths": [],
@@ -51,49 +52,28 @@ class APIHadithTranslator:
                 "api_calls": 0,
                 "tokens_used": 0
             }
-        }
+        })
     
     def save_checkpoint(self, checkpoint: Dict):
-        """Save translation checkpoint"""
+        """Save translation checkpoint (per-book bitmaps, a few KB)"""
         checkpoint_file = self.checkpoints_dir / f"{checkpoint['language']}_api_checkpoint.json"
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        save_checkpoint(checkpoint, checkpoint_file)
     
     def load_all_books(self) -> List[Dict]:
-        """Load all book metadata files"""
-        books = []
-        metadata_files = glob.glob(str(self.books_dir / "**/metadata.json"), recursive=True)
-        
-        for metadata_file in metadata_files:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                metadata['_path'] = Path(metadata_file).parent
-                books.append(metadata)
-        
-        return sorted(books, key=lambda x: x.get('numericId', 0))
+        """Load all book metadata (from the corpus manifest)"""
+        return self.corpus.books()
     
     def load_chapter_file(self, book_path: Path, chapter_file: str) -> Dict:
-        """Load a chapter JSON file"""
-        file_path = book_path / chapter_file
-        if not file_path.exists():
-            return None
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load a chapter JSON file (cached by the corpus, treat as read-only)"""
+        return self.corpus.load_chapter(book_path.name, chapter_file)
+    
+    def load_chapter_hadiths(self, book_path: Path, chapter_file: str) -> List[Dict]:
+        """Hadiths of a chapter file with only the fields translation needs (streamed, not cached)"""
+        return list(self.corpus.iter_chapter(book_path.name, chapter_file, HADITH_FIELDS))
     
     def extract_hadith_text(self, hadith: Dict) -> str:
         """Extract English text from hadith (narrator + text)"""
-        english = hadith.get('english', {})
-        narrator = english.get('narrator', '')
-        text = english.get('text', '')
-        
-        if narrator and text:
-            return f"{narrator} {text}".strip()
-        elif text:
-            return text
-        elif narrator:
-            return narrator
-        return ""
+        return extract_hadith_text(hadith)
     
     def translate_book(self, book: Dict, language: str, checkpoint: Dict) -> Dict:
         """Translate all hadiths in a book using API"""
@@ -109,14 +89,12 @@ class APIHadithTranslator:
             # Book without chapters (e.g., forties)
             all_file = book_path / "all.json"
             if all_file.exists():
-                chapter_data = self.load_chapter_file(book_path, "all.json")
-                if chapter_data:
-                    hadiths = chapter_data.get('hadiths', [])
-                    
+                hadiths = self.load_chapter_hadiths(book_path, "all.json")
+                if hadiths:
                     # Filter out already processed (using composite ID: book_id:chapterId:hadith_id)
                     hadiths_to_translate = [
                         h for h in hadiths 
-                        if f"{book_id}:{h.get('chapterId', 0)}:{h.get('id')}" not in checkpoint.get('processed_hadiths', [])
+                        if composite_key(book_id, h) not in checkpoint['processed_hadiths']
                     ]
                     
                     if hadiths_to_translate:
@@ -137,8 +115,9 @@ class APIHadithTranslator:
                         print(f"  Translating {len(hadith_texts)} hadiths...")
                         
                         try:
+                            calls_before = self.translator.api_calls
                             translated_texts = self.translator.translate_batch(hadith_texts, language)
-                            checkpoint['stats']['api_calls'] += (len(hadith_texts) + 14) // 15
+                            checkpoint['stats']['api_calls'] += self.translator.api_calls - calls_before
                         except Exception as e:
                             print(f"  Error translating: {e}")
                             translated_texts = hadith_texts  # Keep original on error
@@ -149,7 +128,7 @@ class APIHadithTranslator:
                             chapter_id = hadith_meta['chapterId']
                             # Use chapterId:hadith_id as output key for uniqueness
                             output_key = f"{chapter_id}:{hadith_id}"
-                            composite_id = f"{book_id}:{chapter_id}:{hadith_id}"
+                            composite_id = f"{book_id}:{chapter_id or 0}:{hadith_id}"
                             
                             translated_hadiths[output_key] = {
                                 'narrator': hadith_meta['narrator'],
@@ -163,9 +142,9 @@ class APIHadithTranslator:
                             }
                             
                             # Only add if not already processed (use composite ID)
-                            if composite_id not in checkpoint.get('processed_hadiths', []):
+                            if composite_id not in checkpoint['processed_hadiths']:
                                 checkpoint['stats']['total_translated'] += 1
-                                checkpoint['processed_hadiths'].append(composite_id)
+                                checkpoint['processed_hadiths'].add(composite_id)
                             
                             # Show progress
                             remaining = self.total_hadiths - checkpoint['stats']['total_translated']
@@ -191,16 +170,14 @@ class APIHadithTranslator:
                 if not chapter_file:
                     continue
                 
-                chapter_data = self.load_chapter_file(book_path, chapter_file)
-                if not chapter_data:
+                hadiths = self.load_chapter_hadiths(book_path, chapter_file)
+                if not hadiths:
                     continue
                 
-                hadiths = chapter_data.get('hadiths', [])
-                
                 # Filter out already processed (using composite ID: book_id:chapterId:hadith_id)
                 hadiths_to_translate = [
                     h for h in hadiths 
-                    if f"{book_id}:{h.get('chapterId', 0)}:{h.get('id')}" not in checkpoint.get('processed_hadiths', [])
+                    if composite_key(book_id, h) not in checkpoint['processed_hadiths']
                 ]
                 
                 if not hadiths_to_translate:
@@ -223,8 +200,9 @@ class APIHadithTranslator:
                 print(f"    Translating {len(hadith_texts)} hadiths...")
                 
                 try:
+                    calls_before = self.translator.api_calls
                     translated_texts = self.translator.translate_batch(hadith_texts, language)
-                    checkpoint['stats']['api_calls'] += (len(hadith_texts) + 14) // 15  # Approximate API calls
+                    checkpoint['stats']['api_calls'] += self.translator.api_calls - calls_before  # Cache hits cost none
                 except Exception as e:
                     print(f"    Error translating chapter: {e}")
                     translated_texts = hadith_texts  # Keep original on error
@@ -235,7 +213,7 @@ class APIHadithTranslator:
                     chapter_id = hadith_meta['chapterId']
                     # Use chapterId:hadith_id as output key for uniqueness
                     output_key = f"{chapter_id}:{hadith_id}"
-                    composite_id = f"{book_id}:{chapter_id}:{hadith_id}"
+                    composite_id = f"{book_id}:{chapter_id or 0}:{hadith_id}"
                     
                     translated_hadiths[output_key] = {
                         'narrator': hadith_meta['narrator'],
@@ -249,9 +227,9 @@ class APIHadithTranslator:
                     }
                     
                     # Only add if not already processed (use composite ID)
-                    if composite_id not in checkpoint.get('processed_hadiths', []):
+                    if composite_id not in checkpoint['processed_hadiths']:
                         checkpoint['stats']['total_translated'] += 1
-                        checkpoint['processed_hadiths'].append(composite_id)
+                        checkpoint['processed_hadiths'].add(composite_id)
                     
                     # Show progress
                     remaining = self.total_hadiths - checkpoint['stats']['total_translated']
@@ -273,16 +251,14 @@ class APIHadithTranslator:
         output_lang_dir.mkdir(exist_ok=True, parents=True)
         
         output_file = output_lang_dir / "all_translations.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_translations, f, ensure_ascii=False, indent=2)
+        dump(all_translations, output_file, COMPACT)
         
         print(f"\nTranslations saved to: {output_file}")
     
     def _save_output_file(self):
         """Save output file immediately (called after each chapter)"""
         if hasattr(self, 'output_file_path') and hasattr(self, 'all_translations'):
-            with open(self.output_file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.all_translations, f, ensure_ascii=False, indent=2)
+            dump(self.all_translations, self.output_file_path, COMPACT)
     
     def count_total_hadiths(self) -> int:
         """Count total hadiths across all books"""
@@ -374,8 +350,8 @@ class APIHadithTranslator:
                         checkpoint['processed_books'].append(book_id)
                     
                     # Add hadith IDs only if not already processed (use composite ID)
-                    new_hadith_ids = [f"{book_id}:{hid}" for hid in translated.keys() if f"{book_id}:{hid}" not in checkpoint.get('processed_hadiths', [])]
-                    checkpoint['processed_hadiths'].extend(new_hadith_ids)
+                    new_hadith_ids = [f"{book_id}:{hid}" for hid in translated.keys() if f"{book_id}:{hid}" not in checkpoint['processed_hadiths']]
+                    checkpoint['processed_hadiths'].update(new_hadith_ids)
                     hadith_count += len(new_hadith_ids)
                     
                     if test_mode and hadith_count >= 100:
@@ -393,6 +369,24 @@ class APIHadithTranslator:
             print("="*60)
             print(f"Total hadiths translated: {checkpoint['stats']['total_translated']}")
             print(f"API calls made: {checkpoint['stats']['api_calls']}")
+            if self.translator.cache:
+                cache_stats = self.translator.cache.stats()
+                print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                      f"{cache_stats['entries']} entries ({cache_stats['bytes'] / (1024 * 1024):.1f} MB)")
+            packing = self.translator.budget.stats()
+            if packing['sent']:
+                print(f"Packing: {packing['texts_per_request']} texts/request, fill {packing['fill_ratio']:.0%}, "
+                      f"{packing['oversize']} oversize, truncated {packing['truncated']}/{packing['sent']} "
+                      f"({packing['truncation_rate']:.1%})")
+            validation = self.translator.validation.stats()
+            if validation['batches']:
+                print(f"Replies: {validation['parse_failure_rate']:.1%} of batches had a failed item, "
+                      f"{validation['resent_items']} items re-sent, {validation['fallback_items']} left in English")
+            usage = self.translator.usage
+            if usage['prompt_tokens']:
+                print(f"Tokens: {usage['prompt_tokens']:,} prompt ({usage['cached_tokens']:,} served from the "
+                      f"prompt cache, {usage['cached_tokens'] / usage['prompt_tokens']:.0%}), "
+                      f"{usage['completion_tokens']:,} completion")
             print("="*60)
 
 def main():
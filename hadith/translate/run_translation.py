@@ -4,13 +4,15 @@ Main translation script for Hadith texts
 Uses NLLB for translation + GPT for review
 """
 import os
-import json
-import glob
 import sys
 from pathlib import Path
 from tqdm import tqdm
 from typing import Dict, List
 import config
+from corpus import get_corpus, extract_hadith_text, composite_key
+from jsonstream import HADITH_FIELDS
+from serialization import dump, COMPACT
+from checkpoint_store import load_checkpoint, save_checkpoint
 from translator import NLLBTranslator
 from quality_check import QualityChecker
 from reviewer import GPTReviewer
@@ -44,17 +46,15 @@ class HadithTranslator:
         self.checkpoints_dir = script_dir / config.CHECKPOINTS_DIR
         self.output_dir = script_dir / config.OUTPUT_DIR
         self.books_dir = script_dir / config.BOOKS_DIR
+        self.corpus = get_corpus(self.books_dir)
         
         self.checkpoints_dir.mkdir(exist_ok=True, parents=True)
         self.output_dir.mkdir(exist_ok=True, parents=True)
     
     def load_checkpoint(self, language: str) -> Dict:
-        """Load translation checkpoint for a language"""
+        """Load translation checkpoint for a language (processed_hadiths is a set, see checkpoint_store)"""
         checkpoint_file = self.checkpoints_dir / f"{language}_checkpoint.json"
-        if checkpoint_file.exists():
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
+        return load_checkpoint(checkpoint_file, {
             "language": language,
             "processed_books": [],
             "processed_hadiths": [],
@@ -64,49 +64,28 @@ class HadithTranslator:
                 "medium_confidence": 0,
                 "low_confidence": 0
             }
-        }
+        })
     
     def save_checkpoint(self, checkpoint: Dict):
-        """Save translation checkpoint"""
+        """Save translation checkpoint (per-book bitmaps, a few KB)"""
         checkpoint_file = self.checkpoints_dir / f"{checkpoint['language']}_checkpoint.json"
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        save_checkpoint(checkpoint, checkpoint_file)
     
     def load_all_books(self) -> List[Dict]:
-        """Load all book metadata files"""
-        books = []
-        metadata_files = glob.glob(str(self.books_dir / "**/metadata.json"), recursive=True)
-        
-        for metadata_file in metadata_files:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                metadata['_path'] = Path(metadata_file).parent
-                books.append(metadata)
-        
-        return sorted(books, key=lambda x: x.get('numericId', 0))
+        """Load all book metadata (from the corpus manifest)"""
+        return self.corpus.books()
     
     def load_chapter_file(self, book_path: Path, chapter_file: str) -> Dict:
-        """Load a chapter JSON file"""
-        file_path = book_path / chapter_file
-        if not file_path.exists():
-            return None
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load a chapter JSON file (cached by the corpus, treat as read-only)"""
+        return self.corpus.load_chapter(book_path.name, chapter_file)
+    
+    def load_chapter_hadiths(self, book_path: Path, chapter_file: str) -> List[Dict]:
+        """Hadiths of a chapter file with only the fields translation needs (streamed, not cached)"""
+        return list(self.corpus.iter_chapter(book_path.name, chapter_file, HADITH_FIELDS))
     
     def extract_hadith_text(self, hadith: Dict) -> str:
         """Extract English text from hadith (narrator + text)"""
-        english = hadith.get('english', {})
-        narrator = english.get('narrator', '')
-        text = english.get('text', '')
-        
-        if narrator and text:
-            return f"{narrator} {text}".strip()
-        elif text:
-            return text
-        elif narrator:
-            return narrator
-        return ""
+        return extract_hadith_text(hadith)
     
     def translate_hadith(self, hadith: Dict, target_lang_code: str) -> Dict:
         """Translate a single hadith"""
@@ -147,14 +126,12 @@ class HadithTranslator:
             # Book without chapters (e.g., forties)
             all_file = book_path / "all.json"
             if all_file.exists():
-                chapter_data = self.load_chapter_file(book_path, "all.json")
-                if chapter_data:
-                    hadiths = chapter_data.get('hadiths', [])
-                    
-                    # Filter out already processed hadiths
+                hadiths = self.load_chapter_hadiths(book_path, "all.json")
+                if hadiths:
+                    # Filter out already processed hadiths (composite ID: book_id:chapterId:hadith_id)
                     hadiths_to_translate = [
                         h for h in hadiths 
-                        if h.get('id') not in checkpoint.get('processed_hadiths', [])
+                        if composite_key(book_id, h) not in checkpoint['processed_hadiths']
                     ]
                     
                     if hadiths_to_translate:
@@ -166,6 +143,7 @@ class HadithTranslator:
                             hadith_texts.append(english_text)
                             hadith_metadata.append({
                                 'id': hadith.get('id'),
+                                'key': composite_key(book_id, hadith),
                                 'narrator': hadith.get('english', {}).get('narrator', ''),
                                 'original_text': english_text
                             })
@@ -200,7 +178,7 @@ class HadithTranslator:
                             conf = quality['confidence']
                             checkpoint['stats'][f'{conf.lower()}_confidence'] += 1
                             checkpoint['stats']['total_translated'] += 1
-                            checkpoint['processed_hadiths'].append(hadith_id)
+                            checkpoint['processed_hadiths'].add(hadith_meta['key'])
                             
                             # Save checkpoint every 50 hadiths
                             if checkpoint['stats']['total_translated'] % 50 == 0:
@@ -212,16 +190,14 @@ class HadithTranslator:
                 if not chapter_file:
                     continue
                 
-                chapter_data = self.load_chapter_file(book_path, chapter_file)
-                if not chapter_data:
+                hadiths = self.load_chapter_hadiths(book_path, chapter_file)
+                if not hadiths:
                     continue
                 
-                hadiths = chapter_data.get('hadiths', [])
-                
-                # Filter out already processed hadiths
+                # Filter out already processed hadiths (composite ID: book_id:chapterId:hadith_id)
                 hadiths_to_translate = [
                     h for h in hadiths 
-                    if h.get('id') not in checkpoint.get('processed_hadiths', [])
+                    if composite_key(book_id, h) not in checkpoint['processed_hadiths']
                 ]
                 
                 if not hadiths_to_translate:
@@ -235,6 +211,7 @@ class HadithTranslator:
                     hadith_texts.append(english_text)
                     hadith_metadata.append({
                         'id': hadith.get('id'),
+                        'key': composite_key(book_id, hadith),
                         'narrator': hadith.get('english', {}).get('narrator', ''),
                         'original_text': english_text
                     })
@@ -269,7 +246,7 @@ class HadithTranslator:
                     conf = quality['confidence']
                     checkpoint['stats'][f'{conf.lower()}_confidence'] += 1
                     checkpoint['stats']['total_translated'] += 1
-                    checkpoint['processed_hadiths'].append(hadith_id)
+                    checkpoint['processed_hadiths'].add(hadith_meta['key'])
                     
                     # Save checkpoint every 50 hadiths
                     if checkpoint['stats']['total_translated'] % 50 == 0:
@@ -314,8 +291,7 @@ class HadithTranslator:
         lang_output_dir.mkdir(exist_ok=True)
         
         output_file = lang_output_dir / "all_translations.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_translations, f, ensure_ascii=False, indent=2)
+        dump(all_translations, output_file, COMPACT)
         
         print(f"\nTranslations saved to: {output_file}")
     
@@ -366,7 +342,6 @@ class HadithTranslator:
                         })
                 
                 checkpoint['processed_books'].append(book_id)
-                checkpoint['processed_hadiths'].extend(list(translated.keys()))
                 
                 hadith_count += len(translated)
                 
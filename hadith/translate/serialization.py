@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON serializer for corpus, translation and checkpoint files
+طبقة حفظ JSON قابلة للتبديل (orjson أو json)
+
+Two output modes:
+    PRETTY   indent=2, for files people read or diff (books, translations/,
+             index.json, metadata.json)
+    COMPACT  no whitespace, for machine-consumed artifacts (checkpoints,
+             output/<language>/all_translations.json)
+
+The backend is orjson when it is installed, otherwise the standard json
+module; HADITH_JSON_BACKEND=json|orjson forces one. Both backends write the
+same bytes for the same mode (UTF-8, non-ASCII kept as is).
+
+Benchmark: python bench_serialization.py
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+PRETTY = "pretty"
+COMPACT = "compact"
+MODES = (PRETTY, COMPACT)
+BACKENDS = ("json", "orjson")
+
+
+def default_backend() -> str:
+    """Backend used when none is given: HADITH_JSON_BACKEND, else orjson if available"""
+    backend = os.getenv("HADITH_JSON_BACKEND", "").strip().lower()
+    if backend in BACKENDS:
+        if backend == "orjson" and orjson is None:
+            raise RuntimeError("HADITH_JSON_BACKEND=orjson but orjson is not installed (pip install orjson)")
+        return backend
+    return "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any, mode: str = PRETTY, backend: str = None) -> bytes:
+    """Serialize obj to UTF-8 bytes"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    backend = backend or default_backend()
+    if backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if mode == PRETTY:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if mode == PRETTY:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def loads(data: Union[bytes, str], backend: str = None) -> Any:
+    backend = backend or default_backend()
+    if backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump(obj: Any, path: Union[str, Path], mode: str = PRETTY, backend: str = None) -> int:
+    """
+    Write obj to path
+
+    Returns:
+        Number of bytes written
+    """
+    data = dumps(obj, mode, backend)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def load(path: Union[str, Path], backend: str = None) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read(), backend)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Host-wide OpenAI rate limiter shared by every translation process
+محدِّد معدّل مشترك بين كل عمليات الترجمة على الجهاز نفسه
+
+Several processes using one API key (run_api_translation.py for two
+languages, the web app, ...) each pace themselves, so together they
+overshoot the key's limits and get 429 storms. Here every process draws
+from the same two token buckets in one SQLite file, per API key:
+
+    requests  refilled at RPM / 60 per second
+    tokens    refilled at TPM / 60 per second; a request costs its prompt
+              estimate plus max_tokens, as OpenAI counts it
+
+Buckets hold at most BURST_SEC seconds of refill and may go negative: a
+request bigger than the bucket is let through and the next callers wait
+for the debt to refill. The limits come from OPENAI_RPM_LIMIT /
+OPENAI_TPM_LIMIT, otherwise from the x-ratelimit-limit-* headers of the
+first response (DEFAULT_RPM / DEFAULT_TPM until then), times HEADROOM.
+A 429 or an exhausted x-ratelimit-remaining-* pauses every process until
+Retry-After / x-ratelimit-reset-*.
+
+Settings (environment):
+    SHARED_RATE_LIMIT=0        disable (each process paces itself alone)
+    SHARED_RATE_LIMIT_PATH     state file (default: hadith_openai_ratelimit.sqlite
+                               in the system temp directory)
+    OPENAI_RPM_LIMIT           requests per minute for the key
+    OPENAI_TPM_LIMIT           tokens per minute for the key
+    SHARED_RATE_LIMIT_HEADROOM fraction of the limits to use (default 0.9)
+
+State of all keys:
+    python shared_limiter.py [state_path]
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional
+
+STATE_NAME = "hadith_openai_ratelimit.sqlite"
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+DEFAULT_HEADROOM = 0.9
+BURST_SEC = 1.0
+# Longest single sleep, so a lowered pause or a raised limit is seen soon
+MAX_SLEEP = 1.0
+# Rough English tokenization for the prompt estimate
+CHARS_PER_TOKEN = 4
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def default_state_path() -> Path:
+    """SHARED_RATE_LIMIT_PATH, else a file in the system temp directory (one per host)"""
+    env = os.getenv("SHARED_RATE_LIMIT_PATH")
+    return Path(env) if env else Path(tempfile.gettempdir()) / STATE_NAME
+
+
+def estimate_tokens(texts: Iterable[str], max_tokens: int) -> int:
+    """Tokens OpenAI charges against TPM when a request is sent"""
+    return sum(len(t or "") for t in texts) // CHARS_PER_TOKEN + max_tokens
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a Retry-After or x-ratelimit-reset-* header value ("20", "6m0s", "250ms")"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+
+def header_value(headers: Optional[Mapping], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    try:
+        return headers.get(name)
+    except AttributeError:
+        return None
+
+
+def retry_after(headers: Optional[Mapping]) -> Optional[float]:
+    """Seconds from retry-after-ms or retry-after, if the response has either"""
+    ms = parse_duration(header_value(headers, "retry-after-ms"))
+    return ms / 1000 if ms is not None else parse_duration(header_value(headers, "retry-after"))
+
+
+class SharedLimiter:
+    """Cross-process token buckets (requests, tokens) for one API key in a SQLite file"""
+
+    KINDS = ("requests", "tokens")
+
+    def __init__(self, path: Path, api_key: str, rpm: float = None, tpm: float = None,
+                 headroom: float = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Buckets are per key; the key itself is never stored
+        self.key_id = hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+        self.headroom = headroom or float(os.getenv("SHARED_RATE_LIMIT_HEADROOM", DEFAULT_HEADROOM))
+        rpm = rpm or float(os.getenv("OPENAI_RPM_LIMIT", "0"))
+        tpm = tpm or float(os.getenv("OPENAI_TPM_LIMIT", "0"))
+        # Limits set explicitly are kept; the others are replaced by what the headers report
+        self._pinned = {"requests": bool(rpm), "tokens": bool(tpm)}
+        self._limits = {"requests": rpm or DEFAULT_RPM, "tokens": tpm or DEFAULT_TPM}
+        self.waited = 0.0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key_id TEXT NOT NULL, kind TEXT NOT NULL, per_minute REAL NOT NULL, "
+            "level REAL NOT NULL, updated REAL NOT NULL, paused_until REAL NOT NULL, "
+            "PRIMARY KEY (key_id, kind))"
+        )
+        with self._transaction() as db:
+            now = time.time()
+            for kind in self.KINDS:
+                db.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, 0, ?, 0)",
+                           (self.key_id, kind, self._limits[kind], now))
+                if self._pinned[kind]:
+                    db.execute("UPDATE buckets SET per_minute = ? WHERE key_id = ? AND kind = ?",
+                               (self._limits[kind], self.key_id, kind))
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _rate(self, per_minute: float) -> float:
+        return max(per_minute * self.headroom / 60.0, 1e-3)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request costing `tokens` fits in the shared buckets, then take it"""
+        cost = {"requests": 1.0, "tokens": float(tokens)}
+        while True:
+            with self._transaction() as db:
+                now = time.time()
+                rows = db.execute("SELECT kind, per_minute, level, updated, paused_until FROM buckets "
+                                  "WHERE key_id = ?", (self.key_id,)).fetchall()
+                levels: Dict[str, float] = {}
+                wait = 0.0
+                for kind, per_minute, level, updated, paused_until in rows:
+                    rate = self._rate(per_minute)
+                    level = min(rate * BURST_SEC, level + max(0.0, now - updated) * rate)
+                    levels[kind] = level
+                    if now < paused_until:
+                        wait = max(wait, paused_until - now)
+                    elif cost[kind] and level <= 0:
+                        wait = max(wait, -level / rate + 1e-3)
+                if not wait:
+                    for kind in levels:
+                        levels[kind] -= cost[kind]
+                db.executemany("UPDATE buckets SET level = ?, updated = ? WHERE key_id = ? AND kind = ?",
+                               [(level, now, self.key_id, kind) for kind, level in levels.items()])
+            if not wait:
+                return
+            wait = min(wait, MAX_SLEEP)
+            self.waited += wait
+            time.sleep(wait)
+
+    def observe(self, headers: Optional[Mapping]):
+        """Learn the key's limits from a response; pause everyone if a window is used up"""
+        if not headers:
+            return
+        updates = []
+        for kind in self.KINDS:
+            limit = header_value(headers, f"x-ratelimit-limit-{kind}")
+            try:
+                limit = float(limit) if limit is not None else None
+            except ValueError:
+                limit = None
+            if limit and not self._pinned[kind] and limit != self._limits[kind]:
+                self._limits[kind] = limit
+                updates.append(("per_minute", limit, kind))
+            remaining = header_value(headers, f"x-ratelimit-remaining-{kind}")
+            if remaining is not None and remaining.strip() in ("0", "0.0"):
+                reset = parse_duration(header_value(headers, f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    updates.append(("paused_until", time.time() + reset, kind))
+        if not updates:
+            return
+        with self._transaction() as db:
+            for column, value, kind in updates:
+                if column == "per_minute":
+                    db.execute("UPDATE buckets SET per_minute = ? WHERE key_id = ? AND kind = ?",
+                               (value, self.key_id, kind))
+                else:
+                    db.execute("UPDATE buckets SET paused_until = MAX(paused_until, ?) "
+                               "WHERE key_id = ? AND kind = ?", (value, self.key_id, kind))
+
+    def throttle(self, wait: float):
+        """A 429: pause every process for wait seconds and empty the buckets"""
+        with self._transaction() as db:
+            now = time.time()
+            db.execute("UPDATE buckets SET paused_until = MAX(paused_until, ?), level = MIN(level, 0), "
+                       "updated = ? WHERE key_id = ?", (now + wait, now, self.key_id))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._db.execute("SELECT kind, per_minute, paused_until FROM buckets WHERE key_id = ?",
+                                    (self.key_id,)).fetchall()
+        now = time.time()
+        out = {"waited_sec": round(self.waited, 1)}
+        for kind, per_minute, paused_until in rows:
+            out[f"{kind}_per_min"] = round(per_minute * self.headroom)
+            out["paused_sec"] = max(out.get("paused_sec", 0.0), round(max(0.0, paused_until - now), 1))
+        return out
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_limiters: Dict[tuple, SharedLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def open_limiter(api_key: str, path: Path = None) -> Optional[SharedLimiter]:
+    """Shared limiter for api_key, or None when disabled with SHARED_RATE_LIMIT=0 or unusable"""
+    if os.getenv("SHARED_RATE_LIMIT", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    path = Path(path or default_state_path()).resolve()
+    key = (path, api_key)
+    with _limiters_lock:
+        if key not in _limiters:
+            try:
+                _limiters[key] = SharedLimiter(path, api_key)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Shared rate limiter disabled ({path}): {e}")
+                return None
+        return _limiters[key]
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else default_state_path()
+    if not path.exists():
+        print(f"❌ No limiter state at {path}")
+        sys.exit(1)
+    db = sqlite3.connect(str(path), timeout=30)
+    now = time.time()
+    for key_id, kind, per_minute, level, paused_until in db.execute(
+            "SELECT key_id, kind, per_minute, level, paused_until FROM buckets ORDER BY key_id, kind"):
+        paused = f", paused {paused_until - now:.1f}s" if paused_until > now else ""
+        print(f"🔑 {key_id} {kind}: {per_minute:,.0f}/min, level {level:,.1f}{paused}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Structured (JSON schema) translation replies and per-item validation
+ردود ترجمة بصيغة JSON بمعرّف لكل عنصر، مع التحقق من كل عنصر على حدة
+
+The numbered-lines format ("[1] ...") was parsed by splitting the reply on
+newlines: a translation spanning two lines, or a missing marker, shifted
+every later item, and a short reply was padded with English that the
+run then sent again on the next run. Requests now carry the numbered
+texts as before and ask for
+
+    {"items": [{"id": 1, "text": "..."}, ...]}
+
+(one field per language instead of "text" in a multi-language request),
+enforced with response_format json_schema. validate() checks each item on
+its own:
+
+    missing       id absent from the reply (or the reply is not JSON)
+    duplicate     id returned twice with different translations
+    empty         translation missing or blank
+    untranslated  translation equal to the English source
+
+Items from a reply cut off at max_tokens are salvaged up to the last
+complete one. The translator keeps the valid items and re-sends only the
+failed ones (up to OPENAI_REPAIR_ROUNDS more requests); ReplyStats counts the batches with a
+failed item (parse-failure rate), the items re-sent and the items that
+still fell back to the source.
+
+Settings (environment):
+    OPENAI_REPAIR_ROUNDS   re-requests of failed items per batch (default 2)
+    OPENAI_JSON_SCHEMA=0   ask for a plain JSON object instead of a schema
+                           (endpoints without structured outputs)
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SEPARATOR = "\n\n---\n\n"
+DEFAULT_REPAIR_ROUNDS = 2
+TEXT_FIELD = "text"
+
+_decoder = json.JSONDecoder()
+
+
+def number_texts(texts: Sequence[str]) -> str:
+    """User message: "[1] text" items separated by ---"""
+    return SEPARATOR.join(f"[{i + 1}] {text}" for i, text in enumerate(texts))
+
+
+def repair_rounds() -> int:
+    return max(0, int(os.getenv("OPENAI_REPAIR_ROUNDS", DEFAULT_REPAIR_ROUNDS)))
+
+
+def fields(languages: Optional[Sequence[str]]) -> List[str]:
+    """Translation fields of an item: "text", or one per language"""
+    return list(languages) if languages else [TEXT_FIELD]
+
+
+def reply_instruction(languages: Optional[Sequence[str]] = None) -> str:
+    """Sentence appended to a system prompt describing the JSON reply"""
+    example = ", ".join(f"\"{field}\": \"...\"" for field in fields(languages))
+    return (f"Reply with one JSON object {{\"items\": [{{\"id\": 1, {example}}}, ...]}} holding one entry per "
+            f"numbered item, where id is the item's number.")
+
+
+def response_format(languages: Optional[Sequence[str]] = None) -> Dict:
+    """response_format for the chat completion: strict schema, or json_object when disabled"""
+    if os.getenv("OPENAI_JSON_SCHEMA", "1").strip().lower() in ("0", "false", "no", "off"):
+        return {"type": "json_object"}
+    names = fields(languages)
+    item = {
+        "type": "object",
+        "properties": dict({"id": {"type": "integer"}}, **{name: {"type": "string"} for name in names}),
+        "required": ["id"] + names,
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "translations",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"items": {"type": "array", "items": item}},
+                "required": ["items"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def _items(content: str) -> List:
+    """Reply items; from a truncated or broken reply, every complete {"id": ...} object"""
+    try:
+        reply = json.loads(content)
+    except ValueError:
+        reply = None
+    if isinstance(reply, dict) and isinstance(reply.get("items"), list):
+        return reply["items"]
+    items = []
+    start = content.find("{", 1)
+    while start != -1:
+        try:
+            item, end = _decoder.raw_decode(content, start)
+        except ValueError:
+            start = content.find("{", start + 1)
+            continue
+        if isinstance(item, dict) and "id" in item:
+            items.append(item)
+        start = content.find("{", end)
+    return items
+
+
+def validate(content: str, texts: Sequence[str], languages: Optional[Sequence[str]] = None
+             ) -> Tuple[List[Optional[Dict[str, str]]], Dict[int, str]]:
+    """
+    Check a reply item by item
+
+    Args:
+        content: Reply text
+        texts: Source texts of the request, item i + 1 is texts[i]
+        languages: Fields of a multi-language request (None: one "text" field)
+
+    Returns:
+        (translations, failures): translations[i] maps each field to its
+        translation, or is None if item i + 1 failed; failures maps the
+        index of every failed item to its reason
+    """
+    names = fields(languages)
+    translations: List[Optional[Dict[str, str]]] = [None] * len(texts)
+    failures: Dict[int, str] = {}
+    seen = set()
+    for item in _items(content or ""):
+        if not isinstance(item, dict):
+            continue
+        try:
+            i = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= i < len(texts):
+            continue
+        source = (texts[i] or "").strip()
+        values, reason = {}, None
+        for name in names:
+            value = item.get(name)
+            value = value.strip() if isinstance(value, str) else ""
+            if not value:
+                reason = "empty"
+                break
+            if value == source:
+                reason = "untranslated"
+                break
+            values[name] = value
+        if i in seen:
+            if reason is not None or values != translations[i]:
+                # Two different answers for one id: neither can be trusted
+                failures[i] = "duplicate"
+                translations[i] = None
+            continue
+        seen.add(i)
+        if reason is None:
+            translations[i] = values
+        else:
+            failures[i] = reason
+    for i in range(len(texts)):
+        if translations[i] is None:
+            failures.setdefault(i, "missing")
+    return translations, failures
+
+
+class ReplyStats:
+    """Per-batch parse-failure rate and item outcomes, shared by the translator's threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.failed_batches = 0
+        self.items = 0
+        self.failed_items = 0
+        self.resent = 0
+        self.fallback = 0
+        self.bisected = 0
+        self.reasons: Dict[str, int] = {}
+
+    def record(self, items: int, failures: Dict[int, str], resent: bool):
+        """One validated reply; resent marks a re-request of failed items or part of a split batch"""
+        with self._lock:
+            if resent:
+                self.resent += items
+            else:
+                self.batches += 1
+                self.items += items
+                if failures:
+                    self.failed_batches += 1
+                self.failed_items += len(failures)
+            for reason in failures.values():
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def bisect(self):
+        """A failed request split in two"""
+        with self._lock:
+            self.bisected += 1
+
+    def gave_up(self, items: int):
+        """Items still failed after the last repair round (returned as the source)"""
+        with self._lock:
+            self.fallback += items
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "parse_failure_rate": round(self.failed_batches / self.batches, 4) if self.batches else 0.0,
+                "items": self.items,
+                "item_failure_rate": round(self.failed_items / self.items, 4) if self.items else 0.0,
+                "resent_items": self.resent,
+                "fallback_items": self.fallback,
+                "bisected": self.bisected,
+                "reasons": dict(self.reasons),
+            }
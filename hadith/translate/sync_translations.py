@@ -6,7 +6,10 @@ Sync translations from output to main translations structure
 import json
 import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
+from corpus import get_corpus
+from hadith_index import get_location_index
+from serialization import dump
 
 # Language code mapping
 LANG_CODE_MAP = {
@@ -32,58 +35,62 @@ def load_translations(language: str) -> Dict:
     with open(output_file, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def load_book_structure(book_id: str) -> Dict:
-    """Load book metadata to understand structure"""
-    script_dir = Path(__file__).parent
-    books_dir = script_dir / ".." / "books"
+def get_books_corpus():
+    """Corpus over hadith/books (manifest + chapter cache)"""
+    return get_corpus(Path(__file__).parent.parent / "books")
+
+def find_translation(hadith: Dict, book_translations: Dict) -> Optional[Dict]:
+    """Translation of a hadith keyed by idInBook, id or chapterId:id"""
+    hadith_id = str(hadith.get('id'))
+    hadith_id_in_book = str(hadith.get('idInBook', ''))
+    chapter_id = hadith.get('chapterId')
+    composite = f"{chapter_id if chapter_id is not None else 0}:{hadith_id}"
     
-    # Try to find metadata.json
-    metadata_files = list(books_dir.glob(f"**/{book_id}/metadata.json"))
-    if not metadata_files:
-        return None
+    # Try idInBook first (as translations use this)
+    if hadith_id_in_book and hadith_id_in_book in book_translations:
+        return book_translations[hadith_id_in_book]
+    if hadith_id in book_translations:
+        return book_translations[hadith_id]
+    return book_translations.get(composite)
+
+def translated_chapter_files(book_id: str, book_translations: Dict) -> Optional[Set[str]]:
+    """
+    Chapter files that hold at least one translated hadith, from the location index
     
-    with open(metadata_files[0], 'r', encoding='utf-8') as f:
-        return json.load(f)
+    Returns:
+        Set of chapter files, or None if some key could not be located
+        (then every chapter has to be checked). Bare keys may match either
+        idInBook or id, so they always fall back to checking every chapter.
+    """
+    index = get_location_index(Path(__file__).parent.parent / "books")
+    files = set()
+    for key in book_translations:
+        if ':' not in key:
+            return None
+        chapter_id, hadith_id = key.split(':', 1)
+        location = index.locate(book_id, chapter_id, hadith_id)
+        if location is None:
+            return None
+        files.add(location.chapter_file)
+    return files
+
+def load_book_structure(book_id: str) -> Dict:
+    """Load book metadata to understand structure"""
+    return get_books_corpus().book(book_id)
 
 def sync_book_translations(book_id: str, translations: Dict, lang_code: str, language: str):
     """Sync translations for a single book"""
     script_dir = Path(__file__).parent
-    books_dir = script_dir.parent / "books"
     translations_dir = script_dir.parent / "translations" / lang_code / "books"
+    corpus = get_books_corpus()
     
-    # Find book directory by searching in all categories
-    book_dir = None
-    for category_dir in books_dir.iterdir():
-        if category_dir.is_dir():
-            potential_book_dir = category_dir / book_id
-            if potential_book_dir.exists():
-                book_dir = potential_book_dir
-                category = category_dir.name
-                break
-    
-    if not book_dir:
+    # Find book directory and category from the manifest
+    book_metadata = corpus.book(book_id)
+    if not book_metadata:
         print(f"⚠️  Book directory not found: {book_id}")
         return False
     
-    # Load book metadata
-    metadata_file = book_dir / "metadata.json"
-    if not metadata_file.exists():
-        print(f"⚠️  Metadata not found for: {book_id}")
-        return False
-    
-    with open(metadata_file, 'r', encoding='utf-8') as f:
-        book_metadata = json.load(f)
-    
-    # Determine category
-    category = None
-    for cat_dir in books_dir.iterdir():
-        if cat_dir.is_dir() and (book_dir.parent == cat_dir):
-            category = cat_dir.name
-            break
-    
-    if not category:
-        print(f"⚠️  Could not determine category for: {book_id}")
-        return False
+    category = book_metadata['_category']
     
     # Create translations directory structure
     trans_book_dir = translations_dir / category / book_id
@@ -104,37 +111,27 @@ def sync_book_translations(book_id: str, translations: Dict, lang_code: str, lan
     chapters = book_metadata.get('chapters', [])
     if chapters:
         synced_count = 0
+        wanted_files = translated_chapter_files(book_id, book_translations)
         
         for chapter in chapters:
             chapter_file = chapter.get('file')
             if not chapter_file:
                 continue
+            if wanted_files is not None and chapter_file not in wanted_files:
+                continue
             
             # Load original chapter
-            orig_chapter_path = book_dir / chapter_file
-            if not orig_chapter_path.exists():
+            orig_chapter = corpus.load_chapter(book_id, chapter_file)
+            if orig_chapter is None:
                 continue
             
-            with open(orig_chapter_path, 'r', encoding='utf-8') as f:
-                orig_chapter = json.load(f)
-            
             # Create translated chapter
             trans_chapter_path = trans_book_dir / chapter_file
             trans_chapter_path.parent.mkdir(parents=True, exist_ok=True)
             
             translated_hadiths = []
             for hadith in orig_chapter.get('hadiths', []):
-                # Try multiple ID formats
-                hadith_id = str(hadith.get('id'))
-                hadith_id_in_book = str(hadith.get('idInBook', ''))
-                
-                trans_data = None
-                # Try idInBook first (as translations use this)
-                if hadith_id_in_book and hadith_id_in_book in book_translations:
-                    trans_data = book_translations[hadith_id_in_book]
-                elif hadith_id in book_translations:
-                    trans_data = book_translations[hadith_id]
-                
+                trans_data = find_translation(hadith, book_translations)
                 if trans_data:
                     translated_hadiths.append({
                         'id': hadith.get('id'),
@@ -151,34 +148,20 @@ def sync_book_translations(book_id: str, translations: Dict, lang_code: str, lan
                     'hadiths': translated_hadiths
                 }
                 
-                with open(trans_chapter_path, 'w', encoding='utf-8') as f:
-                    json.dump(trans_chapter, f, ensure_ascii=False, indent=2)
+                dump(trans_chapter, trans_chapter_path)
         
         print(f"✅ {book_id}: Synced {synced_count} hadiths")
         return synced_count > 0
     
     else:
         # Book without chapters (e.g., forties)
-        all_file = book_dir / "all.json"
-        if all_file.exists():
-            with open(all_file, 'r', encoding='utf-8') as f:
-                orig_data = json.load(f)
-            
+        orig_data = corpus.load_chapter(book_id, "all.json")
+        if orig_data is not None:
             translated_hadiths = []
             synced_count = 0
             
             for hadith in orig_data.get('hadiths', []):
-                # Try multiple ID formats
-                hadith_id = str(hadith.get('id'))
-                hadith_id_in_book = str(hadith.get('idInBook', ''))
-                
-                trans_data = None
-                # Try idInBook first (as translations use this)
-                if hadith_id_in_book and hadith_id_in_book in book_translations:
-                    trans_data = book_translations[hadith_id_in_book]
-                elif hadith_id in book_translations:
-                    trans_data = book_translations[hadith_id]
-                
+                trans_data = find_translation(hadith, book_translations)
                 if trans_data:
                     translated_hadiths.append({
                         'id': hadith.get('id'),
@@ -195,8 +178,7 @@ def sync_book_translations(book_id: str, translations: Dict, lang_code: str, lan
                     'hadiths': translated_hadiths
                 }
                 
-                with open(trans_all_file, 'w', encoding='utf-8') as f:
-                    json.dump(trans_data, f, ensure_ascii=False, indent=2)
+                dump(trans_data, trans_all_file)
                 
                 print(f"✅ {book_id}: Synced {synced_count} hadiths")
                 return synced_count > 0
@@ -223,8 +205,7 @@ def update_index_json(lang_code: str):
             break
     
     # Save updated index
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+    dump(index, index_file)
 
 def main():
     if len(sys.argv) < 2:
@@ -5,25 +5,20 @@
 """
 import json
 import random
-import glob
 from pathlib import Path
 
+from corpus import get_corpus
+from hadith_index import get_location_index
+
 def load_source_hadith(books_dir, book_id, chapter_id, hadith_id):
-    """Load original hadith from source files"""
-    book_path = Path(books_dir) / book_id
-    
-    # Try to find the hadith in chapter files
-    for json_file in glob.glob(str(book_path / "*.json")):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                hadiths = data.get('hadiths', [])
-                for h in hadiths:
-                    if str(h.get('chapterId', 0)) == str(chapter_id) and str(h.get('id')) == str(hadith_id):
-                        return h
-        except:
-            continue
-    return None
+    """Load original hadith from source files (corpus.pack or the location index)"""
+    return get_corpus(Path(books_dir)).find_hadith(book_id, chapter_id, hadith_id)
+
+def load_source_hadith_by_id_in_book(books_dir, book_id, id_in_book):
+    """Load original hadith for a bare translation key (idInBook)"""
+    index = get_location_index(Path(books_dir))
+    locations = index.locate_id_in_book(book_id, id_in_book)
+    return index.read(locations[0]) if locations else None
 
 def main():
     print("\n" + "="*70)
@@ -97,7 +92,10 @@ def main():
             print(f"   {narrator}")
         
         # Try to load original hadith
-        source = load_source_hadith(books_dir, book_id, chapter_id, hadith_id)
+        if len(parts) == 2:
+            source = load_source_hadith(books_dir, book_id, chapter_id, hadith_id)
+        else:
+            source = load_source_hadith_by_id_in_book(books_dir, book_id, hadith_id)
         if source:
             original_text = source.get('english', {}).get('text', '')
             if original_text:
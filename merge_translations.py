@@ -5,8 +5,12 @@ Merge translation parts into a single all.json file
 """
 import json
 import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "hadith" / "translate"))
+from serialization import dump
+
 # Language mapping
 LANG_MAP = {
     "tr": "turkish",
@@ -65,8 +69,7 @@ def merge_nawawi_translations(lang_code: str):
     
     # Write merged file
     output_file = base_dir / "all.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    dump(data, output_file)
     
     print(f"Merged {len(translated_hadiths)} hadiths for {lang_code}")
     print(f"Output: {output_file}")
@@ -8,9 +8,13 @@ import os
 import json
 import shutil
 import hashlib
+import sys
 import zipfile
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "hadith" / "translate"))
+from serialization import dump
+
 BASE_DIR = Path("/Users/osamaamer/Desktop/code/hadith/hadith")
 OLD_CHAPTERS_DIR = BASE_DIR / "by_chapter"
 OLD_BOOKS_DIR = BASE_DIR / "by_book"
@@ -179,8 +183,7 @@ def create_book_structure(category, book_id, config):
     }
     
     metadata_path = book_dir / "metadata.json"
-    with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    dump(metadata, metadata_path)
     
     print(f"  ✅ {config['arabic_title']}: {len(chapters_info)} فصل، {total_hadiths} حديث")
     
@@ -240,8 +243,7 @@ def update_index_json(books_data):
                 book['sha256'] = data['zip']['sha256']
     
     # حفظ التحديثات
-    with open(index_path, 'w', encoding='utf-8') as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+    dump(index, index_path)
     
     print(f"\n✅ تم تحديث index.json")
 
@@ -7,6 +7,23 @@ Usage:
     python translate_hadith.py --lang tr --book bukhari
     python translate_hadith.py --lang all --book all
     python translate_hadith.py --lang tr --test  # Test mode with 10 hadiths
+    python translate_hadith.py --lang all --book all --concurrency 32
+
+Each provider keeps one pooled keep-alive HTTP session for the whole run.
+Hadiths, chapters, books and languages are translated concurrently: at most
+--concurrency requests are in flight at once, and at most --chapters chapter
+files are loaded at once (so memory stays bounded on --book all, whatever
+--concurrency is).
+Google, DeepL and Azure take many texts per request (translate_many): a
+chapter's texts go out in as few requests as each API's item and character
+limits allow.
+
+Requests go through a RoutingProvider over get_provider: it tracks each
+provider's latency, sends a hedged duplicate when a request runs past the
+provider's p95 (at most --hedge-ratio of requests), fails over to the
+--fallback providers when one errors or degrades, and stops using a
+provider past its --char-cap.
+    python translate_hadith.py --lang tr --book all --provider deepl --fallback google --hedge-ratio 0.05
 """
 
 import json
@@ -16,11 +33,13 @@ import argparse
 import asyncio
 import aiohttp
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from collections import deque
 import hashlib
 import logging
+import time
 
 # Setup logging
 logging.basicConfig(
@@ -36,6 +55,12 @@ BOOKS_DIR = HADITH_DIR / "books"
 TRANSLATIONS_DIR = HADITH_DIR / "translations"
 GLOSSARY_PATH = TRANSLATIONS_DIR / "glossary.json"
 
+# Shared corpus reader (hadith/translate/corpus.py)
+sys.path.insert(0, str(HADITH_DIR / "translate"))
+from corpus import get_corpus
+from glossary_matcher import GlossaryMatcher
+from serialization import dump
+
 # Supported languages
 SUPPORTED_LANGUAGES = {
     "tr": "Turkish",
@@ -51,6 +76,28 @@ SUPPORTED_LANGUAGES = {
 # Language priorities (order of translation)
 LANGUAGE_PRIORITY = ["tr", "id", "ur", "bn", "fr", "es", "de", "ru"]
 
+# Requests in flight at once (--concurrency)
+DEFAULT_CONCURRENCY = 16
+# Chapter files loaded and translated at once (--chapters); bounds memory, not requests
+DEFAULT_CHAPTERS = 4
+# Per-request timeout in seconds
+REQUEST_TIMEOUT = 120
+
+# Routing (RoutingProvider): latency samples kept per provider, and the delay before a hedge
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20     # until then, hedge after HEDGE_DEFAULT_DELAY
+HEDGE_DEFAULT_DELAY = 10.0
+HEDGE_MIN_DELAY = 0.5
+# A provider is degraded (skipped for DEGRADED_COOLDOWN seconds) after FAILURE_STREAK failures in a row,
+# or half of its last HEALTH_WINDOW requests failing; it is passed over while its median latency is
+# SLOW_FACTOR times that of another healthy provider
+FAILURE_STREAK = 3
+HEALTH_WINDOW = 20
+DEGRADED_COOLDOWN = 60.0
+SLOW_FACTOR = 3.0
+# Share of requests that may be hedged (--hedge-ratio)
+DEFAULT_HEDGE_RATIO = 0.05
+
 
 @dataclass
 class TranslationConfig:
@@ -59,6 +106,15 @@ class TranslationConfig:
     api_key: str
     endpoint: Optional[str] = None
     model: Optional[str] = None  # For OpenAI
+    concurrency: int = DEFAULT_CONCURRENCY  # Requests in flight, also the connection pool size
+
+
+@dataclass
+class RoutingConfig:
+    """Hedging and cost caps for RoutingProvider"""
+    hedge_ratio: float = DEFAULT_HEDGE_RATIO  # Hedged requests as a share of all requests (0: never hedge)
+    hedge_char_cap: int = 0  # Characters hedges may send in total (0: no cap)
+    char_caps: Optional[Dict[str, int]] = None  # Characters each provider may be sent (provider -> cap)
 
 
 class Glossary:
@@ -67,6 +123,8 @@ class Glossary:
     def __init__(self, glossary_path: Path):
         self.glossary_path = glossary_path
         self.data = self._load_glossary()
+        # One compiled matcher per target language, built on first use
+        self._matchers: Dict[str, GlossaryMatcher] = {}
     
     def _load_glossary(self) -> Dict:
         """Load glossary from JSON file"""
@@ -93,45 +151,123 @@ class Glossary:
             return self.data["categories"][english_category].get(target_lang)
         return None
     
+    def matcher(self, target_lang: str) -> GlossaryMatcher:
+        """Compiled matcher for every term with a translation in target_lang"""
+        matcher = self._matchers.get(target_lang)
+        if matcher is None:
+            matcher = GlossaryMatcher({
+                english_term: translations[target_lang]
+                for english_term, translations in self.data.get("terms", {}).items()
+                if target_lang in translations
+            })
+            self._matchers[target_lang] = matcher
+        return matcher
+    
     def apply_glossary(self, text: str, target_lang: str) -> str:
-        """Apply glossary replacements to text before/after translation"""
-        result = text
-        for english_term, translations in self.data.get("terms", {}).items():
-            if target_lang in translations:
-                result = result.replace(english_term, translations[target_lang])
-        return result
+        """Apply glossary replacements to text before/after translation (one pass, longest whole-word match)"""
+        return self.matcher(target_lang).apply(text)
+
+
+class UnsupportedLanguageError(Exception):
+    """The provider cannot translate into the target language (nothing was sent; not a provider failure)"""
 
 
 class TranslationProvider:
-    """Base class for translation providers"""
+    """Base class for translation providers; one pooled keep-alive session per provider"""
+    
+    pool_size = DEFAULT_CONCURRENCY
+    _session: Optional[aiohttp.ClientSession] = None
+    
+    async def session(self) -> aiohttp.ClientSession:
+        """The provider's HTTP session, opened on first use and reused for every request"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size,
+                                             keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+        return self._session
+    
+    async def close(self):
+        """Close the session (and its pooled connections)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    # Texts per request and characters per request (0: no limit); one text per request unless overridden
+    max_batch_items = 1
+    max_batch_chars = 0
+    
+    def batches(self, texts: List[str]) -> List[slice]:
+        """Cut texts (kept in order) into requests within max_batch_items / max_batch_chars"""
+        parts = []
+        start = chars = 0
+        for i, text in enumerate(texts):
+            if i > start and (i - start >= self.max_batch_items or
+                              (self.max_batch_chars and chars + len(text) > self.max_batch_chars)):
+                parts.append(slice(start, i))
+                start, chars = i, 0
+            # A text longer than max_batch_chars goes alone
+            chars += len(text)
+        if start < len(texts):
+            parts.append(slice(start, len(texts)))
+        return parts
+    
+    def supports(self, target_lang: str) -> bool:
+        """Whether the provider translates into target_lang"""
+        return True
     
     async def translate(self, text: str, target_lang: str, source_lang: str = "en") -> str:
         raise NotImplementedError
+    
+    async def translate_many(self, texts: List[str], target_lang: str, source_lang: str = "en") -> List[str]:
+        """Translate texts in order, one request per batch (see batches)"""
+        results = []
+        for part in self.batches(texts):
+            results.extend(await self._translate_batch(texts[part], target_lang, source_lang))
+        return results
+    
+    async def _translate_batch(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        """One request's worth of texts; providers without a batch endpoint translate them one by one"""
+        return list(await asyncio.gather(*(self.translate(text, target_lang, source_lang) for text in texts)))
+    
+    @staticmethod
+    def _check_count(translations: List[str], texts: List[str], provider: str) -> List[str]:
+        if len(translations) != len(texts):
+            raise Exception(f"{provider} returned {len(translations)} translations for {len(texts)} texts")
+        return translations
 
 
 class GoogleTranslateProvider(TranslationProvider):
     """Google Cloud Translation API provider"""
     
+    # v2 accepts up to 128 q values; 30k characters keeps the request well under its 204,800-byte limit
+    max_batch_items = 128
+    max_batch_chars = 30000
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.endpoint = "https://translation.googleapis.com/language/translate/v2"
     
     async def translate(self, text: str, target_lang: str, source_lang: str = "en") -> str:
-        async with aiohttp.ClientSession() as session:
-            params = {
-                "key": self.api_key,
-                "q": text,
-                "source": source_lang,
-                "target": target_lang,
-                "format": "text"
-            }
-            async with session.post(self.endpoint, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data["data"]["translations"][0]["translatedText"]
-                else:
-                    error = await response.text()
-                    raise Exception(f"Google Translate API error: {error}")
+        return (await self._translate_batch([text], target_lang, source_lang))[0]
+    
+    async def _translate_batch(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        session = await self.session()
+        params = {"key": self.api_key}
+        # Texts go in the form body (repeated q), not the URL, so long batches fit
+        data = [("q", text) for text in texts] + [
+            ("source", source_lang),
+            ("target", target_lang),
+            ("format", "text")
+        ]
+        async with session.post(self.endpoint, params=params, data=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                translations = [t["translatedText"] for t in result["data"]["translations"]]
+                return self._check_count(translations, texts, "Google Translate")
+            else:
+                error = await response.text()
+                raise Exception(f"Google Translate API error: {error}")
 
 
 class DeepLProvider(TranslationProvider):
@@ -148,58 +284,75 @@ class DeepLProvider(TranslationProvider):
         # Note: DeepL doesn't support Urdu (ur) and Bengali (bn)
     }
     
+    # Up to 50 texts per request; the request body is capped at 128 KiB
+    max_batch_items = 50
+    max_batch_chars = 100000
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.endpoint = "https://api-free.deepl.com/v2/translate"  # Use api.deepl.com for Pro
     
     async def translate(self, text: str, target_lang: str, source_lang: str = "en") -> str:
-        if target_lang not in self.LANG_MAP:
-            raise Exception(f"DeepL doesn't support language: {target_lang}")
+        return (await self._translate_batch([text], target_lang, source_lang))[0]
+    
+    def supports(self, target_lang: str) -> bool:
+        return target_lang in self.LANG_MAP
+    
+    async def _translate_batch(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        if not self.supports(target_lang):
+            raise UnsupportedLanguageError(f"DeepL doesn't support language: {target_lang}")
         
-        async with aiohttp.ClientSession() as session:
-            headers = {"Authorization": f"DeepL-Auth-Key {self.api_key}"}
-            data = {
-                "text": [text],
-                "source_lang": "EN",
-                "target_lang": self.LANG_MAP[target_lang]
-            }
-            async with session.post(self.endpoint, headers=headers, data=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result["translations"][0]["text"]
-                else:
-                    error = await response.text()
-                    raise Exception(f"DeepL API error: {error}")
+        session = await self.session()
+        headers = {"Authorization": f"DeepL-Auth-Key {self.api_key}"}
+        data = [("text", text) for text in texts] + [
+            ("source_lang", "EN"),
+            ("target_lang", self.LANG_MAP[target_lang])
+        ]
+        async with session.post(self.endpoint, headers=headers, data=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                return self._check_count([t["text"] for t in result["translations"]], texts, "DeepL")
+            else:
+                error = await response.text()
+                raise Exception(f"DeepL API error: {error}")
 
 
 class AzureTranslatorProvider(TranslationProvider):
     """Azure Translator API provider"""
     
+    # v3 accepts up to 1,000 array elements and 50,000 characters per request
+    max_batch_items = 1000
+    max_batch_chars = 50000
+    
     def __init__(self, api_key: str, region: str = "eastus"):
         self.api_key = api_key
         self.region = region
         self.endpoint = "https://api.cognitive.microsofttranslator.com/translate"
     
     async def translate(self, text: str, target_lang: str, source_lang: str = "en") -> str:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Ocp-Apim-Subscription-Key": self.api_key,
-                "Ocp-Apim-Subscription-Region": self.region,
-                "Content-type": "application/json"
-            }
-            params = {
-                "api-version": "3.0",
-                "from": source_lang,
-                "to": target_lang
-            }
-            body = [{"text": text}]
-            async with session.post(self.endpoint, headers=headers, params=params, json=body) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result[0]["translations"][0]["text"]
-                else:
-                    error = await response.text()
-                    raise Exception(f"Azure Translator API error: {error}")
+        return (await self._translate_batch([text], target_lang, source_lang))[0]
+    
+    async def _translate_batch(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        session = await self.session()
+        headers = {
+            "Ocp-Apim-Subscription-Key": self.api_key,
+            "Ocp-Apim-Subscription-Region": self.region,
+            "Content-type": "application/json"
+        }
+        params = {
+            "api-version": "3.0",
+            "from": source_lang,
+            "to": target_lang
+        }
+        body = [{"text": text} for text in texts]
+        async with session.post(self.endpoint, headers=headers, params=params, json=body) as response:
+            if response.status == 200:
+                result = await response.json()
+                translations = [item["translations"][0]["text"] for item in result]
+                return self._check_count(translations, texts, "Azure Translator")
+            else:
+                error = await response.text()
+                raise Exception(f"Azure Translator API error: {error}")
 
 
 class OpenAIProvider(TranslationProvider):
@@ -226,128 +379,156 @@ Translate the following hadith text accurately while:
 
         user_prompt = f"Translate this hadith from English to {lang_names.get(target_lang, target_lang)}:\n\n{text}"
         
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            body = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.3
-            }
-            async with session.post(self.endpoint, headers=headers, json=body) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    error = await response.text()
-                    raise Exception(f"OpenAI API error: {error}")
+        session = await self.session()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.3
+        }
+        async with session.post(self.endpoint, headers=headers, json=body) as response:
+            if response.status == 200:
+                result = await response.json()
+                return result["choices"][0]["message"]["content"]
+            else:
+                error = await response.text()
+                raise Exception(f"OpenAI API error: {error}")
 
 
 class HadithTranslator:
     """Main hadith translation orchestrator"""
     
-    def __init__(self, provider: TranslationProvider, glossary: Glossary):
+    def __init__(self, provider: TranslationProvider, glossary: Glossary,
+                 concurrency: int = DEFAULT_CONCURRENCY, chapters: int = DEFAULT_CHAPTERS):
         self.provider = provider
         self.glossary = glossary
+        self.concurrency = max(1, concurrency)
+        # Shared by every book and language in the run
+        self.requests = asyncio.Semaphore(self.concurrency)
+        self.chapters = asyncio.Semaphore(max(1, chapters))
         self.stats = {
             "translated": 0,
             "failed": 0,
-            "skipped": 0
+            "skipped": 0,
+            "bisected": 0
         }
     
-    async def translate_text(self, text: str, target_lang: str) -> str:
-        """Translate a single text with glossary support"""
+    async def translate_texts(self, texts: List[str], target_lang: str) -> List[str]:
+        """Translate texts in order with glossary support, as few requests as the provider's batches allow"""
+        results = list(texts)
+        # Empty fields are kept as they are, not sent
+        pending = [i for i, text in enumerate(texts) if text and text.strip()]
+        self.stats["skipped"] += len(texts) - len(pending)
         # Pre-process with glossary (for terms that shouldn't be translated)
-        processed_text = self.glossary.apply_glossary(text, target_lang)
+        processed = [self.glossary.apply_glossary(texts[i], target_lang) for i in pending]
         
-        # Translate
-        try:
-            translated = await self.provider.translate(processed_text, target_lang)
-            self.stats["translated"] += 1
-            return translated
-        except Exception as e:
-            logger.error(f"Translation failed: {e}")
-            self.stats["failed"] += 1
-            return text  # Return original on failure
+        async def send(part: slice):
+            size = part.stop - part.start
+            try:
+                async with self.requests:
+                    translated = await self.provider.translate_many(processed[part], target_lang)
+                for i, text in zip(pending[part], translated):
+                    results[i] = text
+                self.stats["translated"] += len(translated)
+            except UnsupportedLanguageError as e:
+                logger.error(f"Translation failed ({size} texts): {e}")
+                self.stats["failed"] += size
+            except Exception as e:
+                if size == 1:
+                    logger.error(f"Translation failed: {e}")
+                    self.stats["failed"] += 1  # The original is kept
+                    return
+                # One bad text fails the whole request: retry each half, down to single texts
+                half = part.start + size // 2
+                logger.warning(f"Translation failed ({size} texts), retrying in halves: {e}")
+                self.stats["bisected"] += 1
+                await asyncio.gather(send(slice(part.start, half)), send(slice(half, part.stop)))
+        
+        await asyncio.gather(*(send(part) for part in self.provider.batches(processed)))
+        return results
     
-    async def translate_hadith(self, hadith: Dict, target_lang: str) -> Dict:
-        """Translate a single hadith"""
+    async def translate_text(self, text: str, target_lang: str) -> str:
+        """Translate a single text with glossary support"""
+        return (await self.translate_texts([text], target_lang))[0]
+    
+    def _hadith_fields(self, hadith: Dict, target_lang: str) -> Tuple[Dict, List[Tuple[Dict, str, str]]]:
+        """The hadith's copy to fill in, and its (target dict, key, English text) fields"""
         translated_hadith = hadith.copy()
-        
+        fields = []
         if "english" in hadith and isinstance(hadith["english"], dict):
             english = hadith["english"]
-            translated = {}
-            
-            if "narrator" in english:
-                translated["narrator"] = await self.translate_text(english["narrator"], target_lang)
-            
-            if "text" in english:
-                translated["text"] = await self.translate_text(english["text"], target_lang)
-            
-            translated_hadith[target_lang] = translated
-        
+            translated = translated_hadith[target_lang] = {}
+            fields = [(translated, key, english[key]) for key in ("narrator", "text") if key in english]
+        return translated_hadith, fields
+    
+    async def _fill(self, fields: List[Tuple[Dict, str, str]], target_lang: str):
+        """Translate every field in one batched call and store each translation in place"""
+        translations = await self.translate_texts([text for _, _, text in fields], target_lang)
+        for (target, key, _), translated in zip(fields, translations):
+            target[key] = translated
+    
+    async def translate_hadith(self, hadith: Dict, target_lang: str) -> Dict:
+        """Translate a single hadith"""
+        translated_hadith, fields = self._hadith_fields(hadith, target_lang)
+        await self._fill(fields, target_lang)
         return translated_hadith
     
     async def translate_chapter(self, chapter_path: Path, target_lang: str, output_path: Path) -> Dict:
-        """Translate an entire chapter file"""
-        logger.info(f"Translating chapter: {chapter_path.name} to {target_lang}")
-        
-        with open(chapter_path, 'r', encoding='utf-8') as f:
-            chapter_data = json.load(f)
-        
-        # Translate metadata
-        if "metadata" in chapter_data:
-            meta = chapter_data["metadata"]
-            if "english" in meta:
-                translated_meta = {}
-                for key in ["title", "author", "introduction"]:
-                    if key in meta["english"] and meta["english"][key]:
-                        translated_meta[key] = await self.translate_text(meta["english"][key], target_lang)
-                meta[target_lang] = translated_meta
-        
-        # Translate chapter info
-        if "chapter" in chapter_data and "english" in chapter_data["chapter"]:
-            chapter_data["chapter"][target_lang] = await self.translate_text(
-                chapter_data["chapter"]["english"], target_lang
-            )
-        
-        # Translate hadiths
-        if "hadiths" in chapter_data:
-            translated_hadiths = []
-            for hadith in chapter_data["hadiths"]:
-                translated_hadith = await self.translate_hadith(hadith, target_lang)
-                translated_hadiths.append(translated_hadith)
-            chapter_data["hadiths"] = translated_hadiths
-        
-        # Save translated chapter
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(chapter_data, f, ensure_ascii=False, indent=2)
-        
-        return chapter_data
+        """Translate an entire chapter file (all its texts batched together)"""
+        async with self.chapters:
+            logger.info(f"Translating chapter: {chapter_path.name} to {target_lang}")
+            
+            with open(chapter_path, 'r', encoding='utf-8') as f:
+                chapter_data = json.load(f)
+            
+            fields = []
+            # Translate metadata
+            if "metadata" in chapter_data and "english" in chapter_data["metadata"]:
+                meta = chapter_data["metadata"]
+                translated_meta = meta[target_lang] = {}
+                fields += [(translated_meta, key, meta["english"][key])
+                           for key in ["title", "author", "introduction"] if meta["english"].get(key)]
+            
+            # Translate chapter info
+            if "chapter" in chapter_data and "english" in chapter_data["chapter"]:
+                fields.append((chapter_data["chapter"], target_lang, chapter_data["chapter"]["english"]))
+            
+            # Translate hadiths
+            if "hadiths" in chapter_data:
+                translated_hadiths = []
+                for hadith in chapter_data["hadiths"]:
+                    translated_hadith, hadith_fields = self._hadith_fields(hadith, target_lang)
+                    translated_hadiths.append(translated_hadith)
+                    fields += hadith_fields
+                chapter_data["hadiths"] = translated_hadiths
+            
+            await self._fill(fields, target_lang)
+            
+            # Save translated chapter
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            dump(chapter_data, output_path)
+            
+            return chapter_data
     
     async def translate_book(self, book_id: str, target_lang: str):
         """Translate an entire book"""
         logger.info(f"Starting translation of book '{book_id}' to '{target_lang}'")
         
         # Find book directory
-        book_path = None
-        for category in ["the_9_books", "forties", "other_books"]:
-            potential_path = BOOKS_DIR / category / book_id
-            if potential_path.exists():
-                book_path = potential_path
-                break
+        corpus = get_corpus(BOOKS_DIR)
+        book_path = corpus.book_path(book_id)
         
         if not book_path:
             raise ValueError(f"Book not found: {book_id}")
         
         # Determine output directory
-        category = book_path.parent.name
+        category = corpus.category(book_id)
         output_dir = TRANSLATIONS_DIR / target_lang / "books" / category / book_id
         output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -356,21 +537,12 @@ class HadithTranslator:
         if metadata_path.exists():
             await self.translate_metadata(metadata_path, target_lang, output_dir / "metadata.json")
         
-        # Translate chapters
-        chapters_dir = book_path / "chapters"
-        if chapters_dir.exists():
-            output_chapters_dir = output_dir / "chapters"
-            output_chapters_dir.mkdir(parents=True, exist_ok=True)
-            
-            chapter_files = sorted(chapters_dir.glob("*.json"), key=lambda x: int(x.stem))
-            for chapter_file in chapter_files:
-                output_file = output_chapters_dir / chapter_file.name
-                await self.translate_chapter(chapter_file, target_lang, output_file)
-        
-        # Translate all.json (for forties books)
-        all_path = book_path / "all.json"
-        if all_path.exists():
-            await self.translate_chapter(all_path, target_lang, output_dir / "all.json")
+        # Translate chapters (chapters/*.json, or all.json for forties books); self.chapters bounds how many load at once
+        await asyncio.gather(*(
+            self.translate_chapter(book_path / chapter_file, target_lang, output_dir / chapter_file)
+            for chapter_file in corpus.chapter_files(book_id)
+            if (book_path / chapter_file).exists()
+        ))
         
         logger.info(f"Completed translation of book '{book_id}' to '{target_lang}'")
         logger.info(f"Stats: {self.stats}")
@@ -397,40 +569,237 @@ class HadithTranslator:
         
         # Translate chapter titles
         if "chapters" in metadata:
-            for chapter in metadata["chapters"]:
-                if "english" in chapter and chapter["english"]:
-                    chapter[target_lang] = await self.translate_text(chapter["english"], target_lang)
+            await self._fill([(chapter, target_lang, chapter["english"])
+                              for chapter in metadata["chapters"] if chapter.get("english")], target_lang)
         
         # Save translated metadata
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        dump(metadata, output_path)
 
 
 def get_provider(config: TranslationConfig) -> TranslationProvider:
     """Factory function to get translation provider"""
     if config.provider == "google":
-        return GoogleTranslateProvider(config.api_key)
+        provider = GoogleTranslateProvider(config.api_key)
     elif config.provider == "deepl":
-        return DeepLProvider(config.api_key)
+        provider = DeepLProvider(config.api_key)
     elif config.provider == "azure":
-        return AzureTranslatorProvider(config.api_key)
+        provider = AzureTranslatorProvider(config.api_key)
     elif config.provider == "openai":
-        return OpenAIProvider(config.api_key, config.model or "gpt-4")
+        provider = OpenAIProvider(config.api_key, config.model or "gpt-4")
     else:
         raise ValueError(f"Unknown provider: {config.provider}")
+    provider.pool_size = config.concurrency
+    return provider
+
+
+class Route:
+    """One provider behind RoutingProvider: latency samples, health and characters sent"""
+    
+    def __init__(self, name: str, provider: TranslationProvider, char_cap: int = 0):
+        self.name = name
+        self.provider = provider
+        self.char_cap = char_cap
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)
+        self.streak = 0
+        self.degraded_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.chars = 0
+    
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def hedge_delay(self) -> float:
+        """Seconds to wait on a request before hedging it: the p95 latency seen so far"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.percentile(0.95))
+    
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.degraded_until
+    
+    def affordable(self, chars: int) -> bool:
+        return not self.char_cap or self.chars + chars <= self.char_cap
+    
+    def record(self, ok: bool, elapsed: float):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(elapsed)
+            self.streak = 0
+            return
+        self.failures += 1
+        self.streak += 1
+        failing = len(self.outcomes) >= 4 and self.outcomes.count(False) * 2 >= len(self.outcomes)
+        if self.streak >= FAILURE_STREAK or failing:
+            if self.healthy():
+                logger.warning(f"Provider {self.name} degraded ({self.streak} failures in a row, "
+                               f"{self.outcomes.count(False)}/{len(self.outcomes)} recent); "
+                               f"skipped for {DEGRADED_COOLDOWN:.0f}s")
+            self.degraded_until = time.monotonic() + DEGRADED_COOLDOWN
+            self.outcomes.clear()
+    
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "chars": self.chars,
+            "p50_sec": round(p50, 2) if p50 is not None else None,
+            "p95_sec": round(p95, 2) if p95 is not None else None,
+            "degraded": not self.healthy(),
+        }
+
+
+class RoutingProvider(TranslationProvider):
+    """
+    Hedged, latency-aware routing over several providers (the first one is the primary)
+    
+    Each request goes to the first healthy provider under its character cap,
+    passing over one SLOW_FACTOR times slower than another. If it has not
+    answered after that provider's p95 latency, a duplicate goes to the next
+    provider (or the same one when it is alone) and the first answer wins;
+    hedges are capped by hedge_ratio and hedge_char_cap. A failed request is
+    retried on the next provider. Providers that do not support the target
+    language are left out for that language only; that is not a failure.
+    """
+    
+    def __init__(self, routes: List[Route], routing: RoutingConfig):
+        self.routes = routes
+        self.routing = routing
+        # Batches sized for the primary; another provider re-splits them to its own limits
+        self.max_batch_items = routes[0].provider.max_batch_items
+        self.max_batch_chars = routes[0].provider.max_batch_chars
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.hedge_chars = 0
+        self.failovers = 0
+    
+    async def close(self):
+        for route in self.routes:
+            await route.provider.close()
+    
+    def supports(self, target_lang: str) -> bool:
+        return any(route.provider.supports(target_lang) for route in self.routes)
+    
+    async def translate(self, text: str, target_lang: str, source_lang: str = "en") -> str:
+        return (await self._translate_batch([text], target_lang, source_lang))[0]
+    
+    def _candidates(self, chars: int, target_lang: str) -> List[Route]:
+        """
+        Providers to try in order: healthy ones (slow ones last), then degraded ones;
+        none over their cap or without target_lang
+        """
+        usable = [route for route in self.routes
+                  if route.provider.supports(target_lang) and route.affordable(chars)]
+        healthy = [route for route in usable if route.healthy()]
+        medians = [route.percentile(0.5) for route in healthy if len(route.latencies) >= HEDGE_MIN_SAMPLES]
+        fastest = min(medians) if medians else None
+        
+        def slow(route: Route) -> bool:
+            median = route.percentile(0.5) if len(route.latencies) >= HEDGE_MIN_SAMPLES else None
+            return fastest is not None and median is not None and median > SLOW_FACTOR * fastest
+        
+        return ([r for r in healthy if not slow(r)] + [r for r in healthy if slow(r)] +
+                [r for r in usable if not r.healthy()])
+    
+    def _may_hedge(self, chars: int) -> bool:
+        cap = self.routing.hedge_char_cap
+        return (self.hedges + 1 <= self.routing.hedge_ratio * self.requests and
+                (not cap or self.hedge_chars + chars <= cap))
+    
+    async def _call(self, route: Route, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        chars = sum(len(text) for text in texts)
+        route.requests += 1
+        route.chars += chars
+        started = time.monotonic()
+        try:
+            result = await route.provider.translate_many(texts, target_lang, source_lang)
+        except (asyncio.CancelledError, UnsupportedLanguageError):
+            raise
+        except Exception:
+            route.record(False, time.monotonic() - started)
+            raise
+        route.record(True, time.monotonic() - started)
+        return result
+    
+    async def _hedged(self, route: Route, others: List[Route], texts: List[str], target_lang: str,
+                      source_lang: str, chars: int) -> List[str]:
+        """Request on route; past its hedge delay, race a duplicate on the next provider"""
+        primary = asyncio.ensure_future(self._call(route, texts, target_lang, source_lang))
+        pending = {primary}
+        try:
+            if self.routing.hedge_ratio > 0:
+                done, _ = await asyncio.wait(pending, timeout=route.hedge_delay())
+                if not done and self._may_hedge(chars):
+                    backup_route = next((r for r in others if r.healthy() and r.affordable(chars)), route)
+                    self.hedges += 1
+                    self.hedge_chars += chars
+                    logger.debug(f"Hedging {len(texts)} texts on {backup_route.name}")
+                    pending.add(asyncio.ensure_future(self._call(backup_route, texts, target_lang, source_lang)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.exception() is None:
+                        winner = winner or task
+                    else:
+                        error = task.exception()
+                if winner is not None:
+                    if winner is not primary:
+                        self.hedges_won += 1
+                    return winner.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _translate_batch(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        chars = sum(len(text) for text in texts)
+        if not self.supports(target_lang):
+            raise UnsupportedLanguageError(f"No provider supports language: {target_lang}")
+        candidates = self._candidates(chars, target_lang)
+        if not candidates:
+            raise Exception(f"Every provider is over its character cap ({chars} characters to send)")
+        self.requests += 1
+        errors = []
+        for i, route in enumerate(candidates):
+            if i:
+                self.failovers += 1
+                logger.warning(f"Failing over to {route.name}: {errors[-1]}")
+            try:
+                return await self._hedged(route, candidates[i + 1:], texts, target_lang, source_lang, chars)
+            except Exception as e:
+                errors.append(f"{route.name}: {e}")
+        raise Exception("; ".join(errors))
+    
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.hedges,
+            "hedges_won": self.hedges_won,
+            "hedge_chars": self.hedge_chars,
+            "failovers": self.failovers,
+            "providers": {route.name: route.stats() for route in self.routes},
+        }
+
+
+def get_router(configs: List[TranslationConfig], routing: RoutingConfig) -> RoutingProvider:
+    """RoutingProvider over get_provider for each config, the first being the primary"""
+    caps = routing.char_caps or {}
+    return RoutingProvider([Route(config.provider, get_provider(config), caps.get(config.provider, 0))
+                            for config in configs], routing)
 
 
 def get_all_books() -> List[str]:
     """Get list of all book IDs"""
-    books = []
-    for category in ["the_9_books", "forties", "other_books"]:
-        category_dir = BOOKS_DIR / category
-        if category_dir.exists():
-            for book_dir in category_dir.iterdir():
-                if book_dir.is_dir() and not book_dir.name.startswith('.'):
-                    books.append(book_dir.name)
-    return books
+    return get_corpus(BOOKS_DIR).book_ids()
 
 
 async def main():
@@ -440,6 +809,21 @@ async def main():
     parser.add_argument("--provider", default="google", choices=["google", "deepl", "azure", "openai"])
     parser.add_argument("--api-key", help="API key (or set via environment variable)")
     parser.add_argument("--test", action="store_true", help="Test mode - translate only 10 hadiths")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Requests in flight at once, across hadiths, chapters, books and languages "
+                             f"(default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--chapters", type=int, default=DEFAULT_CHAPTERS,
+                        help=f"Chapter files loaded at once; raise it if --concurrency goes unused on "
+                             f"small chapters (default: {DEFAULT_CHAPTERS})")
+    parser.add_argument("--fallback", action="append", default=[], choices=["google", "deepl", "azure", "openai"],
+                        help="Provider to fail over to (repeatable; key from <PROVIDER>_API_KEY)")
+    parser.add_argument("--hedge-ratio", type=float, default=DEFAULT_HEDGE_RATIO,
+                        help=f"Largest share of requests sent twice when slow "
+                             f"(0 disables; default: {DEFAULT_HEDGE_RATIO})")
+    parser.add_argument("--hedge-chars", type=int, default=0,
+                        help="Characters hedged requests may send in total (default: no cap)")
+    parser.add_argument("--char-cap", action="append", default=[], metavar="PROVIDER=CHARS",
+                        help="Characters a provider may be sent, e.g. deepl=500000 (repeatable)")
     
     args = parser.parse_args()
     
@@ -449,11 +833,24 @@ async def main():
         logger.error(f"API key required. Set --api-key or {args.provider.upper()}_API_KEY environment variable")
         sys.exit(1)
     
+    configs = [TranslationConfig(provider=args.provider, api_key=api_key, concurrency=args.concurrency)]
+    for name in args.fallback:
+        fallback_key = os.environ.get(f"{name.upper()}_API_KEY")
+        if not fallback_key:
+            logger.error(f"API key required for fallback {name}. Set {name.upper()}_API_KEY environment variable")
+            sys.exit(1)
+        configs.append(TranslationConfig(provider=name, api_key=fallback_key, concurrency=args.concurrency))
+    try:
+        char_caps = {name: int(cap) for name, cap in (item.split("=", 1) for item in args.char_cap)}
+    except ValueError:
+        logger.error("--char-cap expects PROVIDER=CHARS, e.g. deepl=500000")
+        sys.exit(1)
+    
     # Initialize
-    config = TranslationConfig(provider=args.provider, api_key=api_key)
-    provider = get_provider(config)
+    config = configs[0]
+    provider = get_router(configs, RoutingConfig(args.hedge_ratio, args.hedge_chars, char_caps))
     glossary = Glossary(GLOSSARY_PATH)
-    translator = HadithTranslator(provider, glossary)
+    translator = HadithTranslator(provider, glossary, config.concurrency, args.chapters)
     
     # Determine languages and books
     languages = LANGUAGE_PRIORITY if args.lang == "all" else [args.lang]
@@ -464,21 +861,29 @@ async def main():
         if lang not in SUPPORTED_LANGUAGES:
             logger.error(f"Unsupported language: {lang}")
             sys.exit(1)
+    for lang in languages:
+        if not provider.supports(lang):
+            logger.warning(f"Skipping {lang}: none of the providers supports it")
+    languages = [lang for lang in languages if provider.supports(lang)]
     
     # Start translation
     start_time = datetime.now()
-    logger.info(f"Starting translation: {len(books)} books to {len(languages)} languages")
+    logger.info(f"Starting translation: {len(books)} books to {len(languages)} languages "
+                f"(concurrency {config.concurrency}, {args.chapters} chapters at once)")
+    
+    async def run_book(book: str, lang: str):
+        try:
+            await translator.translate_book(book, lang)
+        except Exception as e:
+            logger.error(f"Failed to translate book '{book}' to '{lang}': {e}")
     
+    # Every language and book at once; the translator's semaphores bound requests and loaded chapters
     for lang in languages:
-        logger.info(f"\n{'='*50}")
         logger.info(f"Translating to: {SUPPORTED_LANGUAGES[lang]} ({lang})")
-        logger.info(f"{'='*50}")
-        
-        for book in books:
-            try:
-                await translator.translate_book(book, lang)
-            except Exception as e:
-                logger.error(f"Failed to translate book '{book}' to '{lang}': {e}")
+    try:
+        await asyncio.gather(*(run_book(book, lang) for lang in languages for book in books))
+    finally:
+        await provider.close()
     
     # Summary
     elapsed = datetime.now() - start_time
@@ -486,6 +891,11 @@ async def main():
     logger.info("TRANSLATION COMPLETE")
     logger.info(f"Time elapsed: {elapsed}")
     logger.info(f"Stats: {translator.stats}")
+    routing = provider.stats()
+    logger.info(f"Routing: {routing['requests']} requests, {routing['hedges_fired']} hedges fired, "
+                f"{routing['hedges_won']} won, {routing['failovers']} failovers")
+    for name, route in routing["providers"].items():
+        logger.info(f"  {name}: {route}")
     logger.info(f"{'='*50}")
 
 